@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import metrics
+import sheets
+import snapshot
+from elo_engine import (
+    MATCH_TYPES, compute_player_stats,
+    get_players, get_retired_players, preview_match, ranking_rows, singles_h2h_matches,
+)
+
+# --- JSON API (jen pro čtení) ---
+# Žebříček, historie hráčů a H2H pro další nástroje (displej v klubu, chat bot) bez
+# spouštění Streamlit skriptu. Počítá se ze stejného jádra a snapshotu jako aplikace.
+# ETag = verze dat (u /ranking i dnešní den), takže klient s If-None-Match dostane levnou odpověď 304.
+#
+#   python api.py --port 8502 [--snapshot-dir .snapshot] [--no-sync]
+#
+#   GET /version
+#   GET /ranking
+#   GET /history?limit=50
+#   GET /players
+#   GET /players/{jméno}/history
+#   GET /h2h?player=Tobi                    (přehled soupeřů a parťáků)
+#   GET /h2h?player=Tobi&opponent=Kuba      (vzájemné zápasy ve dvouhře)
+#   GET /h2h?player=Tobi&partner=Ríša       (společné zápasy ve čtyřhře)
+#   GET /preview?type=doubles&a=Tobi,Ríša&b=Kuba,Jirka   (změna ELO pro oba možné výsledky)
+#   GET /metrics                            (provozní metriky ve formátu Prometheus)
+
+REFRESH_SECONDS = 10      # jak často se nejdřív ověří verze sheetu
+MAX_CACHED_BODIES = 256   # hotové odpovědi pro aktuální verzi dat
+ROUTES = {"/version", "/ranking", "/history", "/players", "/h2h", "/preview"}
+DATED_ROUTES = {"/ranking"}  # závisí i na dnešním datu (aktivita za ACTIVE_DAYS)
+
+
+class Engine:
+    """Drží aktuální EngineState a hotové odpovědi pro jeho verzi."""
+
+    def __init__(self, snapshot_dir, sync=True):
+        self.snapshot_dir = snapshot_dir
+        self.sync = sync
+        self.lock = threading.Lock()           # krátké: výměna stavu, cache odpovědí
+        self.refresh_lock = threading.Lock()   # jedna obnova stavu naráz
+        self.snapshot_mtime = snapshot.manifest_mtime(snapshot_dir)
+        self.state = snapshot.load(snapshot_dir)
+        self.ws = None
+        self.checked = 0.0
+        self.bodies = {}
+        self.retired = None if self.state is None else get_retired_players(self.state.log)
+
+    def current(self):
+        """
+        Aktuální stav. Obnovu (sheet, případně jen snapshot) dělá vlákno, které si o ni řekne
+        první po REFRESH_SECONDS; ostatní mezitím odpovídají ze stávajícího stavu a čekají
+        jen tehdy, když ještě žádný stav není.
+        """
+        with self.lock:
+            due = time.monotonic() - self.checked > REFRESH_SECONDS
+            if due:
+                self.checked = time.monotonic()
+        if due or self.state is None:
+            with self.refresh_lock:
+                if due or self.state is None:
+                    self._refresh()
+        return self.state
+
+    def _refresh(self):
+        """Nový stav se připraví mimo self.lock (stahování ze sheetu trvá), pod zámkem se jen vymění."""
+        state = self.state
+        if self.sync:
+            try:
+                if self.ws is None:
+                    self.ws = sheets.open_worksheet(sheets.service_account_info())
+                state = sheets.sync_state(state, self.ws, self.snapshot_dir)
+            except Exception as e:
+                if state is None:
+                    raise
+                print(f"Sheet nedostupný, jede se ze snapshotu: {e}")
+        else:
+            # --no-sync: snapshot přepisuje jiný proces (aplikace), znovu se načte po změně manifestu
+            mtime = snapshot.manifest_mtime(self.snapshot_dir)
+            if mtime != self.snapshot_mtime:
+                loaded = snapshot.load(self.snapshot_dir)
+                if loaded is not None:  # rozepsaný snapshot -> zkusí se to při další obnově
+                    state, self.snapshot_mtime = loaded, mtime
+        if state is self.state:
+            return
+        retired = get_retired_players(state.log)
+        with self.lock:
+            self.state, self.retired, self.bodies = state, retired, {}
+
+    def body(self, version, key, build):
+        """Hotové JSON tělo pro (verze odpovědi, dotaz); build() se volá jen při první žádosti."""
+        with self.lock:
+            hit = self.bodies.get((version, key))
+        if hit is not None:
+            return hit
+        payload = build()
+        if payload is None:
+            return None
+        data = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+        with self.lock:
+            if len(self.bodies) >= MAX_CACHED_BODIES:
+                self.bodies.clear()
+            self.bodies[(version, key)] = data
+        return data
+
+
+def _json_default(o):
+    """numpy čísla (počty, row_idx) -> obyčejná čísla, zbytek (datumy) jako text."""
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+def _records(df):
+    """DataFrame -> seznam slovníků s None místo NaN."""
+    if df is None or df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _routes(engine, state, path, query, today):
+    """Vrátí funkci, která sestaví odpověď (nebo None pro neznámou cestu / chybějícího hráče)."""
+    events, sets_txt = state.log, state.sets_txt
+    players = state.elo["ratings"]
+
+    if path == "/version":
+        return lambda: {"data_version": state.data_version, "remote_version": state.remote_version,
+                        "rows": len(state.events), "clean_rows": len(events)}
+
+    if path == "/ranking":
+        return lambda: {"data_version": state.data_version, "players": ranking_rows(state.elo_meta, engine.retired, today)}
+
+    if path == "/players":
+        return lambda: sorted(players.keys())
+
+    if path == "/history":
+        limit = int(query.get("limit", ["0"])[0] or 0)
+        hist = state.history.drop(columns=["row_idx"]) if "row_idx" in state.history.columns else state.history
+        return lambda: _records(hist.head(limit) if limit > 0 else hist)
+
+    if path == "/preview":
+        rtype = query.get("type", ["singles"])[0]
+        # hráči týmu oddělení čárkou ('+' se v URL dotazu mění na mezeru)
+        team_a, team_b = (get_players(query.get(k, [""])[0].replace(",", "+")) for k in ("a", "b"))
+        size = 1 if "singles" in rtype else 2
+        if rtype not in MATCH_TYPES or len(team_a) != size or len(team_b) != size or set(team_a) & set(team_b):
+            raise ValueError(rtype)
+
+        def build():
+            preview = preview_match(players, rtype, team_a, team_b)
+            return {
+                "type": rtype, "team_a": team_a, "team_b": team_b,
+                **{w: {p: {"delta": round(d, 2), "elo": round(e, 2)} for p, (d, e) in preview[w].items()} for w in preview},
+            }
+        return build
+
+    parts = [unquote(p) for p in path.strip("/").split("/")]
+    if len(parts) == 3 and parts[0] == "players" and parts[2] == "history":
+        name = parts[1]
+        if name not in players:
+            return None
+        return lambda: _records(state.player_history(name))
+
+    if path == "/h2h":
+        player = query.get("player", [None])[0]
+        if not player or player not in players:
+            return None
+        opponent = query.get("opponent", [None])[0]
+        partner = query.get("partner", [None])[0]
+        if opponent:
+            def build():
+                matches = singles_h2h_matches(events, player, opponent, sets_txt)
+                w = sum(1 for m in matches if m["Vítěz"] == player)
+                return {"player": player, "opponent": opponent, "w": w, "l": len(matches) - w, "matches": matches[::-1]}
+            return build
+        if partner:
+            def build():
+                matches = state.partner_matches(player, partner)
+                w = sum(1 for m in matches if m["Výsledek"] == "Výhra")
+                return {"player": player, "partner": partner, "w": w, "l": len(matches) - w, "matches": matches[::-1]}
+            return build
+
+        def build():
+            df_s, df_p, df_o, *_ = compute_player_stats(events, player)
+            return {"player": player, "singles": _records(df_s), "partners": _records(df_p), "doubles_opponents": _records(df_o)}
+        return build
+
+    return None
+
+
+def make_handler(engine):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "TenisEloAPI/1"
+
+        def _send(self, code, body=b"", etag=None, content_type="application/json; charset=utf-8"):
+            self.send_response(code)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if code != 304:
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if code != 304 and self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _error(self, code, msg):
+            self._send(code, json.dumps({"error": msg}, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip("/") == "/metrics":
+                return self._send(200, metrics.render().encode("utf-8"),
+                                  content_type="text/plain; version=0.0.4; charset=utf-8")
+            route = "/" + url.path.strip("/").split("/")[0]  # štítek bez jmen hráčů
+            route = route if route in ROUTES else "jiné"
+            with metrics.timer("tenis_api_requests_seconds", path=route):
+                self._get(url)
+
+        def _get(self, url):
+            try:
+                state = engine.current()
+            except Exception as e:
+                return self._error(503, f"Data nejsou k dispozici: {e}")
+            if state is None:
+                return self._error(503, "Data nejsou k dispozici.")
+
+            query = parse_qs(url.query)
+            path = url.path.rstrip("/") or "/"
+            today = date.today()
+            try:
+                build = _routes(engine, state, path, query, today)
+            except ValueError:
+                return self._error(400, "Neplatný parametr.")
+            if build is None:
+                return self._error(404, "Nenalezeno.")
+
+            # Odpověď závisí na verzi dat a dotazu (DATED_ROUTES i na dni) -> ETag podle toho
+            version = f"{state.data_version}-{today:%Y%m%d}" if path in DATED_ROUTES else state.data_version
+            etag = f'"{version}"'
+            inm = self.headers.get("If-None-Match", "")
+            if inm and (inm.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in inm.split(",")]):
+                return self._send(304, etag=etag)
+
+            body = engine.body(version, (path, url.query), build)
+            if body is None:
+                return self._error(404, "Nenalezeno.")
+            self._send(200, body, etag=etag)
+
+        do_HEAD = do_GET
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="JSON API nad ELO žebříčkem (jen pro čtení).")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8502)
+    ap.add_argument("--snapshot-dir", default=os.environ.get(
+        "TENIS_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.realpath(__file__)), ".snapshot")))
+    ap.add_argument("--no-sync", action="store_true", help="nesahat na Google Sheets, jen servírovat snapshot (po změně se načte znovu)")
+    args = ap.parse_args()
+
+    engine = Engine(args.snapshot_dir, sync=not args.no_sync)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(engine))
+    print(f"API běží na http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
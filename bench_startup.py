@@ -0,0 +1,73 @@
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+# --- MĚŘENÍ STARTU ---
+# Doba importů nového procesu aplikace: moduly, které tenis.py načítá hned při startu
+# (čtou se z jeho importů na nejvyšší úrovni, takže seznam nezastará),
+# proti stavu, kdy se navíc hned načítal plotly a gspread/google-auth (dnes až při
+# prvním grafu / otevření sheetu). Každé měření běží v čerstvém interpreteru.
+# Dobu jednotlivých běhů skriptu (hlavička, přihlášení, sekce) ukáže TENIS_PROFILE=1.
+#
+#   python bench_startup.py [--runs 5]
+
+DEFERRED = ["plotly.express", "gspread", "google.oauth2.service_account"]
+
+_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+for m in sys.argv[1:]:
+    __import__(m)
+print((time.perf_counter() - t0) * 1000)
+print(",".join(m for m in {deferred!r} if m in sys.modules))
+"""
+
+
+def startup_modules(path):
+    """Moduly importované na nejvyšší úrovni skriptu (v pořadí, bez duplicit) – to, co se načte při startu."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(variants, runs):
+    """
+    Medián doby importu (ms) pro každou sadu modulů + které odložené moduly se načetly.
+    Sady se v jednotlivých kolech střídají, aby je kolísání zátěže stroje ovlivnilo stejně.
+    """
+    here = os.path.dirname(os.path.realpath(__file__))
+    code = _SNIPPET.format(deferred=DEFERRED)
+    times, loaded = [[] for _ in variants], [""] * len(variants)
+    for _ in range(runs):
+        for i, modules in enumerate(variants):
+            out = subprocess.run([sys.executable, "-c", code, *modules], cwd=here, check=True,
+                                 capture_output=True, text=True).stdout.splitlines()
+            times[i].append(float(out[0]))
+            loaded[i] = out[1] if len(out) > 1 else ""
+    return [(statistics.median(t), l) for t, l in zip(times, loaded)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Doba importů při startu aplikace.")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    startup = startup_modules(os.path.join(os.path.dirname(os.path.realpath(__file__)), "tenis.py"))
+    (eager, _), (lazy, loaded) = measure([startup + DEFERRED, startup], args.runs)
+    print(f"moduly při startu ({len(startup)}): {', '.join(startup)}")
+    print(f"importy se vším hned:   {eager:7.0f} ms")
+    print(f"importy s odložením:    {lazy:7.0f} ms  (ušetřeno {eager - lazy:.0f} ms)")
+    print(f"odložené moduly načtené při startu: {loaded or 'žádné'}")
+
+
+if __name__ == "__main__":
+    main()
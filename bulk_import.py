@@ -0,0 +1,185 @@
+import argparse
+import csv
+import io
+import math
+import re
+
+import metrics
+from elo_engine import COLUMNS, MATCH_TYPES, get_players, match_key, normalize_sets_input, parse_ddmmyyyy
+
+# --- HROMADNÝ IMPORT ZÁPASŮ Z CSV ---
+# CSV ve formátu tennis_elo_template.csv (date,type,team_a,team_b,winner,score,sets,reason[,author]).
+# Soubor se čte po řádcích, každý řádek se zkontroluje (hráči, typ, vítěz, sety podle pravidel
+# normalize_sets_input) a chyby se hlásí s číslem řádku. Platné řádky se zapíšou po dávkách
+# přes append_rows a aplikace pak přepočítá jen jednou.
+
+IMPORT_TYPES = {"singles", "doubles", "friendly_singles", "friendly_doubles", "adjust", "career_toggle"}
+TEAM_SIZE = {"singles": 1, "friendly_singles": 1, "doubles": 2, "friendly_doubles": 2}
+REQUIRED = ["date", "type", "team_a", "team_b"]
+CHUNK_SIZE = 200  # řádků na jedno append_rows
+
+_SCORE_RE = re.compile(r"^\d+:\d+$")
+
+
+def _set_tokens(s):
+    return [p for p in str(s).replace(" ", "").split(",") if p.strip()]
+
+
+def validate_row(row, known_players):
+    """
+    Zkontroluje jeden řádek CSV. Vrátí (řádek pro sheet nebo None, seznam chyb).
+    known_players se doplňuje o hráče přidané řádkem 'adjust' s důvodem 'Přidání hráče'.
+    """
+    errors = []
+    r = {c: str(row.get(c) or "").strip() for c in COLUMNS}
+
+    missing = [c for c in REQUIRED if not r[c]]
+    if missing:
+        return None, [f"Chybí hodnota: {', '.join(missing)}"]
+
+    d = parse_ddmmyyyy(r["date"])
+    if d is None:
+        errors.append(f"Neplatné datum '{r['date']}' (čekám DD.MM.RRRR)")
+
+    rtype = r["type"]
+    if rtype not in IMPORT_TYPES:
+        return None, errors + [f"Neznámý typ '{rtype}'"]
+
+    if rtype == "adjust":
+        p = r["team_a"]
+        try:
+            delta = float(r["team_b"])
+        except ValueError:
+            delta = None
+        if delta is None or not math.isfinite(delta):  # 'nan' / 'inf' by rozbily celé přehrání
+            errors.append(f"Změna ELO '{r['team_b']}' není číslo")
+        if p not in known_players and not r["reason"].startswith("Přidání hráče"):
+            errors.append(f"Neznámý hráč '{p}' (nového hráče přidej s důvodem 'Přidání hráče')")
+        if errors:
+            return None, errors
+        known_players.add(p)  # do sheetu jde zadaný text (bez mezer), ne přeformátované číslo
+
+    elif rtype == "career_toggle":
+        if r["team_a"] not in known_players:
+            errors.append(f"Neznámý hráč '{r['team_a']}'")
+        if r["team_b"] not in ("retired", "active"):
+            errors.append(f"Stav kariéry musí být 'retired' nebo 'active', ne '{r['team_b']}'")
+
+    else:
+        team_a, team_b = get_players(r["team_a"]), get_players(r["team_b"])
+        size = TEAM_SIZE[rtype]
+        if len(team_a) != size or len(team_b) != size:
+            errors.append(f"{rtype} potřebuje {size} hráče na stranu")
+        if len(set(team_a + team_b)) != len(team_a + team_b):
+            errors.append("Hráči se nesmí opakovat")
+        unknown = [p for p in team_a + team_b if p not in known_players]
+        if unknown:
+            errors.append(f"Neznámí hráči: {', '.join(unknown)}")
+        if r["winner"] not in ("A", "B"):
+            errors.append(f"Vítěz musí být 'A' nebo 'B', ne '{r['winner']}'")
+        if r["score"] and not _SCORE_RE.match(r["score"]):
+            errors.append(f"Neplatné skóre '{r['score']}' (čekám např. 2:1)")
+
+        sets_raw = r["sets"].strip("'")
+        if sets_raw:
+            norm = normalize_sets_input(sets_raw)
+            # normalize_sets_input nečitelné sety tiše zahodí -> počet musí sedět
+            if len(_set_tokens(norm)) != len(_set_tokens(sets_raw)):
+                errors.append(f"Neplatný zápis setů '{sets_raw}' (např. 6:3, 4:6 nebo 3,-4)")
+            r["sets"] = f"'{norm}"
+
+        r["team_a"], r["team_b"] = "+".join(team_a), "+".join(team_b)
+
+    if errors:
+        return None, errors
+    r["date"] = d.strftime("%d.%m.%Y")
+    return r, []
+
+
+def iter_csv(lines, known_players, default_author="", existing=None):
+    """
+    Projde CSV po řádcích (lines = iterovatelné texty, např. otevřený soubor).
+    Vrací generátor (číslo řádku, řádek pro sheet nebo None, chyby).
+    existing = index zápasů, které už v sheetu jsou (EngineState.match_index); stejný zápas
+    (i zadaný dvakrát v souboru) se hlásí jako chyba a nezapíše se.
+    """
+    known = set(known_players)
+    existing = existing or {}
+    seen = {}
+    reader = csv.DictReader(lines)
+    header = [h.strip() for h in (reader.fieldnames or [])]
+    missing = [c for c in REQUIRED + ["winner", "score", "sets", "reason"] if c not in header]
+    if missing:
+        yield 1, None, [f"V hlavičce chybí sloupce: {', '.join(missing)}"]
+        return
+    reader.fieldnames = header
+
+    for row in reader:
+        line_no = reader.line_num
+        if not any(str(v or "").strip() for v in row.values()):
+            continue
+        r, errors = validate_row(row, known)
+        if r is not None and r["type"] in MATCH_TYPES:
+            key = match_key(r["type"], r["date"], r["team_a"], r["team_b"], r["winner"], r["score"])
+            if key in existing:
+                r, errors = None, [f"Zápas už je zapsaný (řádek sheetu {existing[key] + 2})"]
+            elif key in seen:
+                r, errors = None, [f"Stejný zápas je v souboru už na řádku {seen[key]}"]
+            else:
+                seen[key] = line_no
+        if r is not None and not r["author"]:
+            r["author"] = default_author
+        yield line_no, r, errors
+
+
+def validate_csv(lines, known_players, default_author="", existing=None):
+    """Celý soubor najednou: (platné řádky, [(číslo řádku, chyba), ...])."""
+    valid, errors = [], []
+    for line_no, r, errs in iter_csv(lines, known_players, default_author, existing):
+        if r is not None:
+            valid.append(r)
+        errors.extend((line_no, e) for e in errs)
+    return valid, errors
+
+
+def write_rows(ws, rows, chunk_size=CHUNK_SIZE):
+    """Zapíše řádky do sheetu po dávkách append_rows; vrací počet zapsaných řádků."""
+    written = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        with metrics.timer("tenis_sheets_requests_seconds", op="append_rows"):
+            ws.append_rows([[r.get(c, "") for c in COLUMNS] for r in chunk], value_input_option="USER_ENTERED")
+        written += len(chunk)
+    return written
+
+
+def open_text(data: bytes):
+    """Nahraný soubor (bytes) -> textový stream pro iter_csv (UTF-8 i s BOM z Excelu)."""
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+
+
+def main():
+    import sheets
+    from elo_engine import build_state, values_to_frame
+
+    ap = argparse.ArgumentParser(description="Hromadný import zápasů z CSV do Google Sheets.")
+    ap.add_argument("csv_file")
+    ap.add_argument("--author", default="Import")
+    ap.add_argument("--dry-run", action="store_true", help="jen zkontrolovat, nic nezapisovat")
+    args = ap.parse_args()
+
+    ws = sheets.open_worksheet(sheets.service_account_info())
+    state = build_state(values_to_frame(ws.get_all_values()))
+    with open(args.csv_file, encoding="utf-8-sig", newline="") as f:
+        valid, errors = validate_csv(f, state.elo["ratings"].keys(), args.author, state.match_index)
+
+    for line_no, e in errors:
+        print(f"řádek {line_no}: {e}")
+    print(f"Platných řádků: {len(valid)}, chyb: {len(errors)}")
+    if errors or args.dry_run:
+        return
+    print(f"Zapsáno řádků: {write_rows(ws, valid)}")
+
+
+if __name__ == "__main__":
+    main()
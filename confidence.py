@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from elo_engine import INITIAL_RATINGS, K_DOUBLES, K_SINGLES, SCALE, event_dates
+
+# --- NEJISTOTA ELO (BOOTSTRAP) ---
+# Stejné ELO u hráče s 5 a s 300 zápasy neznamená totéž. Log se převzorkuje po dnech
+# (blokový bootstrap: den se vybere celý, s opakováním), každý vzorek se přehraje nad
+# kompaktně zakódovaným logem (pole čísel místo DataFrame) a z rozložení konečných ELO
+# a pořadí se vezmou percentilové intervaly. Úpravy ELO (adjust) jsou ve vzorku vždy
+# právě jednou, přáteláky ELO nemění, takže se do kódování vůbec nedostanou.
+# Replikace běží paralelně v procesech (ProcessPoolExecutor jako gen_pass.py). Procesy se
+# startují přes "spawn": fork vícevláknového serveru (Streamlit) z vlákna může zdědit zamčené zámky.
+
+N_REPLICATES = 200
+LEVEL = 0.95
+WORKERS = int(os.environ.get("TENIS_BOOTSTRAP_WORKERS") or 0) or os.cpu_count() or 1
+CONFIDENCE_COLUMNS = ["elo", "lo", "hi", "rank", "rank_lo", "rank_hi", "matches"]
+
+ADJUST, SINGLES, DOUBLES = 0, 1, 2
+
+
+@dataclass
+class EncodedLog:
+    """Log jako pole: jeden prvek = událost, která mění ELO (kanonické pořadí)."""
+    players: list           # id hráče -> jméno
+    initial: np.ndarray     # startovní ELO podle id (INITIAL_RATINGS, jinak 1000)
+    kind: np.ndarray        # ADJUST / SINGLES / DOUBLES
+    a1: np.ndarray          # id hráčů (-1 = nikdo); u ADJUST je hráč v a1
+    a2: np.ndarray
+    b1: np.ndarray
+    b2: np.ndarray
+    value: np.ndarray       # výsledek týmu A (1/0), u ADJUST změna ELO
+    day: np.ndarray         # den události (pořadí dne v logu), bloky pro bootstrap
+
+
+def encode_log(log: pd.DataFrame) -> EncodedLog:
+    """Čistý log (kanonické pořadí) -> EncodedLog (bez přáteláků a změn kariéry)."""
+    ev = log[log["type"].isin(["adjust", "singles", "doubles"])]
+    a = ev["team_a"].str.split("+", n=1, expand=True).reindex(columns=[0, 1])
+    b = ev["team_b"].where(ev["type"] != "adjust", "").str.split("+", n=1, expand=True).reindex(columns=[0, 1])
+    b = b.where(b != "")
+
+    names = pd.unique(pd.concat([a[0], a[1], b[0], b[1]]).dropna())
+    players = list(INITIAL_RATINGS) + [p for p in names if p not in INITIAL_RATINGS]
+    ids = {p: i for i, p in enumerate(players)}
+    to_id = lambda s: s.map(ids).fillna(-1).to_numpy(dtype=np.int64)
+
+    kind = ev["type"].map({"adjust": ADJUST, "singles": SINGLES, "doubles": DOUBLES}).to_numpy(dtype=np.int8)
+    is_adj = kind == ADJUST
+    value = np.where(is_adj, pd.to_numeric(ev["team_b"].where(is_adj), errors="coerce").fillna(0.0),
+                     (ev["winner"] == "A").to_numpy(dtype=float))
+    day = pd.factorize(event_dates(ev), sort=True)[0] if len(ev) else np.zeros(0, dtype=np.int64)
+    return EncodedLog(
+        players=players, initial=np.array([float(INITIAL_RATINGS.get(p, 1000.0)) for p in players]),
+        kind=kind, a1=to_id(a[0]), a2=to_id(a[1]), b1=to_id(b[0]), b2=to_id(b[1]),
+        value=value.astype(float), day=np.asarray(day, dtype=np.int64),
+    )
+
+
+def replay(enc: EncodedLog, order) -> np.ndarray:
+    """Přehraje události v pořadí `order` (indexy do enc) a vrátí konečné ELO podle id."""
+    r = enc.initial.tolist()
+    kind, a1, a2, b1, b2, value = (x.tolist() for x in (enc.kind, enc.a1, enc.a2, enc.b1, enc.b2, enc.value))
+    for j in order:
+        k, pa, pb = kind[j], a1[j], b1[j]
+        if k == ADJUST:
+            r[pa] += value[j]
+            continue
+        if k == SINGLES:
+            d = K_SINGLES * (value[j] - 1.0 / (1.0 + 10 ** ((r[pb] - r[pa]) / SCALE)))
+            r[pa] += d
+            r[pb] -= d
+            continue
+        qa, qb = a2[j], b2[j]
+        ea = 1.0 / (1.0 + 10 ** (((r[pb] + r[qb]) - (r[pa] + r[qa])) / 2 / SCALE))
+        d = K_DOUBLES * (value[j] - ea) / 2
+        r[pa] += d
+        r[qa] += d
+        r[pb] -= d
+        r[qb] -= d
+    return np.array(r)
+
+
+def _day_blocks(enc: EncodedLog):
+    """Pro každý den: (všechny události dne, jen zápasy dne) jako seznamy indexů."""
+    blocks = [([], []) for _ in range(int(enc.day.max()) + 1 if len(enc.day) else 0)]
+    for j, (d, k) in enumerate(zip(enc.day.tolist(), enc.kind.tolist())):
+        blocks[d][0].append(j)
+        if k != ADJUST:
+            blocks[d][1].append(j)
+    return blocks
+
+
+def _replicates(enc: EncodedLog, seeds) -> np.ndarray:
+    """Konečná ELO pro každý seed (řádek = replikace). Běží v procesu poolu."""
+    blocks = _day_blocks(enc)
+    match_days = np.array([d for d, (_, m) in enumerate(blocks) if m], dtype=np.int64)
+    out = np.empty((len(seeds), len(enc.players)))
+    for n, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        counts = np.bincount(rng.choice(match_days, size=len(match_days)), minlength=len(blocks)) \
+            if len(match_days) else np.zeros(len(blocks), dtype=np.int64)
+        order = []
+        for (every, matches), c in zip(blocks, counts.tolist()):
+            # den vybraný c-krát: úpravy jednou, zápasy c-krát za sebou; nevybraný den jen úpravy
+            order += every if c else [j for j in every if j not in matches]
+            for _ in range(c - 1):
+                order += matches
+        out[n] = replay(enc, order)
+    return out
+
+
+def bootstrap(log: pd.DataFrame, rank_players=None, n=N_REPLICATES, level=LEVEL, seed=0, workers=WORKERS) -> pd.DataFrame:
+    """
+    Percentilové intervaly ELO a pořadí pro každého hráče (index = hráč, CONFIDENCE_COLUMNS).
+    Pořadí se počítá mezi `rank_players` (jinak mezi všemi); ostatní mají pořadí NaN.
+    Replikace se rozdělí mezi `workers` procesů; při 1 běží bez poolu.
+    """
+    enc = encode_log(log)
+    if not len(enc.kind):
+        return pd.DataFrame(columns=CONFIDENCE_COLUMNS).rename_axis("player")
+
+    seeds = np.random.SeedSequence(seed).spawn(n)
+    chunks = [c for c in np.array_split(np.arange(n), max(1, min(workers, n))) if len(c)]
+    if len(chunks) == 1:
+        samples = _replicates(enc, seeds)
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks), mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = pool.map(_replicates, [enc] * len(chunks), [[seeds[i] for i in c] for c in chunks])
+            samples = np.vstack(list(parts))
+
+    elo = replay(enc, range(len(enc.kind)))
+    players = np.array(enc.players, dtype=object)
+    ranked = np.isin(players, list(rank_players)) if rank_players is not None else np.ones(len(players), bool)
+
+    def ranks(values):
+        # 1 = nejvyšší ELO mezi hodnocenými hráči (pro matici: po řádcích)
+        v = np.where(ranked, values, -np.inf)
+        return (-v).argsort(axis=-1, kind="stable").argsort(axis=-1, kind="stable") + 1.0
+
+    tail = (1.0 - level) / 2 * 100
+    lo, hi = np.percentile(samples, [tail, 100 - tail], axis=0)
+    rank_lo, rank_hi = np.percentile(ranks(samples), [tail, 100 - tail], axis=0)
+    matches = np.bincount(np.concatenate([x[enc.kind != ADJUST] for x in (enc.a1, enc.a2, enc.b1, enc.b2)]) + 1,
+                          minlength=len(players) + 1)[1:]
+
+    out = pd.DataFrame({
+        "elo": elo, "lo": lo, "hi": hi, "rank": np.where(ranked, ranks(elo), np.nan),
+        "rank_lo": np.where(ranked, np.floor(rank_lo), np.nan), "rank_hi": np.where(ranked, np.ceil(rank_hi), np.nan),
+        "matches": matches,
+    }, index=pd.Index(enc.players, name="player"))
+    return out[CONFIDENCE_COLUMNS]
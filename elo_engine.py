@@ -0,0 +1,936 @@
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from match_sets import decode_sets
+
+# --- VÝPOČETNÍ JÁDRO (bez Streamlitu) ---
+# Přehrávání ELO a historie, které používá tenis.py a ukládá/načítá snapshot.py.
+# Nic tady nesahá na st.*, takže se to dá volat i mimo běžící aplikaci.
+
+K_SINGLES = 24
+K_DOUBLES = 36
+SCALE = 400
+
+INITIAL_RATINGS = {
+    "Tobi": 1200, "Kuba": 1100, "Jirka": 1040,
+    "Kávič": 1040, "Ríša": 1030, "Novas": 1030
+}
+
+COLUMNS = ["date", "type", "team_a", "team_b", "winner", "score", "sets", "reason", "author"]
+MATCH_TYPES = {"singles", "doubles", "friendly_singles", "friendly_doubles"}
+
+
+# --- POMOCNÉ FUNKCE ---
+def get_players(team_str):
+    """Rozdělí řetězec týmu (např. 'Tobi+Kuba') na seznam jmen."""
+    return [p.strip() for p in str(team_str).split("+") if p.strip()]
+
+def parse_ddmmyyyy(s: str):
+    """Bezpečně převede text na datum."""
+    s = str(s or "").strip()
+    try:
+        return datetime.strptime(s, "%d.%m.%Y").date()
+    except:
+        return None
+
+def format_sets_display(sets_raw):
+    """Převede starý formát s ohledem na to, kdo set vyhrál (podle znaménka mínus)."""
+    if not sets_raw: return ""
+    s = str(sets_raw).strip("'").strip()
+    if not s: return ""
+
+    if ":" in s:
+        return s
+
+    parts = [p.strip() for p in s.replace(" ", ",").split(",") if p.strip()]
+    formatted = []
+
+    for p in parts:
+        if p == "-0":
+            formatted.append("0:6")
+            continue
+        if p == "0":
+            formatted.append("6:0")
+            continue
+
+        try:
+            v = int(p)
+            n = abs(v)
+
+            if n == 6:
+                if v > 0: formatted.append("7:6")
+                else: formatted.append("6:7")
+            elif n >= 5:
+                if v > 0: formatted.append("7:5")
+                else: formatted.append("5:7")
+            else:
+                if v > 0: formatted.append(f"6:{n}")
+                else: formatted.append(f"{n}:6")
+        except:
+            formatted.append(p)
+
+    return ", ".join(formatted)
+
+def normalize_sets_input(user_input):
+    """Převede zápis '6:3, 4:6, 7:5' i zkratky '3, -4, 5' vždy na čistý DB formát ('3,-4,5')."""
+    if not user_input: return ""
+
+    # Rozdělíme vstup podle čárky a zahodíme mezery pro snazší zpracování
+    parts = [p.strip() for p in user_input.replace(" ", "").split(",") if p.strip()]
+
+    final_loser_games = []
+    for p in parts:
+        if ":" in p:
+            try:
+                a_str, b_str = p.split(":")
+                a = int(a_str)
+                b = int(b_str)
+                # Pokud vyhrál Tým A (např. 6:3), uložíme jen gemy poraženého, tedy '3'
+                if a > b:
+                    final_loser_games.append(str(b))
+                # Pokud vyhrál Tým B (např. 4:6), uložíme to jako mínus, tedy '-4'
+                elif a < b:
+                    if a == 0:
+                        final_loser_games.append("-0") # Speciální případ pro 0:6
+                    else:
+                        final_loser_games.append(str(-a))
+                else:
+                    final_loser_games.append(str(a))
+            except:
+                continue
+        else:
+            # Uživatel zadal rovnou zkrácený formát (např. 3 nebo -4)
+            try:
+                if p == "-0":
+                    final_loser_games.append("-0")
+                else:
+                    final_loser_games.append(str(int(p)))
+            except:
+                continue
+
+    return ",".join(final_loser_games)
+
+
+# --- DATA ZE SHEETU ---
+def values_to_frame(values) -> pd.DataFrame:
+    """Výstup get_all_values() (hlavička + řádky) -> DataFrame se sloupci COLUMNS."""
+    if not values:
+        return pd.DataFrame(columns=COLUMNS)
+
+    header = values[0]
+    rows = values[1:]
+    df = pd.DataFrame(rows, columns=header).fillna("")
+
+    for c in COLUMNS:
+        if c not in df.columns:
+            df[c] = ""
+    return df[COLUMNS]
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64bit otisk každého řádku (stabilní mezi procesy), základ pro verzi dat."""
+    if df.empty:
+        return np.zeros(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(df[COLUMNS].astype(str), index=False).to_numpy(dtype=np.uint64)
+
+def data_version(hashes: np.ndarray) -> str:
+    """Verze dat = SHA1 přes otisky řádků v pořadí sheetu."""
+    return hashlib.sha1(np.ascontiguousarray(hashes, dtype=np.uint64).tobytes()).hexdigest()
+
+
+# --- VALIDACE LOGU ---
+# Každý řádek sheetu se jednou (při načtení) zařadí jako platný, opravený nebo vyřazený.
+# Přehrávání ELO, historie i statistiky pak dostávají jen čistý log, takže nemusí
+# na každém místě znovu řešit nečitelné datum, změnu ELO nebo sety.
+
+EVENT_TYPES = MATCH_TYPES | {"adjust", "career_toggle"}
+TEAM_SIZE = {"singles": 1, "friendly_singles": 1, "doubles": 2, "friendly_doubles": 2}
+
+VALID, REPAIRED, REJECTED = "platný", "opravený", "vyřazený"
+REPORT_COLUMNS = ["Řádek", "Stav", "Důvod"] + COLUMNS
+
+def _set_tokens(s):
+    return [p for p in str(s).replace(" ", "").split(",") if p.strip()]
+
+def validate_events(df: pd.DataFrame):
+    """
+    Rozdělí řádky sheetu na čistý log a report problémů.
+    Vrací (log, report): log = platné + opravené řádky (index = pořadí v sheetu, takže
+    sheet_row zůstává index + 2), report = opravené a vyřazené řádky s důvody (REPORT_COLUMNS).
+    Pravidla závisí jen na řádku samotném, takže jde validovat i jen nově přidané řádky.
+    """
+    raw = df[COLUMNS].astype(str)
+    log = raw.apply(lambda c: c.str.strip())
+    n = len(log)
+    rejected = [[] for _ in range(n)]
+    repaired = [[] for _ in range(n)]
+
+    def flag(target, mask, msg):
+        for pos in np.flatnonzero(np.asarray(mask, dtype=bool)):
+            target[pos].append(msg if isinstance(msg, str) else msg(pos))
+
+    flag(repaired, (raw != log).any(axis=1), "odstraněny mezery kolem hodnot")
+
+    rtype = log["type"]
+    empty = (log == "").all(axis=1)
+    flag(rejected, empty, "prázdný řádek")
+    flag(rejected, ~empty & ~rtype.isin(EVENT_TYPES), lambda i: f"neznámý typ '{rtype.iat[i]}'")
+
+    # Datum: DD.MM.RRRR (i bez úvodních nul, např. 4.12.2025)
+    dates = pd.to_datetime(log["date"], format="%d.%m.%Y", errors="coerce")
+    bad_date = dates.isna() & rtype.isin(EVENT_TYPES)
+    flag(rejected, bad_date, lambda i: f"neplatné datum '{log['date'].iat[i]}'")
+
+    # Úprava ELO: nečitelná změna se dřív počítala jako 0 -> oprava na 0
+    is_adj = rtype == "adjust"
+    flag(rejected, is_adj & (log["team_a"] == ""), "úprava ELO bez hráče")
+    delta = pd.to_numeric(log["team_b"], errors="coerce")
+    bad_delta = is_adj & ~np.isfinite(delta)
+    flag(repaired, bad_delta, lambda i: f"neplatná změna ELO '{log['team_b'].iat[i]}' nahrazena 0")
+    log.loc[bad_delta, "team_b"] = "0"
+
+    # Konec / návrat kariéry
+    is_car = rtype == "career_toggle"
+    flag(rejected, is_car & (log["team_a"] == ""), "změna kariéry bez hráče")
+    flag(rejected, is_car & ~log["team_b"].isin(["retired", "active"]),
+         lambda i: f"neznámý stav kariéry '{log['team_b'].iat[i]}'")
+
+    # Zápasy: počty hráčů, vítěz, sety
+    for i in np.flatnonzero(rtype.isin(MATCH_TYPES).to_numpy()):
+        r = log.iloc[i]
+        ta, tb = get_players(r["team_a"]), get_players(r["team_b"])
+        size = TEAM_SIZE[r["type"]]
+        if len(ta) != size or len(tb) != size:
+            rejected[i].append(f"špatný počet hráčů ({len(ta)} vs {len(tb)})")
+        elif len(set(ta + tb)) != len(ta + tb):
+            rejected[i].append("hráč je v zápase dvakrát")
+        if r["winner"] not in ("A", "B"):
+            rejected[i].append(f"chybí vítěz (A/B), je '{r['winner']}'")
+
+        team_a, team_b = "+".join(ta), "+".join(tb)
+        if (team_a, team_b) != (r["team_a"], r["team_b"]):
+            repaired[i].append("zápis týmů sjednocen")
+            log.iat[i, log.columns.get_loc("team_a")] = team_a
+            log.iat[i, log.columns.get_loc("team_b")] = team_b
+
+        sets = r["sets"].strip("'")
+        if sets:
+            norm = normalize_sets_input(sets)
+            if len(_set_tokens(norm)) != len(_set_tokens(sets)):
+                repaired[i].append(f"nečitelné sety vynechány ('{sets}')")
+                log.iat[i, log.columns.get_loc("sets")] = norm
+
+    status = np.array([REJECTED if rj else (REPAIRED if rp else VALID) for rj, rp in zip(rejected, repaired)], dtype=object)
+    bad = status != VALID
+    report = raw[bad].copy()
+    report.insert(0, "Důvod", ["; ".join(rj or rp) for rj, rp, b in zip(rejected, repaired, bad) if b])
+    report.insert(0, "Stav", status[bad])
+    report.insert(0, "Řádek", report.index + 2)
+
+    return log[status != REJECTED], report[REPORT_COLUMNS]
+
+
+# --- KANONICKÉ POŘADÍ ---
+# Všechny výpočty (ELO, historie, kariéra, statistiky) procházejí log v jednom pořadí:
+# podle data, v rámci dne podle pořadí v sheetu. Klíč (datum, index řádku) se použije jednou
+# při načtení (canonical_order) a dál se log jen prochází; žádná funkce ho znovu neřadí.
+# Index řádku zůstává pozice v sheetu (sheet_row = index + 2).
+
+def event_dates(log: pd.DataFrame) -> pd.Series:
+    """Data událostí čistého logu jako datetime (validate_events zaručuje čitelné datum)."""
+    return pd.to_datetime(log["date"], format="%d.%m.%Y", errors="coerce")
+
+def canonical_order(log: pd.DataFrame) -> pd.DataFrame:
+    """Čistý log seřazený podle (datum, pořadí v sheetu)."""
+    return log.iloc[np.lexsort((log.index.to_numpy(), event_dates(log).to_numpy()))]
+
+def canonical_log(df: pd.DataFrame) -> pd.DataFrame:
+    """Řádky sheetu -> čistý log v kanonickém pořadí (pro volání mimo EngineState)."""
+    return canonical_order(validate_events(df)[0])
+
+
+# --- KARIÉRA ---
+def get_retired_players(log):
+    """Vrátí set hráčů, kteří mají ukončenou kariéru (poslední změna v kanonickém pořadí logu)."""
+    toggles = log[log["type"] == "career_toggle"]
+    last_states = toggles.drop_duplicates(subset=["team_a"], keep="last")
+    return set(last_states.loc[last_states["team_b"] == "retired", "team_a"].astype(str).str.strip())
+
+
+# --- ELO ---
+def new_elo_state():
+    """Prázdný stav přehrávání ELO; replay_elo ho umí navázat o další řádky."""
+    ratings = INITIAL_RATINGS.copy()
+    return {
+        "ratings": ratings,
+        "base": {p: float(v) for p, v in ratings.items()},  # startovní ELO pro výpočet total_delta
+        "last_date": {},          # poslední zápas (singles/doubles/friendly)
+        "last_delta": {},         # poslední změna (ranked/adjust; friendly=0)
+        "played_elo_match": {},   # měl někdy ranked match (singles/doubles)
+        "trajectory": {},         # hráč -> [(index řádku logu, změna, ELO po)] (player_history)
+        "pairs": {},              # dvojice (pair_key) -> ELO dvojice ve čtyřhře
+        "pair_trajectory": {},    # dvojice -> [(index řádku logu, změna, ELO po)] (doubles_partner_matches)
+    }
+
+def pair_key(p, q):
+    """Klíč dvojice ve čtyřhře: jména seřazená, "A + B" (stejně jako index bilance dvojic)."""
+    return " + ".join(sorted((p, q)))
+
+def elo_deltas(ratings, rtype, team_a, team_b, winner):
+    """Změna ELO jednoho hráče strany A a strany B v zápase (přátelák 0, nový hráč má 1000)."""
+    if rtype not in ("singles", "doubles"):
+        return 0.0, 0.0
+    ra = sum(ratings.get(p, 1000.0) for p in team_a) / max(1, len(team_a))
+    rb = sum(ratings.get(p, 1000.0) for p in team_b) / max(1, len(team_b))
+    ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
+    sa = 1.0 if winner == "A" else 0.0
+
+    k = K_SINGLES if rtype == "singles" else K_DOUBLES
+    delta = k * (sa - ea)
+    return delta / max(1, len(team_a)), -delta / max(1, len(team_b))
+
+def preview_match(ratings, rtype, team_a, team_b):
+    """
+    Náhled zápasu nad aktuálním ELO (bez přehrávání logu) pro oba možné výsledky:
+    {"A": {hráč: (změna, nové ELO)}, "B": {...}} podle vítěze.
+    """
+    out = {}
+    for winner in ("A", "B"):
+        da, db = elo_deltas(ratings, rtype, team_a, team_b, winner)
+        out[winner] = {p: (d, ratings.get(p, 1000.0) + d) for team, d in ((team_a, da), (team_b, db)) for p in team}
+    return out
+
+def replay_elo(df, state=None):
+    """Přehraje řádky čistého logu (v kanonickém pořadí) nad stavem; bez stavu začíná od INITIAL_RATINGS."""
+    if state is None:
+        state = new_elo_state()
+    ratings = state["ratings"]
+    base = state["base"]
+    last_date = state["last_date"]
+    last_delta = state["last_delta"]
+    played_elo_match = state["played_elo_match"]
+    trajectory = state.setdefault("trajectory", {})
+    pairs = state.setdefault("pairs", {})
+    pair_trajectory = state.setdefault("pair_trajectory", {})
+
+    def parse_team(s: str):
+        return [x.strip() for x in str(s).split("+") if x.strip()]
+
+    def ensure_player(p: str):
+        ratings.setdefault(p, 1000.0)
+        base.setdefault(p, 1000.0)
+        last_date.setdefault(p, None)
+        last_delta.setdefault(p, 0.0)
+        played_elo_match.setdefault(p, False)
+
+    def track(p, i, delta):
+        trajectory.setdefault(p, []).append((i, delta, ratings[p]))
+
+    def track_pairs(i, rtype, team_a, team_b, winner):
+        # Dvojice hraje jako jeden hráč s vlastním ELO (od 1000); přátelák se zapíše se změnou 0
+        if len(team_a) != 2 or len(team_b) != 2:
+            return
+        ka, kb = pair_key(*team_a), pair_key(*team_b)
+        da, db = elo_deltas(pairs, rtype, [ka], [kb], winner)
+        for k, delta in ((ka, da), (kb, db)):
+            pairs[k] = pairs.get(k, 1000.0) + delta
+            pair_trajectory.setdefault(k, []).append((i, delta, pairs[k]))
+
+    for i, r in df.iterrows():
+        rtype = str(r.get("type", "")).strip()
+        d = parse_ddmmyyyy(r.get("date", ""))
+
+        # --- adjust ---
+        if rtype == "adjust":
+            p = str(r.get("team_a", "")).strip()
+            delta = float(r.get("team_b", 0))  # validate_events zaručuje číslo
+
+            ensure_player(p)
+            ratings[p] += delta
+            last_delta[p] = delta
+            track(p, i, delta)
+            continue
+
+        # --- friendly ---
+        if rtype in ["friendly_singles", "friendly_doubles"]:
+            team_a = parse_team(r.get("team_a", ""))
+            team_b = parse_team(r.get("team_b", ""))
+
+            for p in team_a + team_b:
+                ensure_player(p)
+                last_delta[p] = 0.0
+                if d:
+                    last_date[p] = d
+                track(p, i, 0.0)
+            track_pairs(i, rtype, team_a, team_b, str(r.get("winner", "")).strip())
+            continue
+
+        # --- ranked matches ---
+        if rtype in ["singles", "doubles"]:
+            team_a = parse_team(r.get("team_a", ""))
+            team_b = parse_team(r.get("team_b", ""))
+            winner = str(r.get("winner", "")).strip()
+
+            for p in team_a + team_b:
+                ensure_player(p)
+
+            da, db = elo_deltas(ratings, rtype, team_a, team_b, winner)
+
+            for p in team_a:
+                ratings[p] += da
+                last_delta[p] = da
+                played_elo_match[p] = True
+                if d:
+                    last_date[p] = d
+                track(p, i, da)
+
+            for p in team_b:
+                ratings[p] += db
+                last_delta[p] = db
+                played_elo_match[p] = True
+                if d:
+                    last_date[p] = d
+                track(p, i, db)
+
+            track_pairs(i, rtype, team_a, team_b, winner)
+
+    return state
+
+def elo_meta(state):
+    """Ze stavu přehrávání vrátí (ratings, last_date, total_delta, last_delta, played_elo_match)."""
+    ratings = dict(state["ratings"])
+    base = state["base"]
+    last_date, last_delta, played = dict(state["last_date"]), dict(state["last_delta"]), dict(state["played_elo_match"])
+
+    # total delta = finální - start (base)
+    total_delta = {}
+    for p in ratings.keys():
+        last_date.setdefault(p, None)
+        last_delta.setdefault(p, 0.0)
+        played.setdefault(p, False)
+        total_delta[p] = ratings[p] - base.get(p, 1000.0)
+
+    return ratings, last_date, total_delta, last_delta, played
+
+def compute_elo_with_meta(df):
+    return elo_meta(replay_elo(canonical_log(df)))
+
+
+# --- HISTORIE ---
+PLAYER_HISTORY_COLUMNS = ["Datum", "Typ", "Zápas", "Výsledek", "Skóre", "Sety", "Rozdíl ELO", "ELO po"]
+
+def player_history(log, trajectory, target, sets_txt):
+    """
+    Historie jednoho hráče z jeho trajektorie (stav replay_elo), nejnovější nahoře.
+    Sahá jen na řádky logu, kde hráč hrál, takže trvá úměrně počtu jeho zápasů.
+    """
+    points = trajectory.get(target, [])
+    if not points:
+        return pd.DataFrame(columns=PLAYER_HISTORY_COLUMNS)
+
+    rows = log.loc[[i for i, _, _ in points], ["date", "type", "team_a", "team_b", "winner", "score", "reason"]]
+    hist = []
+    for (i, delta, rating), r in zip(points, rows.itertuples(index=False)):
+        rtype, rawd = str(r.type).strip(), str(r.date).strip()
+
+        # 1. Manuální úpravy
+        if rtype == "adjust":
+            reason = str(r.reason).strip()
+            if reason.startswith("Přidání hráče"):
+                hist.append({
+                    "Datum": rawd, "Typ": "Přidání hráče", "Zápas": f"Nastaveno na {int(round(rating))}",
+                    "Výsledek": "", "Skóre": "", "Sety": "", "Rozdíl ELO": "", "ELO po": round(rating, 2)
+                })
+            else:
+                hist.append({
+                    "Datum": rawd, "Typ": "Úprava ELO", "Zápas": f"Manuální úprava — {reason}".strip(' —'),
+                    "Výsledek": "", "Skóre": "", "Sety": "", "Rozdíl ELO": f"{'+' if delta >= 0 else ''}{int(delta)}", "ELO po": round(rating, 2)
+                })
+            continue
+
+        # 2. Zápasy
+        team_a, team_b = get_players(r.team_a), get_players(r.team_b)
+        winner = str(r.winner).strip()
+        is_friendly = "friendly" in rtype
+        res = "Výhra" if ((winner == "A" and target in team_a) or (winner == "B" and target in team_b)) else "Prohra"
+        hist.append({
+            "Datum": rawd,
+            "Typ": "Přátelák" if is_friendly else ("Singles" if "singles" in rtype else "Doubles"),
+            "Zápas": f"{' + '.join(team_a)} 🆚 {' + '.join(team_b)}",
+            "Výsledek": res,
+            "Skóre": str(r.score).strip(),
+            "Sety": sets_txt.at[i],  # už naformátované (match_sets.decode_sets)
+            "Rozdíl ELO": "" if is_friendly else f"{'+' if round(delta) >= 0 else ''}{int(round(delta))}",
+            "ELO po": round(rating, 2)
+        })
+
+    return pd.DataFrame(hist).iloc[::-1]
+
+def build_player_history(df, target, sets_txt=None):
+    """Historie jednoho hráče z čistého logu v kanonickém pořadí (EngineState.log); se stavem EngineState.player_history."""
+    if sets_txt is None:
+        _, sets_txt = decode_sets(df["sets"])
+    return player_history(df, replay_elo(df)["trajectory"], target, sets_txt)
+
+def _history_rows(log, sets_txt):
+    """Log doplněný o číslo řádku sheetu a text setů pro replay_full_history."""
+    return log.assign(sheet_row=log.index + 2, __sets_txt=sets_txt)
+
+def replay_full_history(tmp, ratings):
+    """Přehraje řádky logu (se sloupci sheet_row a __sets_txt, viz _history_rows) a vrátí řádky historie."""
+    def parse_team(s: str):
+        return [x.strip() for x in str(s).split("+") if x.strip()]
+
+    # Pomocná funkce definovaná přímo zde, aby ji build_full_history viděla
+    def ensure_player(p: str):
+        ratings.setdefault(p, 1000.0)
+
+    out = []
+
+    for _, r in tmp.iterrows():
+        rtype = str(r.get("type", "")).strip()
+        rawd = str(r.get("date", "")).strip()
+        winner = str(r.get("winner", "")).strip()
+        score = str(r.get("score", "")).strip()
+        reason = str(r.get("reason", "")).strip()
+        author = str(r.get("author", "")).strip()
+
+        # --- ADJUST ---
+        if rtype == "adjust":
+            p = str(r.get("team_a", "")).strip()
+            if not p: continue
+
+            delta = float(r.get("team_b", 0))
+
+            ensure_player(p)
+            ratings[p] = ratings.get(p, 1000.0) + delta
+
+            is_add_player = reason.startswith("Přidání hráče")
+            if is_add_player:
+                typ, zapas, duvod = "Přidání hráče", f"{p} — Nastaveno na {int(round(ratings[p]))}", reason
+            else:
+                typ, zapas, duvod = "Úprava ELO", f"{p} (Změna: {'+' if delta >= 0 else ''}{int(delta)})", reason
+
+            out.append({
+                "Datum": rawd, "Typ": typ, "Zápas": zapas, "Důvod": duvod,
+                "Výsledek": "", "Skóre": "", "Zapsal": author, "row_idx": r["sheet_row"]
+            })
+            continue
+
+        # --- MATCH ---
+        if rtype in ["singles", "doubles", "friendly_singles", "friendly_doubles"]:
+            team_a = parse_team(r.get("team_a", ""))
+            team_b = parse_team(r.get("team_b", ""))
+            if not team_a or not team_b: continue
+
+            for p in team_a + team_b: ensure_player(p)
+
+            is_friendly = "friendly" in rtype
+            typ = "Přátelák" if is_friendly else ("Singles" if "singles" in rtype else "Doubles")
+
+            da, db = elo_deltas(ratings, rtype, team_a, team_b, winner)
+
+            for p in team_a: ratings[p] += da
+            for p in team_b: ratings[p] += db
+
+            vysledek = f"Vítěz: {' + '.join(team_a if winner == 'A' else team_b)}" if winner in ["A", "B"] else "Remíza"
+
+            out.append({
+                "Datum": rawd, "Typ": typ, "Zápas": f"{' + '.join(team_a)} 🆚 {' + '.join(team_b)}",
+                "Důvod": "", "Výsledek": vysledek, "Skóre": score,
+                "Sety": r["__sets_txt"],
+                "Zapsal": author,
+                "row_idx": r["sheet_row"]
+            })
+
+    return out
+
+HISTORY_COLUMNS = ["Datum", "Typ", "Zápas", "Důvod", "Výsledek", "Skóre", "Sety", "Zapsal", "row_idx"]
+
+def history_frame(out) -> pd.DataFrame:
+    """Řádky z replay_full_history -> tabulka (nejnovější nahoře, sloupce vždy v pořadí HISTORY_COLUMNS)."""
+    if not out:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    return pd.DataFrame(out, columns=HISTORY_COLUMNS).iloc[::-1].reset_index(drop=True)
+
+def build_full_history(df: pd.DataFrame, sets_txt=None) -> pd.DataFrame:
+    """Kompletní historie z řádků sheetu (jen čisté řádky, kanonické pořadí, nejnovější nahoře)."""
+    log = canonical_log(df)
+    if sets_txt is None:
+        _, sets_txt = decode_sets(log["sets"])
+    return history_frame(replay_full_history(_history_rows(log, sets_txt), INITIAL_RATINGS.copy()))
+
+
+# --- ŽEBŘÍČEK ---
+ACTIVE_DAYS = 30  # hráč je v žebříčku, pokud hrál ranked zápas v posledních 30 dnech
+
+def ranking_rows(elo_meta, retired_players, today=None):
+    """
+    Žebříček jako seznam slovníků (stejná pravidla jako Tab 'Žebříček'): nahoře aktivní hráči
+    s pořadím podle ELO, pod nimi neaktivní a na konci hráči s ukončenou kariérou (rank None).
+    """
+    ratings, last_date, total_delta, last_delta, played_elo_match = elo_meta
+    today = today or datetime.now().date()
+    cutoff = today - timedelta(days=ACTIVE_DAYS)
+
+    rows = []
+    for p, elo in ratings.items():
+        ld = last_date.get(p)
+        is_retired = p in retired_players
+        is_ranked = bool(played_elo_match.get(p, False))
+        rows.append({
+            "player": p,
+            "elo": round(float(elo), 2),
+            "last_match": ld.strftime("%d.%m.%Y") if ld else None,
+            "total_delta": round(float(total_delta.get(p, 0.0)), 2),
+            "last_delta": round(float(last_delta.get(p, 0.0)), 2),
+            "retired": is_retired,
+            "active": is_ranked and not is_retired and ld is not None and ld >= cutoff,
+        })
+
+    active = sorted((r for r in rows if r["active"]), key=lambda r: -int(round(r["elo"])))
+    inactive = sorted((r for r in rows if not r["active"]), key=lambda r: (r["retired"], -int(round(r["elo"]))))
+    for i, r in enumerate(active, start=1):
+        r["rank"] = i
+    for r in inactive:
+        r["rank"] = None
+    return active + inactive
+
+
+# --- STATISTIKY HRÁČE ---
+def compute_player_stats(df: pd.DataFrame, current_user: str):
+    """
+    Tabulky soupeřů/parťáků hráče + slovníky výher a proher (Tab 'Statistika hráče', API).
+    """
+    singles_opponents = {}
+    doubles_partners = {}
+    doubles_opponents = {}
+
+    for _, r in df.iterrows():
+        if r["type"] not in MATCH_TYPES:
+            continue
+
+        ta = get_players(r["team_a"])
+        tb = get_players(r["team_b"])
+        win = r["winner"]
+
+        if current_user not in ta and current_user not in tb:
+            continue
+
+        my_team = ta if current_user in ta else tb
+        opp_team = tb if current_user in ta else ta
+
+        is_win = (current_user in ta and win == "A") or (current_user in tb and win == "B")
+        is_loss = (current_user in ta and win == "B") or (current_user in tb and win == "A")
+
+        # Singles
+        if "singles" in r["type"] and len(my_team) == 1 and len(opp_team) == 1:
+            opp = opp_team[0]
+            if opp not in singles_opponents:
+                singles_opponents[opp] = {"w": 0, "l": 0}
+            if is_win:
+                singles_opponents[opp]["w"] += 1
+            elif is_loss:
+                singles_opponents[opp]["l"] += 1
+
+        # Doubles
+        if "doubles" in r["type"] and len(my_team) == 2 and len(opp_team) == 2:
+            partner = my_team[0] if my_team[1] == current_user else my_team[1]
+            if partner not in doubles_partners:
+                doubles_partners[partner] = {"w": 0, "l": 0}
+            if is_win:
+                doubles_partners[partner]["w"] += 1
+            elif is_loss:
+                doubles_partners[partner]["l"] += 1
+
+            opp_key = " + ".join(sorted(opp_team))
+            if opp_key not in doubles_opponents:
+                doubles_opponents[opp_key] = {"w": 0, "l": 0}
+            if is_win:
+                doubles_opponents[opp_key]["w"] += 1
+            elif is_loss:
+                doubles_opponents[opp_key]["l"] += 1
+
+    def build_stat_df(stat_dict, col_name, sort_by="games"):
+        rows = []
+        for k, v in stat_dict.items():
+            g = v["w"] + v["l"]
+            pct = (v["w"] / g * 100) if g > 0 else 0
+            rows.append({
+                col_name: k,
+                "Zápasů": g,
+                "Výhry": v["w"],
+                "Prohry": v["l"],
+                "__pct": pct,  # Skrytý sloupec pro matematické řazení
+                "Úspěšnost": f"{pct:.1f} %".replace('.', ',')
+            })
+            
+        if not rows:
+            return pd.DataFrame(columns=[col_name, "Zápasů", "Výhry", "Prohry", "Úspěšnost"])
+            
+        df = pd.DataFrame(rows)
+        
+        if sort_by == "pct":
+            # Dvouhra: Primárně % úspěšnosti, sekundárně počet zápasů
+            df = df.sort_values(["__pct", "Zápasů"], ascending=[False, False])
+        else:
+            # Čtyřhra: Primárně počet zápasů, sekundárně % úspěšnosti
+            df = df.sort_values(["Zápasů", "__pct"], ascending=[False, False])
+            
+        # Odstraníme skrytý sloupec před vykreslením
+        return df.drop(columns=["__pct"]).reset_index(drop=True)
+
+    # Tady je definované to nové řazení
+    df_singles = build_stat_df(singles_opponents, "Soupeř (Singles)", sort_by="pct")
+    df_d_partners = build_stat_df(doubles_partners, "Parťák (Doubles)", sort_by="games")
+    df_d_opponents = build_stat_df(doubles_opponents, "Soupeři (Doubles)", sort_by="games")
+
+    return (
+        df_singles,
+        df_d_partners,
+        df_d_opponents,
+        singles_opponents,
+        doubles_partners,
+        doubles_opponents
+    )
+
+def singles_h2h_matches(df: pd.DataFrame, player, opponent, sets_txt):
+    """Vzájemné zápasy dvou hráčů ve dvouhře (v pořadí logu)."""
+    h2h_matches = []
+    for i, r in df.iterrows():
+        if "singles" not in r["type"]: continue
+        ta, tb = get_players(r["team_a"]), get_players(r["team_b"])
+        if (player in ta and opponent in tb) or (player in tb and opponent in ta):
+            winner_name = ta[0] if r["winner"] == "A" else tb[0]
+            h2h_matches.append({
+                "Datum": r["date"],
+                "Zápas": f"{ta[0]} vs {tb[0]}",
+                "Vítěz": winner_name,
+                "Skóre": r["score"],
+                "Sety": sets_txt.at[i]
+            })
+    return h2h_matches
+
+def doubles_partner_matches(log: pd.DataFrame, pair_trajectory, player, partner, sets_txt):
+    """
+    Zápasy ve čtyřhře, kde hráč hrál s daným parťákem (v pořadí logu), s ELO dvojice.
+    Řádky bere z trajektorie dvojice (stav replay_elo), log znovu neprochází.
+    """
+    points = pair_trajectory.get(pair_key(player, partner), [])
+    if not points:
+        return []
+
+    rows = log.loc[[i for i, _, _ in points], ["type", "date", "team_a", "team_b", "winner", "score"]]
+    out = []
+    for (i, delta, rating), r in zip(points, rows.itertuples(index=False)):
+        ta, tb = get_players(r.team_a), get_players(r.team_b)
+        we_ta = player in ta
+        is_win = (we_ta and r.winner == "A") or (not we_ta and r.winner == "B")
+        out.append({
+            "Datum": r.date,
+            "Soupeři": " + ".join(sorted(tb if we_ta else ta)),
+            "Výsledek": "Výhra" if is_win else "Prohra",
+            "Skóre": r.score,
+            "Sety": sets_txt.at[i],
+            "Rozdíl ELO": "" if "friendly" in r.type else f"{'+' if round(delta) >= 0 else ''}{int(round(delta))}",
+            "ELO dvojice po": round(rating, 2),
+        })
+    return out
+
+
+# --- BILANCE SINGLES / DOUBLES ---
+# Výhry a prohry hráčů ve dvouhře a dvojic ve čtyřhře (ranked zápasy, záložka Singles & Doubles).
+# Tabulka má index = hráč / dvojice "A + B" (jména seřazená) v pořadí prvního zápasu
+# a sloupce WL_COLUMNS; drží se ve stavu a nové řádky se do ní jen přičtou.
+WL_KINDS = ("singles", "doubles")
+WL_COLUMNS = ["p1", "p2", "wins", "losses"]
+
+def empty_win_loss() -> pd.DataFrame:
+    return pd.DataFrame({"p1": pd.Series(dtype=object), "p2": pd.Series(dtype=object),
+                         "wins": pd.Series(dtype=np.int64), "losses": pd.Series(dtype=np.int64)},
+                        index=pd.Index([], dtype=object, name="key"))
+
+def _win_loss_frame(keys, p1, p2, won, lost) -> pd.DataFrame:
+    """Řádky (jeden za stranu zápasu) -> součty podle klíče v pořadí prvního výskytu."""
+    if not len(keys):
+        return empty_win_loss()
+    sides = pd.DataFrame({"key": keys, "p1": p1, "p2": p2,
+                          "wins": won.astype(np.int64), "losses": lost.astype(np.int64)})
+    return sides.groupby("key", sort=False).agg(
+        p1=("p1", "first"), p2=("p2", "first"), wins=("wins", "sum"), losses=("losses", "sum"))
+
+def win_loss(log: pd.DataFrame) -> dict:
+    """Z čistého logu: {"singles": bilance hráčů, "doubles": bilance dvojic}."""
+    def interleave(a, b):
+        return np.column_stack([np.asarray(a), np.asarray(b)]).ravel()
+
+    out = {}
+    for kind in WL_KINDS:
+        m = log[log["type"] == kind]
+        win = m["winner"].to_numpy()
+        won, lost = interleave(win == "A", win == "B"), interleave(win == "B", win == "A")
+        if kind == "singles":
+            players = interleave(m["team_a"], m["team_b"])
+            out[kind] = _win_loss_frame(players, players, np.full(len(players), ""), won, lost)
+            continue
+        sides = []
+        for col in ("team_a", "team_b"):
+            t = m[col].str.split("+", n=1, expand=True) if len(m) else pd.DataFrame({0: [], 1: []})
+            x, y = t[0].astype(object), t[1].astype(object)
+            sides.append((x.where(x <= y, y), y.where(x <= y, x)))
+        lo, hi = interleave(sides[0][0], sides[1][0]), interleave(sides[0][1], sides[1][1])
+        keys = pd.Series(lo, dtype=object) + " + " + pd.Series(hi, dtype=object)
+        out[kind] = _win_loss_frame(keys.to_numpy(), lo, hi, won, lost)
+    return out
+
+def merge_win_loss(old: dict, new: dict) -> dict:
+    """Přičte bilance z nových řádků; nové hráče/dvojice přidá na konec (pořadí prvního zápasu)."""
+    out = {}
+    for kind in WL_KINDS:
+        a, b = old[kind], new[kind]
+        if b.empty:
+            out[kind] = a
+            continue
+        known = b.index.isin(a.index)
+        merged = a.copy()
+        common = b.index[known]
+        merged.loc[common, ["wins", "losses"]] += b.loc[common, ["wins", "losses"]].to_numpy()
+        out[kind] = pd.concat([merged, b[~known]]) if (~known).any() else merged
+    return out
+
+
+# --- DUPLICITY ZÁPASŮ ---
+# Otisk zápasu nezávislý na pořadí hráčů v týmu i na tom, kterou stranu kdo zadal jako A.
+# Index otisk -> řádek sheetu dovolí odhalit stejný výsledek zadaný dvakrát ještě před zápisem.
+
+def match_key(rtype, date, team_a, team_b, winner, score):
+    """(datum, typ, tým, tým, vítěz, skóre) se stranami v pevném pořadí."""
+    d = parse_ddmmyyyy(date)
+    ta, tb = tuple(sorted(get_players(team_a))), tuple(sorted(get_players(team_b)))
+    winner, score = str(winner).strip(), str(score).strip()
+    if tb < ta:
+        ta, tb = tb, ta
+        winner = {"A": "B", "B": "A"}.get(winner, winner)
+        score = ":".join(reversed(score.split(":")))
+    return (d.isoformat() if d else str(date).strip(), str(rtype).strip(), ta, tb, winner, score)
+
+def match_index(log: pd.DataFrame) -> dict:
+    """Otisk -> index řádku (první výskyt) pro zápasy v logu."""
+    m = log[log["type"].isin(MATCH_TYPES)]
+    idx = {}
+    for i, rtype, d, a, b, w, sc in zip(m.index, m["type"], m["date"], m["team_a"], m["team_b"], m["winner"], m["score"]):
+        idx.setdefault(match_key(rtype, d, a, b, w, sc), i)
+    return idx
+
+
+# --- CELKOVÝ STAV ---
+@dataclass
+class EngineState:
+    """Zpracovaný log + odvozené výsledky pro jednu verzi dat (to, co se ukládá do snapshotu)."""
+    events: pd.DataFrame             # řádky sheetu (COLUMNS), index = pořadí v sheetu
+    hashes: np.ndarray               # otisk každého řádku (row_hashes)
+    log: pd.DataFrame                # čistý log v kanonickém pořadí (canonical_order), index = pořadí v sheetu
+    report: pd.DataFrame             # opravené a vyřazené řádky s důvody
+    games: np.ndarray                # sety řádků logu jako pole gemů (match_sets.decode_sets)
+    sets_txt: pd.Series              # sety jako text pro tabulky (index jako log)
+    elo: dict                        # stav replay_elo po celém logu
+    history: pd.DataFrame            # kompletní historie (build_full_history)
+    win_loss: dict                   # bilance Singles/Doubles (win_loss)
+    tail_date: object = None         # datum posledního řádku logu (nové řádky starší -> plný přepočet)
+    remote_version: str = None       # verze sheetu, ze které stav vznikl (lastUpdateTime)
+    data_version: str = field(default="")
+    match_index: dict = None         # otisk zápasu -> index řádku (match_index), ze snapshotu se dopočítá
+
+    def __post_init__(self):
+        if not self.data_version:
+            self.data_version = data_version(self.hashes)
+        if self.match_index is None:
+            self.match_index = match_index(self.log)
+
+    @property
+    def elo_meta(self):
+        return elo_meta(self.elo)
+
+    def player_history(self, target):
+        return player_history(self.log, self.elo["trajectory"], target, self.sets_txt)
+
+    def partner_matches(self, player, partner):
+        return doubles_partner_matches(self.log, self.elo["pair_trajectory"], player, partner, self.sets_txt)
+
+def _tail_date(log):
+    """Datum posledního řádku logu v kanonickém pořadí (prázdný log -> datetime.min)."""
+    return event_dates(log).iloc[-1].date() if len(log) else datetime.min.date()
+
+def build_state(df: pd.DataFrame, remote_version=None) -> EngineState:
+    """Kompletní přepočet ze všech řádků."""
+    df = df.reset_index(drop=True)
+    log, report = validate_events(df)
+    log = canonical_order(log)
+    games, sets_txt = decode_sets(log["sets"])
+    elo = replay_elo(log)
+    history = history_frame(replay_full_history(_history_rows(log, sets_txt), INITIAL_RATINGS.copy()))
+
+    return EngineState(
+        events=df, hashes=row_hashes(df), log=log, report=report, games=games, sets_txt=sets_txt,
+        elo=elo, history=history, win_loss=win_loss(log),
+        tail_date=_tail_date(log), remote_version=remote_version,
+    )
+
+def advance_state(state, df: pd.DataFrame, remote_version=None) -> EngineState:
+    """
+    Nový stav pro aktuální data. Pokud jen přibyly řádky na konec sheetu (stará data jsou
+    prefixem nových) a žádný z nich není starší než konec logu, přehrají se jen ty nové;
+    jinak (smazání, úprava, zpětně zapsaný zápas) proběhne plný přepočet.
+    """
+    df = df.reset_index(drop=True)
+    if state is None:
+        return build_state(df, remote_version)
+
+    hashes = row_hashes(df)
+    n_old = len(state.events)
+    if len(df) < n_old or data_version(hashes[:n_old]) != state.data_version:
+        return build_state(df, remote_version)
+    if len(df) == n_old:
+        state.remote_version = remote_version
+        return state
+
+    new_rows, new_report = validate_events(df.iloc[n_old:])
+    new_rows = canonical_order(new_rows)
+    # Nové řádky se řadí za stávající log; zpětně zapsaný zápas by kanonické pořadí porušil
+    if len(new_rows) and event_dates(new_rows).iloc[0].date() < state.tail_date:
+        return build_state(df, remote_version)
+    new_games, new_txt = decode_sets(new_rows["sets"])
+
+    # Kopie, starý stav může ještě někdo číst
+    elo = {k: dict(v) for k, v in state.elo.items()}
+    trajectory = elo["trajectory"]
+    for p in set(get_players("+".join(new_rows["team_a"]))) | set(get_players("+".join(new_rows["team_b"]))):
+        if p in trajectory:
+            trajectory[p] = list(trajectory[p])  # seznamy se jen připisují, kopírují se jen dotčení hráči
+    pair_trajectory = elo["pair_trajectory"]
+    teams = (get_players(t) for t in pd.concat([new_rows["team_a"], new_rows["team_b"]]))
+    for k in {pair_key(*t) for t in teams if len(t) == 2} & pair_trajectory.keys():
+        pair_trajectory[k] = list(pair_trajectory[k])
+    h_ratings = dict(state.elo["ratings"])  # historie i ELO jdou stejným pořadím -> stejný výchozí stav
+    replay_elo(new_rows, elo)
+
+    m_index = dict(state.match_index)
+    for key, i in match_index(new_rows).items():
+        m_index.setdefault(key, i)
+    added = history_frame(replay_full_history(_history_rows(new_rows, new_txt), h_ratings))
+    history = pd.concat([added, state.history], ignore_index=True) if not added.empty else state.history
+    log = pd.concat([state.log, new_rows])
+
+    return EngineState(
+        events=df, hashes=hashes, log=log,
+        report=pd.concat([state.report, new_report]) if not new_report.empty else state.report,
+        games=np.concatenate([state.games, new_games]),
+        sets_txt=pd.concat([state.sets_txt, new_txt]), elo=elo,
+        history=history, win_loss=merge_win_loss(state.win_loss, win_loss(new_rows)),
+        tail_date=_tail_date(log) if len(new_rows) else state.tail_date,
+        remote_version=remote_version, match_index=m_index,
+    )
@@ -0,0 +1,623 @@
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+import snapshot
+from elo_engine import COLUMNS, advance_state, build_state
+
+# --- ROZDÍLOVÁ KONTROLA JADER ---
+# Náhodné logy (zpětně zapsané řádky, úpravy ELO, přáteláky, konce kariéry i rozbité buňky)
+# se spočítají referenčními funkcemi a každým kandidátem a výsledky se porovnají:
+#   ELO (legacy_compute_elo_with_meta)            původní tenis.py, doslova
+#   kompletní historie (legacy_build_full_history)  původní tenis.py, doslova
+#   historie hráče (legacy_build_player_history)   původní tenis.py, doslova
+#   ELO dvojic (legacy_pair_ratings)          samostatné přehrání dvojic ve čtyřhře
+#   zápasy s parťákem (legacy_partner_matches)  průchod celým logem
+# Reference nepoužívají nic z elo_engine ani match_sets a běží nad surovými řádky sheetu
+# (mezery, data bez nul, " + " v týmech, sety s apostrofem). Jen tam, kde jádro chování
+# záměrně mění, dostanou řádky tak, jak je popisuje zadání – připraví je generátor logu,
+# ne validate_events: vyřazené řádky (rozbité datum, typ, hráči, vítěz) chybí, nečitelná
+# změna ELO je 0, nečitelné sety jsou vynechané a řádky jsou v kanonickém pořadí
+# (podle data, v rámci dne podle sheetu).
+# Kandidát = funkce log -> {"elo_meta", "history", "player_history"}; chybějící klíč se neporovnává.
+# Nové (rychlejší) jádro se přidá do CANDIDATES a musí projít beze změny čísel.
+#
+#   python engine_check.py [--logs 30] [--rows 400] [--seed 0] [--tol 1e-9] [--only state,incremental]
+
+K_SINGLES = 24
+K_DOUBLES = 36
+SCALE = 400
+
+INITIAL_RATINGS = {
+    "Tobi": 1200, "Kuba": 1100, "Jirka": 1040,
+    "Kávič": 1040, "Ríša": 1030, "Novas": 1030
+}
+
+PLAYERS = list(INITIAL_RATINGS) + ["Danda", "Pepa"]
+SETS = ["6,4", "4,6,7,6", "6,3,3,6,10,8", "'6,2", "7,5 , 6,7, 6,4", "x,3", "6;4", ""]
+SETS_READABLE = {"x,3": "3", "6;4": ""}  # nečitelné sety jádro vynechá
+
+
+# --- REFERENCE ---
+# Funkce z tenis.py před rozdělením do elo_engine (c60617f), zkopírované doslova. Odchylky:
+# df jako parametr místo load_data(), bez @st.cache_data a stabilní řazení v build_full_history
+# (původní quicksort přeházel řádky v rámci dne; kanonické pořadí je dnes pravidlo).
+
+def get_players(team_str):
+    """Rozdělí řetězec týmu (např. 'Tobi+Kuba') na seznam jmen."""
+    return [p.strip() for p in str(team_str).split("+") if p.strip()]
+
+def format_sets_display(sets_raw):
+    """Převede starý formát s ohledem na to, kdo set vyhrál (podle znaménka mínus)."""
+    if not sets_raw: return ""
+    s = str(sets_raw).strip("'").strip()
+    if not s: return ""
+
+    if ":" in s:
+        return s
+
+    parts = [p.strip() for p in s.replace(" ", ",").split(",") if p.strip()]
+    formatted = []
+
+    for p in parts:
+        if p == "-0":
+            formatted.append("0:6")
+            continue
+        if p == "0":
+            formatted.append("6:0")
+            continue
+
+        try:
+            v = int(p)
+            n = abs(v)
+
+            if n == 6:
+                if v > 0: formatted.append("7:6")
+                else: formatted.append("6:7")
+            elif n >= 5:
+                if v > 0: formatted.append("7:5")
+                else: formatted.append("5:7")
+            else:
+                if v > 0: formatted.append(f"6:{n}")
+                else: formatted.append(f"{n}:6")
+        except:
+            formatted.append(p)
+
+    return ", ".join(formatted)
+
+def legacy_compute_elo_with_meta(df):
+    ratings = INITIAL_RATINGS.copy()
+
+    # startovní ELO pro výpočet total_delta
+    base = {p: float(v) for p, v in ratings.items()}
+
+    last_date = {}          # poslední zápas (singles/doubles/friendly)
+    total_delta = {}        # finální - start
+    last_delta = {}         # poslední změna (ranked/adjust; friendly=0)
+    played_elo_match = {}   # měl někdy ranked match (singles/doubles)
+
+    def parse_team(s: str):
+        return [x.strip() for x in str(s).split("+") if x.strip()]
+
+    def parse_date(s: str):
+        try:
+            return datetime.strptime(str(s).strip(), "%d.%m.%Y").date()
+        except:
+            return None
+
+    def ensure_player(p: str):
+        ratings.setdefault(p, 1000.0)
+        base.setdefault(p, 1000.0)
+        last_date.setdefault(p, None)
+        last_delta.setdefault(p, 0.0)
+        played_elo_match.setdefault(p, False)
+
+    for _, r in df.iterrows():
+        rtype = str(r.get("type", "")).strip()
+        d = parse_date(r.get("date", ""))
+
+        # --- adjust ---
+        if rtype == "adjust":
+            p = str(r.get("team_a", "")).strip()
+            try:
+                delta = float(r.get("team_b", 0))
+            except:
+                delta = 0.0
+
+            ensure_player(p)
+            ratings[p] += delta
+            last_delta[p] = delta
+            continue
+
+        # --- friendly ---
+        if rtype in ["friendly_singles", "friendly_doubles"]:
+            team_a = parse_team(r.get("team_a", ""))
+            team_b = parse_team(r.get("team_b", ""))
+
+            for p in team_a + team_b:
+                ensure_player(p)
+                last_delta[p] = 0.0
+                if d:
+                    last_date[p] = d
+            continue
+
+        # --- ranked matches ---
+        if rtype in ["singles", "doubles"]:
+            team_a = parse_team(r.get("team_a", ""))
+            team_b = parse_team(r.get("team_b", ""))
+            winner = str(r.get("winner", "")).strip()
+
+            for p in team_a + team_b:
+                ensure_player(p)
+
+            ra = sum(ratings[p] for p in team_a) / max(1, len(team_a))
+            rb = sum(ratings[p] for p in team_b) / max(1, len(team_b))
+            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
+            sa = 1.0 if winner == "A" else 0.0
+
+            k = K_SINGLES if rtype == "singles" else K_DOUBLES
+            delta = k * (sa - ea)
+
+            da = delta / max(1, len(team_a))
+            db = -delta / max(1, len(team_b))
+
+            for p in team_a:
+                ratings[p] += da
+                last_delta[p] = da
+                played_elo_match[p] = True
+                if d:
+                    last_date[p] = d
+
+            for p in team_b:
+                ratings[p] += db
+                last_delta[p] = db
+                played_elo_match[p] = True
+                if d:
+                    last_date[p] = d
+
+    # total delta = finální - start (base)
+    for p in ratings.keys():
+        ensure_player(p)
+        total_delta[p] = ratings[p] - base.get(p, 1000.0)
+
+    return ratings, last_date, total_delta, last_delta, played_elo_match
+
+def legacy_build_player_history(df, target):
+    ratings = INITIAL_RATINGS.copy()
+    ratings.setdefault(target, 1000.0)
+
+    hist = []
+
+    for _, r in df.iterrows():
+        rtype = str(r.get("type", "")).strip()
+        rawd = str(r.get("date", "")).strip()
+        winner = str(r.get("winner", "")).strip()
+        score = str(r.get("score", "")).strip()
+        sets_raw = str(r.get("sets", "")).strip()
+        reason = str(r.get("reason", "")).strip()
+        author = str(r.get("author", "")).strip()
+
+        # 1. Manuální úpravy
+        if rtype == "adjust":
+            p = str(r.get("team_a", "")).strip()
+            try:
+                delta = float(r.get("team_b", 0))
+            except:
+                continue
+
+            ratings[p] = ratings.get(p, 1000.0) + delta
+
+            if p == target:
+                is_add_player = reason.startswith("Přidání hráče")
+                if is_add_player:
+                    hist.append({
+                        "Datum": rawd, "Typ": "Přidání hráče", "Zápas": f"Nastaveno na {int(round(ratings[target]))}",
+                        "Výsledek": "", "Skóre": "", "Sety": "", "Rozdíl ELO": "", "ELO po": round(ratings[target], 2)
+                    })
+                else:
+                    hist.append({
+                        "Datum": rawd, "Typ": "Úprava ELO", "Zápas": f"Manuální úprava — {reason}".strip(' —'),
+                        "Výsledek": "", "Skóre": "", "Sety": "", "Rozdíl ELO": f"{'+' if delta >= 0 else ''}{int(delta)}", "ELO po": round(ratings[target], 2)
+                    })
+            continue
+
+        # 2. Zápasy
+        if rtype in ["singles", "doubles", "friendly_singles", "friendly_doubles"]:
+            team_a = [p.strip() for p in str(r.get("team_a", "")).split("+") if p.strip()]
+            team_b = [p.strip() for p in str(r.get("team_b", "")).split("+") if p.strip()]
+            if not team_a or not team_b: continue
+
+            for p in team_a + team_b:
+                ratings.setdefault(p, 1000.0)
+
+            is_friendly = "friendly" in rtype
+            base_type = "Singles" if "singles" in rtype else "Doubles"
+
+            ra = sum(ratings[p] for p in team_a) / len(team_a)
+            rb = sum(ratings[p] for p in team_b) / len(team_b)
+            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
+            sa = 1.0 if winner == "A" else 0.0
+
+            k = 0 if is_friendly else (K_SINGLES if "singles" in rtype else K_DOUBLES)
+            delta_a = k * (sa - ea)
+            delta_b = -delta_a
+
+            per_player_delta = {}
+            for p in team_a: per_player_delta[p] = delta_a / len(team_a)
+            for p in team_b: per_player_delta[p] = delta_b / len(team_b)
+
+            for p, d in per_player_delta.items():
+                ratings[p] = ratings.get(p, 1000.0) + d
+
+            if target in per_player_delta:
+                d_pl = per_player_delta[target]
+                res = "Výhra" if ((winner == "A" and target in team_a) or (winner == "B" and target in team_b)) else "Prohra"
+                match_txt = f"{' + '.join(team_a)} 🆚 {' + '.join(team_b)}"
+
+                # Zde aplikujeme formátování na sety
+                pretty_sets = format_sets_display(sets_raw)
+
+                hist.append({
+                    "Datum": rawd,
+                    "Typ": "Přátelák" if is_friendly else base_type,
+                    "Zápas": match_txt,
+                    "Výsledek": res,
+                    "Skóre": score,
+                    "Sety": pretty_sets,
+                    "Rozdíl ELO": "" if is_friendly else f"{'+' if round(d_pl) >= 0 else ''}{int(round(d_pl))}",
+                    "ELO po": round(ratings[target], 2)
+                })
+
+    if not hist:
+        return pd.DataFrame(columns=["Datum", "Typ", "Zápas", "Výsledek", "Skóre", "Sety", "Rozdíl ELO", "ELO po"])
+
+    return pd.DataFrame(hist).iloc[::-1]
+
+def legacy_build_full_history(df: pd.DataFrame) -> pd.DataFrame:
+    ratings = INITIAL_RATINGS.copy()
+
+    # 1. Příprava dat a indexů řádků
+    tmp = df.copy()
+    tmp["sheet_row"] = tmp.index + 2
+
+    def parse_team(s: str):
+        return [x.strip() for x in str(s).split("+") if x.strip()]
+
+    def parse_date(s: str):
+        try:
+            return datetime.strptime(str(s).strip(), "%d.%m.%Y").date()
+        except:
+            return None
+
+    # Pomocná funkce definovaná přímo zde, aby ji build_full_history viděla
+    def ensure_player(p: str):
+        ratings.setdefault(p, 1000.0)
+
+    # Řazení
+    tmp["__dt"] = tmp["date"].apply(parse_date)
+    tmp = tmp.sort_values("__dt", ascending=True, kind="stable").drop(columns=["__dt"])
+
+    out = []
+
+    for _, r in tmp.iterrows():
+        rtype = str(r.get("type", "")).strip()
+        rawd = str(r.get("date", "")).strip()
+        winner = str(r.get("winner", "")).strip()
+        score = str(r.get("score", "")).strip()
+        reason = str(r.get("reason", "")).strip()
+        author = str(r.get("author", "")).strip()
+
+        # --- ADJUST ---
+        if rtype == "adjust":
+            p = str(r.get("team_a", "")).strip()
+            if not p: continue
+
+            try:
+                delta = float(r.get("team_b", 0))
+            except:
+                delta = 0.0
+
+            ensure_player(p)
+            ratings[p] = ratings.get(p, 1000.0) + delta
+
+            is_add_player = reason.startswith("Přidání hráče")
+            if is_add_player:
+                typ, zapas, duvod = "Přidání hráče", f"{p} — Nastaveno na {int(round(ratings[p]))}", reason
+            else:
+                typ, zapas, duvod = "Úprava ELO", f"{p} (Změna: {'+' if delta >= 0 else ''}{int(delta)})", reason
+
+            out.append({
+                "Datum": rawd, "Typ": typ, "Zápas": zapas, "Důvod": duvod,
+                "Výsledek": "", "Skóre": "", "Zapsal": author, "row_idx": r["sheet_row"]
+            })
+            continue
+
+        # --- MATCH ---
+        if rtype in ["singles", "doubles", "friendly_singles", "friendly_doubles"]:
+            team_a = parse_team(r.get("team_a", ""))
+            team_b = parse_team(r.get("team_b", ""))
+            if not team_a or not team_b: continue
+
+            for p in team_a + team_b: ensure_player(p)
+
+            is_friendly = "friendly" in rtype
+            typ = "Přátelák" if is_friendly else ("Singles" if "singles" in rtype else "Doubles")
+
+            ra = sum(ratings[p] for p in team_a) / max(1, len(team_a))
+            rb = sum(ratings[p] for p in team_b) / max(1, len(team_b))
+            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
+            sa = 1.0 if winner == "A" else 0.0
+
+            k = 0 if is_friendly else (K_SINGLES if "singles" in rtype else K_DOUBLES)
+            delta = k * (sa - ea)
+            da, db = delta / max(1, len(team_a)), -delta / max(1, len(team_b))
+
+            for p in team_a: ratings[p] += da
+            for p in team_b: ratings[p] += db
+
+            vysledek = f"Vítěz: {' + '.join(team_a if winner == 'A' else team_b)}" if winner in ["A", "B"] else "Remíza"
+
+            out.append({
+                "Datum": rawd, "Typ": typ, "Zápas": f"{' + '.join(team_a)} 🆚 {' + '.join(team_b)}",
+                "Důvod": "", "Výsledek": vysledek, "Skóre": score,
+                "Sety": format_sets_display(r.get("sets", "")),
+                "Zapsal": author,
+                "row_idx": r["sheet_row"]
+            })
+
+    if not out:
+        return pd.DataFrame(columns=["Datum", "Typ", "Zápas", "Důvod", "Výsledek", "Skóre", "Zapsal", "row_idx"])
+
+    return pd.DataFrame(out).iloc[::-1].reset_index(drop=True)
+
+
+def legacy_pair_ratings(df):
+    """ELO dvojic nezávisle na replay_elo: každá dvojice jako jeden hráč od 1000, K_DOUBLES."""
+    pairs = {}
+    for _, r in df[df["type"].str.strip() == "doubles"].iterrows():
+        ka, kb = (" + ".join(sorted(get_players(r[t]))) for t in ("team_a", "team_b"))
+        ra, rb = pairs.get(ka, 1000.0), pairs.get(kb, 1000.0)
+        ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
+        delta = K_DOUBLES * ((1.0 if r["winner"].strip() == "A" else 0.0) - ea)
+        pairs[ka], pairs[kb] = ra + delta, rb - delta
+    for _, r in df[df["type"].str.strip() == "friendly_doubles"].iterrows():
+        for t in ("team_a", "team_b"):
+            pairs.setdefault(" + ".join(sorted(get_players(r[t]))), 1000.0)
+    return pairs
+
+
+def legacy_partner_matches(df, player, partner):
+    """Zápasy dvojice průchodem celým logem (původní doubles_partner_matches nad surovými řádky)."""
+    out = []
+    for _, r in df.iterrows():
+        if "doubles" not in r["type"]:
+            continue
+
+        ta = get_players(r["team_a"])
+        tb = get_players(r["team_b"])
+
+        we_ta = player in ta and partner in ta
+        we_tb = player in tb and partner in tb
+
+        if we_ta or we_tb:
+            opps_str = " + ".join(sorted(tb if we_ta else ta))
+            winner = str(r["winner"]).strip()
+            is_win = (we_ta and winner == "A") or (we_tb and winner == "B")
+
+            out.append({
+                "Datum": str(r["date"]).strip(),
+                "Soupeři": opps_str,
+                "Výsledek": "Výhra" if is_win else "Prohra",
+                "Skóre": str(r["score"]).strip(),
+                "Sety": format_sets_display(r["sets"])
+            })
+    return out
+
+
+# --- NÁHODNÉ LOGY ---
+def random_log(n, seed):
+    """
+    Řádky sheetu (DataFrame COLUMNS) se vším, co se v reálných datech objevilo, a k nim
+    vstup pro reference: surové řádky bez vyřazených, se záměrnými opravami, v kanonickém
+    pořadí (index = pozice v sheetu).
+    """
+    rng = random.Random(seed)
+    rows, ref, day = [], [], 0
+    for pos in range(n):
+        day += rng.random() < 0.3
+        d = max(day - rng.randint(1, 40), 0) if rng.random() < 0.1 else day  # zpětně zapsaný zápas
+        date = pd.Timestamp("2025-01-01") + pd.Timedelta(days=d)
+        date = f"{date.day}.{date.month}.{date.year}" if rng.random() < 0.2 else date.strftime("%d.%m.%Y")
+        if rng.random() < 0.03:
+            date = rng.choice(["", "32.13.2025", "zítra", " " + date])
+        bad = not date.strip() or date in ("32.13.2025", "zítra")
+        t = rng.random()
+        if t < 0.08:
+            delta = rng.choice([str(rng.randint(-30, 30)), "+0", "abc", ""])
+            reason = rng.choice(["Přidání hráče(1000 ELO)", "oprava", ""])
+            player = rng.choice(PLAYERS + [""])
+            row = [date, "adjust", player, delta, "", "", "", reason, "Tobi"]
+            fixed = row[:3] + ["0" if delta in ("abc", "") else delta] + row[4:]
+            bad |= not player
+        elif t < 0.11:
+            status = rng.choice(["retired", "active", "?"])
+            row = fixed = [date, "career_toggle", rng.choice(PLAYERS), status, "", "", "", "", "Tobi"]
+            bad |= status == "?"
+        elif t < 0.12:
+            row = fixed = [rng.choice(["", date]), rng.choice(["", "tenis", "singles "]), "", "", "", "", "", "", ""]
+            bad = True
+        else:
+            rtype = rng.choice(["singles", "doubles", "friendly_singles", "friendly_doubles"])
+            ps = rng.sample(PLAYERS, 2 if "singles" in rtype else 4)
+            if rng.random() < 0.02:
+                ps = ps[:-1] + ps[:1]  # hráč dvakrát / špatný počet
+                bad = True
+            half = len(ps) // 2
+            team_a, team_b = "+".join(ps[:half]), " + ".join(ps[half:]) if rng.random() < 0.1 else "+".join(ps[half:])
+            winner = rng.choice(["A", "B"]) if rng.random() > 0.02 else rng.choice(["", "C"])
+            bad |= winner not in ("A", "B")
+            sets = rng.choice(SETS)
+            row = [date, rtype, team_a, team_b, winner, rng.choice(["2:0", "1:2", "2:1"]), sets, "", "Tobi"]
+            fixed = row[:6] + [SETS_READABLE.get(sets, sets)] + row[7:]
+        rows.append(row)
+        if not bad:
+            ref.append((d, pos, fixed))
+
+    ref.sort(key=lambda x: x[:2])
+    return (pd.DataFrame(rows, columns=COLUMNS),
+            pd.DataFrame([r for *_, r in ref], columns=COLUMNS, index=[pos for _, pos, _ in ref]))
+
+
+# --- KANDIDÁTI ---
+def _state_result(state):
+    return {"elo_meta": state.elo_meta, "history": state.history, "player_history": state.player_history,
+            "pairs": state.elo["pairs"], "partner_matches": state.partner_matches}
+
+
+def cand_state(df):
+    """build_state: celý přepočet do EngineState."""
+    return _state_result(build_state(df))
+
+
+def cand_incremental(df, chunks=4):
+    """advance_state po kouscích (jako přibývající řádky sheetu)."""
+    state = None
+    for end in sorted({len(df) * k // chunks for k in range(1, chunks + 1)}):
+        state = advance_state(state, df.iloc[:end])
+    return _state_result(state)
+
+
+def cand_snapshot(df):
+    """advance_state + uložení a načtení snapshotu."""
+    state = build_state(df.iloc[:len(df) // 2])
+    state = advance_state(state, df)
+    with tempfile.TemporaryDirectory() as d:
+        snapshot.save(state, d)
+        loaded = snapshot.load(d)
+    return _state_result(loaded)
+
+
+def cand_season(df):
+    """seasons: jedna sezóna přes všechna data bez resetu = globální ELO."""
+    import seasons
+
+    state = build_state(df)
+    one = [("vše", pd.Timestamp.min.date(), pd.Timestamp.max.date())]
+    season = seasons.update_seasons(None, state.log, state.hashes, pd.Timestamp.now().date(), one)[0]
+    return {"elo_meta": season.elo_meta, "pairs": season.elo["pairs"]}
+
+
+CANDIDATES = {"state": cand_state, "incremental": cand_incremental, "snapshot": cand_snapshot, "season": cand_season}
+
+
+# --- POROVNÁNÍ ---
+def diff_values(name, a, b, tol):
+    """První rozdíl dvou slovníků hráč -> hodnota nebo None."""
+    if set(a) != set(b):
+        return f"{name}: jiní hráči {sorted(set(a) ^ set(b))}"
+    for p in a:
+        x, y = a[p], b[p]
+        same = abs(x - y) <= tol if isinstance(x, float) and isinstance(y, float) else x == y
+        if not same:
+            return f"{name}[{p}]: {x!r} != {y!r}"
+    return None
+
+
+def diff_elo_meta(ref, got, tol):
+    """První rozdíl v (ratings, last_date, total_delta, last_delta, played) nebo None."""
+    names = ["ratings", "last_date", "total_delta", "last_delta", "played_elo_match"]
+    return next(filter(None, (diff_values(name, a, b, tol) for name, a, b in zip(names, ref, got))), None)
+
+
+def diff_frames(ref, got, tol):
+    try:
+        assert_frame_equal(ref.reset_index(drop=True), got.reset_index(drop=True),
+                           check_dtype=False, check_like=True, check_exact=False, atol=tol, rtol=0)
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0] + " …"
+    return None
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def check_log(df, ref, candidates, tol, timings):
+    """Porovná kandidáty s referencí na jednom logu (df = řádky sheetu, ref = vstup referencí); vrací seznam rozdílů."""
+    ref_elo, t = _timed(legacy_compute_elo_with_meta, ref)
+    timings["reference"].append(t)
+    ref_hist, t = _timed(legacy_build_full_history, ref)
+    timings["reference"][-1] += t
+    players = sorted(ref_elo[0])
+    ref_player, t = _timed(lambda: {p: legacy_build_player_history(ref, p) for p in players})
+    timings["reference"][-1] += t
+    ref_pairs, t = _timed(legacy_pair_ratings, ref)
+    timings["reference"][-1] += t
+    pair_names = [k.split(" + ") for k in ref_pairs]
+    ref_partner, t = _timed(lambda: {(p, q): pd.DataFrame(legacy_partner_matches(ref, p, q))
+                                     for p, q in pair_names})
+    timings["reference"][-1] += t
+
+    problems = []
+    for name, cand in candidates.items():
+        t0 = time.perf_counter()
+        got = cand(df)
+        per_player = {p: got["player_history"](p) for p in players} if "player_history" in got else None
+        per_pair = ({(p, q): pd.DataFrame(got["partner_matches"](q, p)) for p, q in pair_names}
+                    if "partner_matches" in got else None)
+        timings[name].append(time.perf_counter() - t0)
+
+        diffs = []
+        if "elo_meta" in got:
+            diffs.append(("ELO", diff_elo_meta(ref_elo, got["elo_meta"], tol)))
+        if "history" in got:
+            diffs.append(("historie", diff_frames(ref_hist, got["history"], tol)))
+        if per_player is not None:
+            diffs += [(f"historie {p}", diff_frames(ref_player[p], per_player[p], tol)) for p in players]
+        if "pairs" in got:
+            diffs.append(("ELO dvojic", diff_values("pairs", ref_pairs, got["pairs"], tol)))
+        if per_pair is not None:
+            diffs += [(f"zápasy {p} + {q}", diff_frames(ref_partner[p, q], per_pair[p, q][ref_partner[p, q].columns], tol))
+                      for p, q in pair_names]
+        problems += [f"{name}: {what}: {d}" for what, d in diffs if d]
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rozdílová kontrola: referenční přehrání vs. optimalizovaná jádra.")
+    ap.add_argument("--logs", type=int, default=30, help="počet náhodných logů")
+    ap.add_argument("--rows", type=int, default=400, help="řádků v jednom logu")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--tol", type=float, default=1e-9, help="povolená odchylka čísel")
+    ap.add_argument("--only", help="jen vybraní kandidáti (čárkou)")
+    args = ap.parse_args()
+
+    candidates = {k: v for k, v in CANDIDATES.items() if not args.only or k in args.only.split(",")}
+    timings = {name: [] for name in ["reference", *candidates]}
+    failed = 0
+    for i in range(args.logs):
+        df, ref = random_log(args.rows, args.seed + i)
+        problems = check_log(df, ref, candidates, args.tol, timings)
+        if problems:
+            failed += 1
+            print(f"❌ log seed={args.seed + i}:")
+            for p in problems[:10]:
+                print(f"   {p}")
+
+    print(f"{args.logs - failed}/{args.logs} logů po {args.rows} řádcích shodných")
+    for name, ts in timings.items():
+        print(f"  {name:<12} medián {statistics.median(ts) * 1000:8.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
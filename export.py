@@ -0,0 +1,319 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+import pandas as pd
+
+import sheets
+import snapshot
+from elo_engine import (
+    MATCH_TYPES, compute_player_stats, data_version,
+    get_players, get_retired_players, ranking_rows,
+)
+
+# --- STATICKÝ EXPORT ---
+# Žebříček, historie, stránky hráčů (historie + graf ELO) a H2H matice jako obyčejné
+# HTML + JSON soubory pro běžný file server. Prohlížení pak nestojí Streamlit session.
+#
+#   python export.py site/ [--snapshot-dir .snapshot] [--no-sync] [--force]
+#
+# Export je přírůstkový: export.json si pamatuje verzi dat a otisk každé stránky.
+# Když od minulého exportu jen přibyly řádky na konec sheetu, stránky hráčů se přepočítají
+# jen pro hráče z nových řádků; zapíše se jen soubor, jehož obsah se opravdu změnil.
+
+EXPORT_FORMAT = 1  # zvýšit při změně vzhledu stránek (další export pak přepíše vše)
+MANIFEST = "export.json"
+
+CSS = """
+body{font-family:system-ui,sans-serif;background:#0e1117;color:#fafafa;margin:0 auto;max-width:1100px;padding:16px}
+a{color:#7dd3fc;text-decoration:none} a:hover{text-decoration:underline}
+nav a{margin-right:16px;font-weight:700}
+table{border-collapse:collapse;width:100%;font-size:13px;margin:12px 0}
+th{background:rgba(255,255,255,0.06);border-bottom:1px solid rgba(255,255,255,0.10);font-weight:800}
+th,td{padding:6px 8px;text-align:center;border-bottom:1px solid rgba(255,255,255,0.05)}
+td.me{background:rgba(255,255,255,0.03)}
+svg{background:rgba(255,255,255,0.03);border-radius:8px}
+"""
+
+
+def slugify(name):
+    """Jméno hráče -> název souboru (bez diakritiky, malými písmeny)."""
+    s = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", s.lower()).strip("-") or "hrac"
+
+
+def player_slugs(players):
+    """Jednoznačné názvy souborů pro všechny hráče (kolize dostanou pořadové číslo)."""
+    out, used = {}, set()
+    for p in sorted(players):
+        base = slug = slugify(p)
+        n = 2
+        while slug in used:
+            slug, n = f"{base}-{n}", n + 1
+        used.add(slug)
+        out[p] = slug
+    return out
+
+
+def _records(df):
+    """DataFrame -> seznam slovníků s None místo NaN."""
+    if df is None or df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _json_default(o):
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+def _json(payload):
+    return json.dumps(payload, ensure_ascii=False, default=_json_default, indent=1).encode("utf-8")
+
+
+# --- H2H MATICE ---
+def h2h_matrices(log: pd.DataFrame):
+    """
+    Jedním průchodem logu: {hráč: {soupeř: [výhry, prohry]}} pro dvouhru
+    a {hráč: {parťák: [výhry, prohry]}} pro čtyřhru (včetně přáteláků, jako Statistika hráče).
+    """
+    singles, partners = {}, {}
+    m = log[log["type"].isin(MATCH_TYPES)]
+    for rtype, a, b, winner in zip(m["type"], m["team_a"], m["team_b"], m["winner"]):
+        ta, tb = get_players(a), get_players(b)
+        sides = ((ta, tb, winner == "A"), (tb, ta, winner == "B"))
+        if "singles" in rtype and len(ta) == 1 and len(tb) == 1:
+            for me, opp, won in sides:
+                cell = singles.setdefault(me[0], {}).setdefault(opp[0], [0, 0])
+                cell[0 if won else 1] += 1
+        elif "doubles" in rtype and len(ta) == 2 and len(tb) == 2:
+            for me, _, won in sides:
+                for p, q in ((me[0], me[1]), (me[1], me[0])):
+                    cell = partners.setdefault(p, {}).setdefault(q, [0, 0])
+                    cell[0 if won else 1] += 1
+    return singles, partners
+
+
+# --- HTML ---
+def _page(title, body):
+    return (
+        "<!doctype html><html lang='cs'><head><meta charset='utf-8'>"
+        "<meta name='viewport' content='width=device-width,initial-scale=1'>"
+        f"<title>{html.escape(title)}</title><style>{CSS}</style></head><body>"
+        "<nav><a href='{root}index.html'>🏆 Žebříček</a><a href='{root}history.html'>📜 Historie</a>"
+        "<a href='{root}h2h.html'>🆚 H2H</a></nav>"
+        f"<h1>{html.escape(title)}</h1>{body}</body></html>"
+    )
+
+
+def _render(template, root=""):
+    return template.replace("{root}", root).encode("utf-8")
+
+
+def _table(df):
+    if df is None or df.empty:
+        return "<p>Žádná data.</p>"
+    return df.to_html(index=False, escape=True, border=0, na_rep="")
+
+
+def _link(p, slugs, root=""):
+    return f"<a href='{root}players/{slugs[p]}.html'>{html.escape(p)}</a>"
+
+
+def elo_chart(values, width=720, height=220, pad=24):
+    """Průběh ELO jako inline SVG (bez JavaScriptu)."""
+    if len(values) < 2:
+        return ""
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1.0
+    step = (width - 2 * pad) / (len(values) - 1)
+    pts = " ".join(
+        f"{pad + i * step:.1f},{height - pad - (v - lo) / span * (height - 2 * pad):.1f}"
+        for i, v in enumerate(values)
+    )
+    return (
+        f"<svg viewBox='0 0 {width} {height}' width='100%' role='img' aria-label='Vývoj ELO'>"
+        f"<polyline fill='none' stroke='#7dd3fc' stroke-width='2' points='{pts}'/>"
+        f"<text x='4' y='{pad - 8}' fill='#aaa' font-size='11'>{hi:.0f}</text>"
+        f"<text x='4' y='{height - 6}' fill='#aaa' font-size='11'>{lo:.0f}</text></svg>"
+    )
+
+
+def ranking_page(rows, slugs):
+    body = ["<table><tr><th>#</th><th>Hráč</th><th>ELO</th><th>Poslední zápas</th>"
+            "<th>Celkem</th><th>Poslední změna</th></tr>"]
+    for r in rows:
+        name = _link(r["player"], slugs) + (" 🏳️" if r["retired"] else "")
+        body.append(
+            f"<tr><td>{r['rank'] or '–'}</td><td>{name}</td><td>{int(round(r['elo']))}</td>"
+            f"<td>{r['last_match'] or ''}</td><td>{r['total_delta']:+.0f}</td><td>{r['last_delta']:+.0f}</td></tr>"
+        )
+    body.append("</table>")
+    return _page("Žebříček", "".join(body))
+
+
+def player_page(player, hist, stats):
+    df_s, df_p, df_o = stats
+    elo = hist["ELO po"].iloc[::-1].astype(float).tolist() if not hist.empty else []
+    current = f"<p>Aktuální ELO: <b>{int(round(elo[-1]))}</b></p>" if elo else ""
+    body = (
+        current + elo_chart(elo)
+        + "<h2>Dvouhra – soupeři</h2>" + _table(df_s)
+        + "<h2>Čtyřhra – parťáci</h2>" + _table(df_p)
+        + "<h2>Čtyřhra – soupeři</h2>" + _table(df_o)
+        + "<h2>Historie</h2>" + _table(hist)
+    )
+    return _page(player, body)
+
+
+def matrix_page(singles, partners, slugs):
+    def matrix(title, data):
+        players = sorted(data)
+        cols = sorted({q for p in players for q in data[p]})
+        if not players:
+            return f"<h2>{title}</h2><p>Žádná data.</p>"
+        head = "".join(f"<th>{_link(q, slugs)}</th>" for q in cols)
+        rows = []
+        for p in players:
+            cells = []
+            for q in cols:
+                w, l = data[p].get(q, (0, 0))
+                cells.append(f"<td{' class=me' if p == q else ''}>{f'{w}:{l}' if w or l else ''}</td>")
+            rows.append(f"<tr><th>{_link(p, slugs)}</th>{''.join(cells)}</tr>")
+        return f"<h2>{title}</h2><table><tr><th></th>{head}</tr>{''.join(rows)}</table>"
+
+    return _page("H2H", matrix("Dvouhra (výhry:prohry řádku proti sloupci)", singles)
+                 + matrix("Čtyřhra (výhry:prohry řádku se sloupcem jako parťákem)", partners))
+
+
+# --- EXPORT ---
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return m if m.get("format") == EXPORT_FORMAT else None
+
+
+def _touched_players(log, start_row):
+    """Hráči z řádků logu od start_row (index = pořadí v sheetu) dál."""
+    new = log[log.index >= start_row]
+    out = set()
+    for rtype, a, b in zip(new["type"], new["team_a"], new["team_b"]):
+        out.update(get_players(a) + get_players(b) if rtype in MATCH_TYPES else [str(a).strip()])
+    return out
+
+
+def export(state, out_dir, today=None, force=False):
+    """
+    Vyrenderuje statický web do out_dir. Vrací počet zapsaných souborů.
+    Stránky hráčů se přepočítají jen pro hráče, kterých se od minulého exportu týkají nové řádky.
+    """
+    today = (today or datetime.now().date()).isoformat()
+    prev = None if force else _load_manifest(out_dir)
+    if prev and prev["data_version"] == state.data_version and prev["today"] == today:
+        return 0
+
+    log, sets_txt = state.log, state.sets_txt
+    players = set(state.elo["ratings"])
+    slugs = player_slugs(players)
+
+    # Jen přibyly řádky na konec (stejná kontrola jako advance_state) -> stačí dotčení hráči
+    appended = (
+        prev is not None and prev["slugs"] == slugs and prev["rows"] <= len(state.events)
+        and data_version(state.hashes[:prev["rows"]]) == prev["data_version"]
+    )
+    redo = _touched_players(log, prev["rows"]) if appended else players
+
+    old_pages = prev["pages"] if prev else {}
+    pages = {k: v for k, v in old_pages.items() if k.startswith("players/")} if appended else {}
+    written = 0
+
+    def write(rel, data):
+        nonlocal written
+        digest = hashlib.sha1(data).hexdigest()
+        pages[rel] = digest
+        path = os.path.join(out_dir, rel)
+        if old_pages.get(rel) == digest and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        written += 1
+
+    rows = ranking_rows(state.elo_meta, get_retired_players(log), datetime.fromisoformat(today).date())
+    write("index.html", _render(ranking_page(rows, slugs)))
+    write("ranking.json", _json({"data_version": state.data_version, "players": rows}))
+
+    hist = state.history.drop(columns=["row_idx"], errors="ignore")
+    write("history.html", _render(_page("Historie", _table(hist))))
+    write("history.json", _json(_records(hist)))
+
+    singles, partners = h2h_matrices(log)
+    write("h2h.html", _render(matrix_page(singles, partners, slugs)))
+    write("h2h.json", _json({"singles": singles, "doubles_partners": partners}))
+
+    for p in sorted(redo & players):
+        p_hist = state.player_history(p)
+        stats = compute_player_stats(log, p)[:3]
+        write(f"players/{slugs[p]}.html", _render(player_page(p, p_hist, stats), root="../"))
+        write(f"players/{slugs[p]}.json", _json({
+            "player": p, "history": _records(p_hist), "singles": _records(stats[0]),
+            "partners": _records(stats[1]), "doubles_opponents": _records(stats[2]),
+        }))
+
+    # Stránky hráčů, kteří po plném přepočtu zmizeli (smazaný řádek)
+    for rel in set(old_pages) - set(pages):
+        try:
+            os.remove(os.path.join(out_dir, rel))
+        except OSError:
+            pass
+
+    manifest = {
+        "format": EXPORT_FORMAT, "data_version": state.data_version, "rows": len(state.events),
+        "today": today, "exported": datetime.now().isoformat(timespec="seconds"),
+        "slugs": slugs, "pages": pages,
+    }
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Statický export žebříčku, historie a H2H do HTML/JSON.")
+    ap.add_argument("out_dir")
+    ap.add_argument("--snapshot-dir", default=os.environ.get(
+        "TENIS_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.realpath(__file__)), ".snapshot")))
+    ap.add_argument("--no-sync", action="store_true", help="nesahat na Google Sheets, jen exportovat snapshot")
+    ap.add_argument("--force", action="store_true", help="přepočítat a přepsat všechny stránky")
+    args = ap.parse_args()
+
+    state = snapshot.load(args.snapshot_dir)
+    if not args.no_sync:
+        try:
+            state = sheets.sync_state(state, sheets.open_worksheet(sheets.service_account_info()), args.snapshot_dir)
+        except Exception as e:
+            if state is None:
+                raise
+            print(f"Sheet nedostupný, exportuje se snapshot: {e}")
+    if state is None:
+        raise SystemExit("Žádná data: chybí snapshot i přístup ke sheetu.")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    n = export(state, args.out_dir, force=args.force)
+    print(f"Zapsáno souborů: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from elo_engine import MATCH_TYPES, event_dates
+
+# --- FORMA A SÉRIE ---
+# Dlouhá tabulka zápasů: jeden řádek = (hráč, zápas) z čistého logu, s výsledkem, změnou ELO
+# (z trajektorie replay_elo), parťákem a soupeři. Staví se jednou za verzi dat a série, forma
+# i klouzavá úspěšnost se z ní počítají groupby/rolling operacemi pro všechny hráče najednou.
+# Série a forma berou jen ranked zápasy (singles/doubles), přáteláky v tabulce zůstávají.
+
+FORM_WINDOW = 10        # forma = posledních N ranked zápasů
+ROLLING_WINDOW = 20     # klouzavá úspěšnost pro graf
+PLAYER_MATCH_COLUMNS = ["player", "row", "date", "type", "ranked", "won", "delta", "rating",
+                        "partner", "opponents", "streak", "win_rate"]
+FORM_COLUMNS = ["games", "streak", "best_streak", "form", "form_wins", "momentum", "win_rate"]
+
+
+def player_matches(log: pd.DataFrame, trajectory: dict) -> pd.DataFrame:
+    """
+    Log (kanonické pořadí) + trajektorie hráčů -> dlouhá tabulka PLAYER_MATCH_COLUMNS,
+    seřazená podle hráče a v rámci hráče v pořadí logu. `row` = index řádku logu.
+    """
+    m = log[log["type"].isin(MATCH_TYPES)]
+    if m.empty:
+        return pd.DataFrame(columns=PLAYER_MATCH_COLUMNS)
+
+    seq, dates = np.arange(len(m)), event_dates(m).to_numpy()
+    parts = []
+    for team, opp, side in (("team_a", "team_b", "A"), ("team_b", "team_a", "B")):
+        names = m[team].str.split("+", n=1, expand=True).reindex(columns=[0, 1])
+        base = {"seq": seq, "row": m.index.to_numpy(), "date": dates, "type": m["type"].to_numpy(),
+                "won": (m["winner"] == side).to_numpy(), "opponents": m[opp].str.replace("+", " + ").to_numpy()}
+        for me, mate in ((0, 1), (1, 0)):
+            part = pd.DataFrame({**base, "player": names[me].to_numpy(), "partner": names[mate].to_numpy()})
+            parts.append(part[part["player"].notna()])
+
+    pm = pd.concat(parts, ignore_index=True).sort_values(["player", "seq"], kind="stable", ignore_index=True)
+    pm["ranked"] = pm["type"].isin(["singles", "doubles"])
+
+    points = [(p, i, d, r) for p, pts in trajectory.items() for i, d, r in pts]
+    traj = pd.DataFrame(points, columns=["player", "row", "delta", "rating"])
+    pm = pm.merge(traj, on=["player", "row"], how="left")
+
+    # Série: délka běhu stejných výsledků (kladná výhry, záporná prohry); skupiny hráčů jsou souvislé
+    r = pm[pm["ranked"]]
+    g = r.groupby("player", sort=False)["won"]
+    run = r["won"].ne(g.shift()).cumsum()
+    run_len = r.groupby(run).cumcount() + 1
+    pm["streak"] = pd.Series(np.where(r["won"], run_len, -run_len), index=r.index)
+    pm["win_rate"] = g.rolling(ROLLING_WINDOW, min_periods=1).mean().droplevel(0)
+    return pm[PLAYER_MATCH_COLUMNS]
+
+
+def form_summary(pm: pd.DataFrame) -> pd.DataFrame:
+    """Hráč -> FORM_COLUMNS: aktuální a nejdelší série výher, forma a ELO za posledních FORM_WINDOW zápasů."""
+    r = pm[pm["ranked"]]
+    if r.empty:
+        return pd.DataFrame(columns=FORM_COLUMNS).rename_axis("player")
+    g = r.groupby("player", sort=False)
+    last = g.tail(FORM_WINDOW)
+    last_g = last.groupby("player", sort=False)
+    out = pd.DataFrame({
+        "games": g.size(),
+        "streak": g["streak"].last().astype(int),
+        "best_streak": r["streak"].clip(lower=0).groupby(r["player"], sort=False).max().astype(int),
+        "form": last["won"].map({True: "V", False: "P"}).groupby(last["player"], sort=False).agg("".join),
+        "form_wins": last_g["won"].sum().astype(int),
+        "momentum": last_g["delta"].sum(),
+        "win_rate": g["win_rate"].last(),
+    })
+    return out[FORM_COLUMNS]
+
+
+def streak_text(streak):
+    """+3 -> '3 V', -2 -> '2 P', bez zápasů '—'."""
+    if streak is None or pd.isna(streak) or streak == 0:
+        return "—"
+    return f"{abs(int(streak))} {'V' if streak > 0 else 'P'}"
@@ -1,41 +1,178 @@
+import argparse
+import csv
 import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import bcrypt
+import toml
+
+# --- ZAKLÁDÁNÍ ÚČTŮ ---
+# Hráči se načtou z CSV (username,name,password[,email]), hesla se zahashují paralelně
+# (bcrypt je schválně pomalý, takže každý hash běží ve vlastním procesu) a výsledek se
+# doplní do existujícího secrets.toml. Ostatní sekce (gcp_service_account, cookie) zůstanou.
+#
+#   python gen_pass.py hraci.csv [--secrets .streamlit/secrets.toml] [--target-ms 250] [--dry-run]
+#
+# Hráč s prázdným heslem v CSV si nechá dosavadní hash (mění se jen jméno/e-mail).
+# Když dosavadní hash odpovídá heslu z CSV a má aspoň zvolenou cenu, zůstane beze změny.
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), ".streamlit", "secrets.toml")
+TARGET_MS = 250      # cílová doba ověření hesla při přihlášení na tomhle stroji
+MIN_COST, MAX_COST = 10, 15
+COOKIE_NAME = "tennis_elo_auth"
+COOKIE_DAYS = 30
+
+
+def _hash(password, cost):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=cost)).decode("utf-8")
+
+
+def _check(password, hashed):
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def hash_cost(hashed):
+    """Cena (rounds) z bcrypt hashe '$2b$12$...', nebo None."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def is_bcrypt(s):
+    return isinstance(s, str) and s.startswith(("$2a$", "$2b$", "$2y$")) and hash_cost(s) is not None
+
+
+def calibrate(target_ms=TARGET_MS):
+    """Nejvyšší cena, jejíž ověření na tomhle stroji nepřekročí target_ms (aspoň MIN_COST)."""
+    best = MIN_COST
+    for cost in range(MIN_COST, MAX_COST + 1):
+        hashed = _hash("kalibrace", cost)
+        t0 = time.perf_counter()
+        _check("kalibrace", hashed)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"  cena {cost}: {ms:.0f} ms")
+        if ms > target_ms:
+            break
+        best = cost
+        if ms * 2 > target_ms:
+            break  # další cena je dvojnásobná, tu už nestihne
+    return best
+
+
+def read_users(path):
+    """CSV -> {username: {"name", "password", "email"}} (username malými písmeny jako stauth)."""
+    users = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            row = {k.strip(): str(v or "").strip() for k, v in row.items() if k}
+            username = row.get("username", "").lower()
+            if not username:
+                raise SystemExit(f"řádek {line_no}: chybí username")
+            if username in users:
+                raise SystemExit(f"řádek {line_no}: username '{username}' je v souboru dvakrát")
+            users[username] = {
+                "name": row.get("name") or username,
+                "password": row.get("password", ""),
+                "email": row.get("email") or f"{username}@tenis.cz",
+            }
+    return users
+
+
+def plan(users, existing, cost):
+    """
+    Rozdělí hráče: [(username, heslo)] k zahashování a [(username, heslo, hash)] k ověření,
+    jestli dosavadní hash stačí. Hesla, která už jsou bcrypt hash, se berou tak, jak jsou.
+    """
+    to_hash, to_verify = [], []
+    for username, u in users.items():
+        old = existing.get(username, {}).get("password", "")
+        if not u["password"] or is_bcrypt(u["password"]):
+            continue
+        if is_bcrypt(old) and hash_cost(old) >= cost:
+            to_verify.append((username, u["password"], old))
+        else:
+            to_hash.append((username, u["password"]))
+    return to_hash, to_verify
+
+
+def merge(secrets_data, users, hashes):
+    """Doplní hráče do [credentials.usernames] (ostatní sekce i další hráči zůstávají)."""
+    creds = secrets_data.setdefault("credentials", {})
+    accounts = creds["usernames"] = {k.lower(): v for k, v in creds.get("usernames", {}).items()}
+    for username, u in users.items():
+        entry = dict(accounts.get(username, {}))
+        entry["name"], entry["email"] = u["name"], u["email"]
+        if username in hashes:
+            entry["password"] = hashes[username]
+        elif is_bcrypt(u["password"]):
+            entry["password"] = u["password"]
+        if not entry.get("password"):
+            raise SystemExit(f"hráč '{username}' nemá heslo ani dosavadní hash")
+        accounts[username] = entry
+
+    cookie = secrets_data.setdefault("cookie", {})
+    cookie.setdefault("name", COOKIE_NAME)
+    cookie.setdefault("expiry_days", COOKIE_DAYS)
+    cookie.setdefault("key", secrets.token_hex(32))
+    return secrets_data
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Založení/aktualizace účtů hráčů v secrets.toml.")
+    ap.add_argument("csv_file", help="CSV se sloupci username,name,password[,email]")
+    ap.add_argument("--secrets", default=SECRETS_PATH)
+    ap.add_argument("--target-ms", type=float, default=TARGET_MS, help="cílová doba přihlášení (kalibrace ceny)")
+    ap.add_argument("--cost", type=int, help="pevná cena bcryptu místo kalibrace")
+    ap.add_argument("--workers", type=int, default=None, help="počet procesů (výchozí: počet jader)")
+    ap.add_argument("--dry-run", action="store_true", help="nic nezapisovat")
+    args = ap.parse_args()
+
+    users = read_users(args.csv_file)
+    try:
+        with open(args.secrets, encoding="utf-8") as f:
+            data = toml.load(f)
+    except FileNotFoundError:
+        data = {}
+    existing = {k.lower(): v for k, v in data.get("credentials", {}).get("usernames", {}).items()}
+
+    if args.cost:
+        cost = args.cost
+    else:
+        print(f"Kalibrace ceny bcryptu na {args.target_ms:.0f} ms:")
+        cost = calibrate(args.target_ms)
+    print(f"Cena bcryptu: {cost}")
+
+    to_hash, to_verify = plan(users, existing, cost)
+    hashes = {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        checks = pool.map(_check, [p for _, p, _ in to_verify], [h for _, _, h in to_verify])
+        for (username, password, _), ok in zip(to_verify, checks):
+            if not ok:
+                to_hash.append((username, password))  # heslo se změnilo
+        done = pool.map(_hash, [p for _, p in to_hash], [cost] * len(to_hash))
+        hashes = {username: h for (username, _), h in zip(to_hash, done)}
+    kept = len(users) - len(hashes)
+    print(f"Zahashováno: {len(hashes)}, beze změny hesla: {kept} ({time.perf_counter() - t0:.1f} s)")
+
+    data = merge(data, users, hashes)
+    if args.dry_run:
+        return
+    folder = os.path.dirname(args.secrets)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = args.secrets + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        toml.dump(data, f)
+    os.replace(tmp, args.secrets)
+    print(f"✅ Zapsáno: {args.secrets}")
+
 
-# --- KONFIGURACE CESTY ---
-# Používáme raw string (r""), aby Windows cesty nezlobily
-slozka = r"C:\Users\junio\Tenis_Web\PRogram\.streamlit"
-soubor = os.path.join(slozka, "secrets.toml")
-
-# --- DATA HRÁČŮ ---
-hraci = {
-    "tobi": {"name": "Tobi", "pass": "AdminTobinek21"},
-    "kuba": {"name": "Kuba", "pass": "KubikJeBobik13"},
-    "jirka": {"name": "Jirka", "pass": "JirkaLegendSite32"},
-    "kavic": {"name": "Kávič", "pass": "KralChopu54"},
-    "risa": {"name": "Ríša", "pass": "ClutchLord99"}
-}
-
-# --- GENEROVÁNÍ OBSAHU ---
-toml_content = "[credentials]\nusernames = {\n"
-
-for user_id, data in hraci.items():
-    # Vytvoření hashe
-    hash_hesla = bcrypt.hashpw(data["pass"].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    toml_content += f'    {user_id} = {{ email = "{user_id}@tenis.cz", name = "{data["name"]}", password = "{hash_hesla}" }},\n'
-
-toml_content += "}\n\n[cookie]\nexpiry_days = 30\nkey = \"tajny_klic_123\"\nname = \"tennis_elo_auth\"\n"
-
-# --- ZÁPIS DO SOUBORU ---
-try:
-    # Pokud složka neexistuje, vytvoříme ji
-    if not os.path.exists(slozka):
-        os.makedirs(slozka)
-    
-    with open(soubor, "w", encoding="utf-8") as f:
-        f.write(toml_content)
-    
-    print(f"✅ HOTOVO! Soubor byl vytvořen zde: {soubor}")
-    print("Teď už by přihlašování mělo fungovat.")
-
-except Exception as e:
-    print(f"❌ CHYBA: Nepodařilo se zapsat soubor. Důvod: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+import metrics
+from bulk_import import write_rows
+from elo_engine import COLUMNS, MATCH_TYPES, advance_state, get_players, canonical_log, get_retired_players, validate_events, values_to_frame
+from snapshot import lock
+
+# --- LOKÁLNÍ DENÍK ZÁPISŮ ---
+# Zápis z formuláře se nejdřív připíše do lokálního souboru (append-only JSON řádky)
+# a aplikace ho hned ukazuje. Do Google Sheets ho pošle až synchronizace na pozadí
+# (vlákno v aplikaci nebo `python journal.py --watch`), takže pomalý nebo nedostupný
+# sheet nikdy nebrzdí zadávání výsledků na kurtu.
+#
+#   {"op": "append", "id": ..., "ts": ..., "base_rows": počet řádků sheetu při zápisu, "row": {...}}
+#   {"op": "synced", "id": ..., "ts": ...}                    řádek je v sheetu
+#   {"op": "conflict", "id": ..., "ts": ..., "reason": ...}   řádek se do sheetu nezapsal
+#   {"op": "dismissed", "id": ..., "ts": ...}                 konflikt vzatý na vědomí
+
+SYNC_SECONDS = 15  # jak často se čekající zápisy zkouší odeslat
+JOURNAL_PATH = os.environ.get(
+    "TENIS_JOURNAL", os.path.join(os.path.dirname(os.path.realpath(__file__)), ".journal", "journal.jsonl"))
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _row_key(row):
+    """Porovnatelná podoba řádku (sheet při USER_ENTERED zahodí úvodní apostrof)."""
+    return tuple(str(row.get(c, "")).strip().lstrip("'") for c in COLUMNS)
+
+
+def _records(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    out = []
+    for line in lines:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue  # nedopsaný řádek (souběžný zápis), příště už bude celý
+    return out
+
+
+def _append_records(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read(path):
+    """Vrátí (čekající zápisy, konflikty) v pořadí zápisu."""
+    entries, done, conflicts = {}, set(), {}
+    for r in _records(path):
+        if r.get("op") == "append":
+            entries[r["id"]] = r
+        elif r.get("op") in ("synced", "dismissed"):
+            done.add(r["id"])
+        elif r.get("op") == "conflict":
+            conflicts[r["id"]] = r.get("reason", "")
+    pending = [e for i, e in entries.items() if i not in done and i not in conflicts]
+    conflicted = [dict(entries[i], reason=reason) for i, reason in conflicts.items() if i in entries and i not in done]
+    return pending, conflicted
+
+
+def append(path, row, base_rows, entry_id=None):
+    """
+    Připíše zápis do deníku (okamžitě, bez sítě) a vrátí ho. entry_id slouží jako klíč
+    idempotence: zápis se stejným id se podruhé nepřidá (dvojklik, opakované odeslání).
+    """
+    entry = {
+        "op": "append", "id": entry_id or uuid.uuid4().hex, "ts": _now(), "base_rows": int(base_rows),
+        "row": {c: str(row.get(c, "")) for c in COLUMNS},
+    }
+    folder = os.path.dirname(path) or "."
+    with lock(folder):
+        if entry_id:
+            for r in _records(path):
+                if r.get("op") == "append" and r.get("id") == entry_id:
+                    return r
+        _append_records(path, [entry])
+    return entry
+
+
+def dismiss(path, entry_id):
+    """Skryje konflikt (zápis se zahodí)."""
+    folder = os.path.dirname(path) or "."
+    with lock(folder):
+        _append_records(path, [{"op": "dismissed", "id": entry_id, "ts": _now()}])
+        _compact(path)
+
+
+def status(path):
+    """Stav synchronizace pro UI: počet čekajících, nejstarší čekající zápis, konflikty."""
+    pending, conflicts = read(path)
+    oldest = datetime.fromisoformat(pending[0]["ts"]) if pending else None
+    return {"pending": len(pending), "oldest": oldest, "conflicts": conflicts}
+
+
+def _already_written(events: pd.DataFrame, entries):
+    """
+    Id zápisů, které už v sheetu jsou (např. odeslání spadlo až po zápisu do sheetu).
+    Hledá se jen v řádcích přidaných po vzniku zápisu; každý řádek sheetu se započte jednou.
+    """
+    if events.empty or not entries:
+        return set()
+    keys = [_row_key(r) for r in events[COLUMNS].to_dict("records")]
+    found = set()
+    for e in entries:
+        start = e["base_rows"] if e["base_rows"] <= len(keys) else 0  # mezitím se mazalo -> celý sheet
+        try:
+            pos = keys.index(_row_key(e["row"]), start)
+        except ValueError:
+            continue
+        found.add(e["id"])
+        keys[pos] = None  # spotřebováno, stejný řádek nepotvrdí další zápis
+    return found
+
+
+def overlay(state, entries):
+    """Stav ze sheetu + čekající zápisy z deníku (to, co aplikace ukazuje)."""
+    if state is None or not entries:
+        return state
+    written = _already_written(state.events, entries)
+    rows = [e["row"] for e in entries if e["id"] not in written]
+    if not rows:
+        return state
+    df = pd.concat([state.events, pd.DataFrame(rows, columns=COLUMNS)], ignore_index=True)
+    with metrics.timer("tenis_replay_seconds", source="journal"):
+        return advance_state(state, df, remote_version=None)
+
+
+def _conflict(row, retired):
+    """Důvod, proč zápis nejde poslat (vůči aktuálnímu sheetu), nebo None."""
+    log, report = validate_events(pd.DataFrame([row], columns=COLUMNS))
+    if log.empty:
+        return report["Důvod"].iat[0]
+    if row["type"] in MATCH_TYPES:
+        gone = [p for p in get_players(row["team_a"]) + get_players(row["team_b"]) if p in retired]
+        if gone:
+            return f"hráč s ukončenou kariérou: {', '.join(gone)}"
+    return None
+
+
+def sync(path, ws):
+    """
+    Pošle čekající zápisy do sheetu (jedno append_rows) a potvrdí je v deníku.
+    Zápisy, které už v sheetu jsou, se jen potvrdí; neplatné vůči aktuálnímu sheetu
+    se označí jako konflikt. Vrací počet nově zapsaných řádků.
+    """
+    folder = os.path.dirname(path) or "."
+    with lock(folder):
+        pending, _ = read(path)
+        if not pending:
+            return 0
+
+        with metrics.timer("tenis_sheets_requests_seconds", op="get_all_values"):
+            events = values_to_frame(ws.get_all_values())
+        written = _already_written(events, pending)
+        retired = get_retired_players(canonical_log(events))
+
+        to_write, records = [], []
+        for e in pending:
+            if e["id"] in written:
+                records.append({"op": "synced", "id": e["id"], "ts": _now()})
+                continue
+            reason = _conflict(e["row"], retired)
+            if reason:
+                records.append({"op": "conflict", "id": e["id"], "ts": _now(), "reason": reason})
+            else:
+                to_write.append(e)
+
+        if to_write:
+            write_rows(ws, [e["row"] for e in to_write])
+            records += [{"op": "synced", "id": e["id"], "ts": _now()} for e in to_write]
+            metrics.inc("tenis_journal_synced_rows_total", len(to_write))
+        _append_records(path, records)
+        _compact(path)
+        return len(to_write)
+
+
+def _compact(path):
+    """Přepíše deník jen na nevyřízené zápisy a konflikty (volat pod zámkem)."""
+    pending, conflicts = read(path)
+    keep = {e["id"] for e in pending + conflicts}
+    records = [r for r in _records(path) if r.get("id") in keep and r.get("op") != "synced"]
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def main():
+    import sheets
+
+    ap = argparse.ArgumentParser(description="Odeslání lokálního deníku zápisů do Google Sheets.")
+    ap.add_argument("journal", nargs="?", default=JOURNAL_PATH)
+    ap.add_argument("--watch", action="store_true", help="běžet stále a odesílat každých --interval sekund")
+    ap.add_argument("--interval", type=float, default=SYNC_SECONDS)
+    args = ap.parse_args()
+
+    ws = None
+    while True:
+        try:
+            if ws is None:
+                ws = sheets.open_worksheet(sheets.service_account_info())
+            n = sync(args.journal, ws)
+            if n:
+                print(f"Odesláno řádků: {n}")
+        except Exception as e:
+            ws = None
+            print(f"Synchronizace selhala, zkusí se znovu: {e}")
+        if not args.watch:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
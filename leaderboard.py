@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from elo_engine import ACTIVE_DAYS
+
+# --- ŽEBŘÍČKY PRO VELKÉ KLUBY ---
+# Tabulky žebříčku (ELO, Singles, Doubles) se sestaví sloupcovými operacemi jednou
+# za verzi dat a vykreslí se po stránkách: HTML vzniká jen pro řádky jedné stránky,
+# takže stránka žebříčku s tisíci hráči trvá stejně jako s šesti.
+#
+# Tabulka = DataFrame se zobrazenými sloupci + "__style" (styl celého řádku)
+# a "__style:<sloupec>" (styl jedné buňky). Oddělovač mezi aktivními a ostatními
+# hráči se nevkládá do dat, render ho dokreslí za řádek `sep_at`.
+
+PAGE_SIZE = 50
+DIM_STYLE = "color:rgba(255,255,255,0.45); background:rgba(255,255,255,0.02);"
+SEP_STYLE = "background:rgba(255,255,255,0.09); color:gray; font-weight:800; text-align:center;"
+GREEN, YELLOW, RED, BLUE = (f"color:{c}; font-weight:800;" for c in ("#2ecc71", "#f1c40f", "#e74c3c", "#3498db"))
+
+
+class Board:
+    """Hotová (seřazená a naformátovaná) tabulka žebříčku pro jednu verzi dat."""
+
+    def __init__(self, df, columns, sep_at=None, sep_text=""):
+        self.df = df.reset_index(drop=True)
+        self.columns = columns
+        self.sep_at = sep_at      # počet řádků nad oddělovačem (None = bez oddělovače)
+        self.sep_text = sep_text
+
+    def __len__(self):
+        return len(self.df)
+
+    def pages(self, page_size=PAGE_SIZE):
+        return max(1, -(-len(self.df) // page_size))
+
+
+def _pct_text(pct):
+    return pct.map("{:.1f}".format).str.replace(".", ",", regex=False) + " %"
+
+
+def _games_rank(df, threshold):
+    """Aktivní (aspoň threshold zápasů) nahoře, zbytek pod oddělovačem; řazení úspěšnost, výhry."""
+    df = df.assign(__active=df["__games"] >= threshold)
+    df = df.sort_values(["__active", "__pct", "__wins"], ascending=[False, False, False], kind="stable")
+    n_active = int(df["__active"].sum())
+    rank = np.arange(1, len(df) + 1)
+    rank[n_active:] -= n_active
+    df.insert(0, "#", rank)
+    df["__style"] = np.where(df["__active"], "", DIM_STYLE)
+    return df, n_active
+
+
+# --- ELO ---
+def ranking_board(elo_meta, retired_players, today, form=None):
+    """Hlavní žebříček ELO (stejná pravidla jako elo_engine.ranking_rows); s `form` (form.form_summary) i série a forma."""
+    ratings, last_date, total_delta, last_delta, played_elo_match = elo_meta
+    df = pd.DataFrame({"Hráč": list(ratings), "__elo": np.fromiter(ratings.values(), float, len(ratings))})
+    p = df["Hráč"]
+    ld = pd.to_datetime(p.map(last_date), errors="coerce")
+    df["__td"] = p.map(total_delta).fillna(0.0).astype(float)
+    df["__ldel"] = p.map(last_delta).fillna(0.0).astype(float)
+    df["__retired"] = p.isin(retired_players)
+    df["__elo_num"] = df["__elo"].round().astype(int)
+    days = (pd.Timestamp(today) - ld).dt.days
+    active = (p.map(played_elo_match).fillna(False).astype(bool) & ~df["__retired"]
+              & ld.notna() & (days <= ACTIVE_DAYS))
+
+    df["Kariéra"] = np.where(df["__retired"], "🛑 Ukončeno", "Aktivní")
+    df["Poslední zápas"] = ld.dt.strftime("%d.%m.%Y").fillna("—")
+    df["ELO"] = np.where(active, df["__elo"].round(2).astype(str), "0")
+    df["Δ ELO (posl.)"] = np.where(
+        active, df["__td"].map("{:+.0f}".format) + " (" + df["__ldel"].map("{:+.0f}".format) + ")", "0 (0)")
+
+    # Aktivní podle ELO, pod nimi ostatní (ukončené kariéry úplně dole)
+    df["__active"] = active
+    df = df.sort_values(["__active", "__retired", "__elo_num"], ascending=[False, True, False], kind="stable")
+    n_active = int(active.sum())
+    df.insert(0, "#", ["unranked"] * len(df))
+    df.iloc[:n_active, 0] = np.arange(1, n_active + 1)
+    if n_active:
+        df.iloc[0, df.columns.get_loc("Hráč")] = f"👑 {df.iloc[0]['Hráč']}"
+
+    act, days = df["__active"].to_numpy(), days.reindex(df.index).to_numpy()
+    df["__style"] = np.where(act, "", DIM_STYLE)
+    df["__style:Kariéra"] = np.where(act, BLUE, "")
+    df["__style:Poslední zápas"] = np.select(
+        [~act, days <= 10, days <= 20], ["", GREEN.replace("800", "700"), YELLOW.replace("800", "700")],
+        RED.replace("800", "700"))
+    td = df["__td"].to_numpy()
+    df["__style:Δ ELO (posl.)"] = np.select([~act, td > 0, td < 0], ["", GREEN, RED], "")
+
+    cols = ["#", "Hráč", "Kariéra", "ELO", "Poslední zápas", "Δ ELO (posl.)"]
+    if form is not None:
+        streak = df["Hráč"].str.removeprefix("👑 ").map(form["streak"]).fillna(0).to_numpy()
+        df["Série"] = np.where(streak > 0, np.abs(streak).astype(int).astype(str) + " V",
+                               np.where(streak < 0, np.abs(streak).astype(int).astype(str) + " P", "—"))
+        df["__style:Série"] = np.select([~act, streak >= 3, streak <= -3], ["", GREEN, RED], "")
+        df["Forma"] = df["Hráč"].str.removeprefix("👑 ").map(form["form"]).fillna("—")
+        cols += ["Série", "Forma"]
+    return Board(df, cols, sep_at=n_active, sep_text="Hráči neaktivní nebo s ukončenou kariérou")
+
+
+def ranked_players(board):
+    """Jména hráčů s pořadím v žebříčku (nad oddělovačem ranking_board), bez korunky."""
+    return board.df["Hráč"].iloc[:board.sep_at or 0].str.removeprefix("👑 ").tolist()
+
+
+# --- SINGLES / DOUBLES ---
+def _win_loss_board(wl, name_col, elo, elo_col, sep_label):
+    """Bilance (EngineState.win_loss) -> žebříček podle úspěšnosti; aktivní = aspoň třetina zápasů nejaktivnějšího."""
+    if wl.empty:
+        return None
+    wins, losses = wl["wins"].to_numpy(), wl["losses"].to_numpy()
+    games = wins + losses
+    df = pd.DataFrame({
+        name_col: wl.index.to_numpy(), "__wins": wins, "__games": games,
+        "__pct": np.where(games > 0, wins / np.maximum(games, 1) * 100, 0.0),
+        elo_col: np.round(elo).astype(int),
+        "Skóre": wl["wins"].astype(str).to_numpy() + ":" + wl["losses"].astype(str).to_numpy(),
+    })
+    df["Úspěšnost"] = _pct_text(df["__pct"])
+
+    threshold = games.max() / 3.0
+    df, n_active = _games_rank(df, threshold)
+    sep = n_active if 0 < n_active < len(df) else None
+    return Board(df, ["#", name_col, elo_col, "Skóre", "Úspěšnost"], sep_at=sep,
+                 sep_text=f"{sep_label} s méně než {int(np.ceil(threshold))} zápasy")
+
+
+def singles_board(wl, ratings):
+    """Žebříček dvouhry z bilance hráčů."""
+    elo = wl["p1"].map(ratings).fillna(1000).to_numpy(dtype=float)
+    return _win_loss_board(wl, "Hráč", elo, "ELO", "Hráči")
+
+
+def doubles_board(wl, ratings, pairs):
+    """Žebříček dvojic ve čtyřhře: ELO dvojice (replay_elo "pairs") a průměrné ELO obou hráčů."""
+    elo = (wl["p1"].map(ratings).fillna(1000).to_numpy(dtype=float)
+           + wl["p2"].map(ratings).fillna(1000).to_numpy(dtype=float)) / 2.0
+    board = _win_loss_board(wl, "Dvojice", elo, "Průměrné ELO", "Dvojice")
+    if board is not None:
+        board.df["__style"] = ""  # dvojice pod hranicí se neztlumují (jako dřív)
+        board.df["ELO dvojice"] = board.df["Dvojice"].map(pairs).fillna(1000).round().astype(int)
+        board.columns.insert(2, "ELO dvojice")
+    return board
+
+
+# --- HTML ---
+def render_page(board, page=0, page_size=PAGE_SIZE):
+    """HTML tabulky jen pro řádky jedné stránky (včetně oddělovače, pokud na ni padne)."""
+    start = page * page_size
+    part = board.df.iloc[start:start + page_size]
+    cols = board.columns
+
+    row_style = part["__style"] if "__style" in part else pd.Series("", index=part.index)
+    cells = pd.Series("<tr>", index=part.index)
+    for c in cols:
+        style = row_style + part[f"__style:{c}"] if f"__style:{c}" in part else row_style
+        cells = cells + '<td style="' + style + '">' + part[c].astype(str) + "</td>"
+    rows = (cells + "</tr>").tolist()
+
+    end = start + len(part)
+    # oddělovač patří před řádek sep_at; když jsou všichni nad ním, kreslí se na konci poslední stránky
+    if board.sep_at is not None and (start <= board.sep_at < end or board.sep_at == end == len(board)):
+        rows.insert(board.sep_at - start,
+                    f'<tr><td colspan="{len(cols)}" style="{SEP_STYLE}">{board.sep_text}</td></tr>')
+
+    head = "".join(f"<th>{c}</th>" for c in cols)
+    return (f'<div class="hist-wrap"><table class="hist-table"><thead><tr>{head}</tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table></div>')
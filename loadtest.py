@@ -0,0 +1,303 @@
+import argparse
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import date, timedelta
+
+import numpy as np
+
+from elo_engine import COLUMNS
+
+# --- ZÁTĚŽOVÝ TEST ---
+# Kolik současných diváků jedna instance unese: N session (streamlit AppTest, každá ve svém
+# vlákně, cache sdílené jako v běžícím serveru) prochází sekce a občas zapíše zápas.
+# Google Sheets nahrazuje sheet v paměti (FakeWorksheet) s nastavitelnou latencí a kvótou,
+# takže test nepotřebuje síť ani účet a počítá každé volání.
+#
+#   python loadtest.py --sessions 20 --views 30 [--save-ratio 0.05] [--latency-ms 150]
+#                      [--quota-per-minute 60] [--matches 2000] [--think-ms 200]
+#
+# Latence běhu = doba AppTest.run (celý běh skriptu pro session včetně režie testovacího
+# runneru). Paměť na session = přírůstek maximálního RSS procesu po zahřátí / počet session.
+
+APP = os.path.join(os.path.dirname(os.path.realpath(__file__)), "tenis.py")
+TEMPLATE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "tennis_elo_template.csv")
+SECTIONS = ["ranking", "sd", "stats", "entry", "history"]  # klíče SECTIONS v tenis.py
+SCORES = {"A": ["2:0", "2:1"], "B": ["0:2", "1:2"]}
+
+
+class QuotaExceeded(Exception):
+    """Jako APIError 429 z gspreadu: překročená kvóta požadavků za minutu."""
+
+
+class FakeWorksheet:
+    """
+    Sheet v paměti s rozhraním, které používají konzumenti get_ws (get_all_values, append_row,
+    append_rows, delete_rows, spreadsheet.get_lastUpdateTime). Každé volání čeká `latency`
+    (+ náhodně až `jitter`) sekund a počítá se; nad `quota_per_minute` volání za posledních
+    60 s hází QuotaExceeded.
+    """
+
+    def __init__(self, rows, latency=0.0, jitter=0.0, quota_per_minute=0):
+        self.rows = [list(r) for r in rows]
+        self.latency, self.jitter, self.quota = latency, jitter, quota_per_minute
+        self.calls = Counter()
+        self.version = 1
+        self._lock = threading.Lock()
+        self._recent = deque()
+
+    def _call(self, op):
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.quota and len(self._recent) >= self.quota:
+                self.calls["quota_errors"] += 1
+                raise QuotaExceeded(f"429: kvóta {self.quota} požadavků za minutu ({op})")
+            self._recent.append(now)
+            self.calls[op] += 1
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    @property
+    def spreadsheet(self):
+        ws = self
+
+        class Spreadsheet:
+            def get_lastUpdateTime(self):
+                ws._call("metadata")
+                return f"v{ws.version}"
+
+        return Spreadsheet()
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        with self._lock:
+            return [list(r) for r in self.rows]
+
+    def append_row(self, row, value_input_option=None):
+        self.append_rows([row], value_input_option)
+
+    def append_rows(self, rows, value_input_option=None):
+        self._call("append_rows")
+        with self._lock:
+            self.rows.extend([str(x) for x in r] for r in rows)
+            self.version += 1
+
+    def delete_rows(self, index):
+        self._call("delete_rows")
+        with self._lock:
+            del self.rows[index - 1]
+            self.version += 1
+
+
+def seed_rows(n_matches, seed=0):
+    """Řádky sheetu: vzorová data (tennis_elo_template.csv) + n_matches náhodných zápasů za poslední rok."""
+    with open(TEMPLATE, encoding="utf-8") as f:
+        template = list(csv.reader(f))[1:]
+    rows = [COLUMNS] + [(r + [""] * len(COLUMNS))[:len(COLUMNS) - 1] + ["Import"] for r in template]
+    players = [r[2] for r in template if r[1] == "adjust" and r[7].startswith("Přidání hráče")]
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365)
+    for day in sorted(rng.randrange(365) for _ in range(n_matches)):
+        rtype = rng.choice(["singles", "doubles"])
+        ps = rng.sample(players, 2 if rtype == "singles" else 4)
+        half = len(ps) // 2
+        winner = rng.choice("AB")
+        rows.append([(start + timedelta(days=day)).strftime("%d.%m.%Y"), rtype, "+".join(ps[:half]),
+                     "+".join(ps[half:]), winner, rng.choice(SCORES[winner]), "", "", "Import"])
+    return rows
+
+
+def _install_runtime(secrets):
+    """
+    Jednou pro celý test to, co AppTest._run nastavuje (a po sobě ruší) při každém běhu:
+    runtime s cache a media úložištěm v paměti, st.secrets a config global.appTest.
+    Souběžné běhy pak sdílí cache jako session jednoho serveru. (Interní API streamlitu 1.5x.)
+    """
+    from unittest.mock import MagicMock
+
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    runtime.script_cache = ScriptCache()  # skript se zkompiluje jednou pro všechny session jako na serveru (viz _session)
+    st.secrets = Secrets()
+    st.secrets._secrets = secrets
+    config = patch_config_options({"global.appTest": True})
+    config.__enter__()
+    return config, runtime.script_cache  # config drží patch konfigurace až do konce testu
+
+
+def _session(app, name, script_cache):
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    class Session(AppTest):
+        """AppTest bez přenastavování globálního stavu při každém běhu (viz _install_runtime)."""
+
+        def _run(self, widget_state=None, timeout=None):
+            pages = PagesManager(self._script_path, script_cache, setup_watcher=False)
+            runner = LocalScriptRunner(self._script_path, self.session_state, pages, args=self.args, kwargs=self.kwargs)
+            # LocalScriptRunner si jinak pro každý běh zakládá vlastní ScriptCache a skript kompiluje
+            # znovu; souběžné ast.parse z více vláken (Python 3.11) občas spadne a běh skončí prázdný
+            runner._script_cache = script_cache
+            self._tree = runner.run(widget_state, self.query_params, timeout or self.default_timeout, self._page_hash)
+            self._tree._runner = self
+            return self
+
+    at = Session(app, default_timeout=120)
+    at.session_state["authentication_status"] = True
+    at.session_state["name"] = name
+    at.session_state["username"] = "test"
+    return at
+
+
+def _timed_run(at, action, results):
+    t0 = time.perf_counter()
+    try:
+        at.run()
+        ok = not at.exception
+    except RuntimeError:  # AppTest: běh nedoběhl do timeoutu
+        ok = False
+    results.append((action, time.perf_counter() - t0, ok))
+
+
+def _save(at, rng, results):
+    """Zapíše náhodnou dvouhru přes formulář (sekce entry): výběr hráčů + klik = jeden běh."""
+    at.radio(key="section").set_value("entry")
+    _timed_run(at, "view", results)
+    players = at.selectbox(key="s1").options
+    p1, p2 = rng.sample(players, 2)
+    winner = rng.choice("AB")
+    at.date_input(key="match_date").set_value(date.today() - timedelta(days=rng.randrange(30)))
+    at.selectbox(key="s1").set_value(p1)
+    at.selectbox(key="s2").set_value(p2)
+    at.selectbox(key="winner_sel").set_value(winner)
+    at.text_input(key="score_in").set_value(rng.choice(SCORES[winner]))
+    next(b for b in at.button if "Uložit zápas" in b.label).click()
+    _timed_run(at, "save", results)
+    if any("duplicita" in e.value for e in at.error):
+        results.append(("save_blocked", 0.0, True))
+
+
+def run_session(i, args, results, script_cache, harness):
+    """
+    Jedna session: první běh a `args.views` akcí. Selhání aplikace (výjimka v běhu) jde do
+    `results` jako neúspěšný běh; když stránka nemá prvky, které test čeká, jde o chybu
+    testovacího nástroje a její text se uloží do `harness` (aplikaci se nepočítá).
+    """
+    rng = random.Random(args.seed + i)
+    at = _session(APP, rng.choice(["Tobi", "Kuba", "Jirka", "Kávič", "Ríša", "Novas"]), script_cache)
+    _timed_run(at, "first", results)
+    for _ in range(args.views):
+        time.sleep(rng.uniform(0, args.think_ms / 1000))
+        try:
+            if rng.random() < args.save_ratio:
+                _save(at, rng, results)
+            else:
+                at.radio(key="section").set_value(rng.choice(SECTIONS))
+                _timed_run(at, "view", results)
+        except (KeyError, StopIteration) as e:  # stránka nemá prvek, který test čeká
+            harness.append(f"{type(e).__name__}: {e}" + (f" ({at.exception[0].value})" if at.exception else ""))
+            at.session_state["section"] = "ranking"
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: kB
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Zátěžový test: N současných session proti sheetu v paměti.")
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--views", type=int, default=20, help="počet akcí na session")
+    ap.add_argument("--save-ratio", type=float, default=0.05, help="podíl akcí, které zapisují zápas")
+    ap.add_argument("--think-ms", type=float, default=200, help="max. pauza mezi akcemi")
+    ap.add_argument("--latency-ms", type=float, default=150, help="latence jednoho volání sheetu")
+    ap.add_argument("--jitter-ms", type=float, default=50)
+    ap.add_argument("--quota-per-minute", type=int, default=0, help="0 = bez limitu")
+    ap.add_argument("--matches", type=int, default=500, help="náhodné zápasy navíc ke vzorovým datům")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    # Snapshot a deník do dočasné složky (ne do dat aplikace); musí být nastavené před importem modulů
+    workdir = tempfile.mkdtemp(prefix="tenis-loadtest-")
+    os.environ["TENIS_SNAPSHOT_DIR"] = os.path.join(workdir, "snapshot")
+    os.environ["TENIS_JOURNAL"] = os.path.join(workdir, "journal", "journal.jsonl")
+    import metrics
+    import sheets
+
+    os.chdir(workdir)  # .streamlit/secrets.toml aplikace se nečte, přihlašovací údaje jsou testovací
+    config, script_cache = _install_runtime({
+        "credentials": {"usernames": {"test": {"name": "Test", "email": "test@tenis.cz", "password": "x"}}},
+        "cookie": {"name": "tennis_elo_auth", "key": "loadtest", "expiry_days": 1},
+    })
+
+    ws = FakeWorksheet(seed_rows(args.matches, args.seed), args.latency_ms / 1000, args.jitter_ms / 1000,
+                       args.quota_per_minute)
+    sheets.open_worksheet = lambda info=None: ws
+
+    # Zahřátí: první běh postaví stav a cache (to samé by udělal první divák)
+    warm, harness = [], []
+    run_session(-1, argparse.Namespace(**{**vars(args), "views": 0}), warm, script_cache, harness)
+    rss0, calls0 = _max_rss_mb(), Counter(ws.calls)
+
+    results = []
+    threads = [threading.Thread(target=run_session, args=(i, args, results, script_cache, harness)) for i in range(args.sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    rss1 = _max_rss_mb()
+    config.__exit__(None, None, None)
+
+    print(f"{args.sessions} session × {args.views} akcí, latence sheetu {args.latency_ms:.0f} ms, "
+          f"{len(ws.rows) - 1} řádků, zahřátí {warm[0][1] * 1000:.0f} ms, celkem {wall:.1f} s")
+    by_action = defaultdict(list)
+    for action, sec, _ in results:
+        by_action[action].append(sec * 1000)
+    print(f"{'akce':<8}{'počet':>7}{'p50':>9}{'p95':>9}{'p99':>9}   (ms)")
+    for action in ("first", "view", "save"):
+        ms = by_action.get(action)
+        if ms:
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            print(f"{action:<8}{len(ms):>7}{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}")
+    errors = sum(1 for _, _, ok in results if not ok)
+    print(f"běhy s výjimkou: {errors}, zápisy zablokované jako duplicita: {len(by_action.get('save_blocked', []))}")
+    if harness:
+        print(f"chyby testovacího nástroje (nepočítají se aplikaci): {len(harness)}")
+        for text, n in Counter(harness).most_common(5):
+            print(f"  {n}× {text}")
+
+    calls = Counter(ws.calls)
+    calls.subtract(calls0)
+    print("volání sheetu:", ", ".join(f"{op} {n}" for op, n in sorted(calls.items()) if n) or "žádná")
+    hits = {fn: (metrics.value("tenis_cache_requests_total", fn=fn, result="hit"),
+                 metrics.value("tenis_cache_requests_total", fn=fn, result="miss"))
+            for fn in ("load_state", "leaderboard_board", "leaderboard_html", "compute_player_stats")}
+    print("cache hit/miss:", ", ".join(f"{fn} {h}/{m}" for fn, (h, m) in hits.items() if h or m))
+    print(f"paměť: max RSS {rss1:.0f} MB, po zahřátí +{rss1 - rss0:.0f} MB, "
+          f"tj. ~{(rss1 - rss0) / max(1, args.sessions):.1f} MB na session")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
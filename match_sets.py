@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+# --- STRUKTUROVANÉ SETY ---
+# Sety jsou v sheetu uložené jako gemy poraženého ('3,-4,-0', viz normalize_sets_input).
+# Tady je jednou pro celý sloupec převedeme na pole (zápas, set, [gemy A, gemy B]),
+# ze kterého se pak počítá zobrazení i statistiky bez dalšího parsování.
+
+MAX_SETS = 5
+EMPTY = -1  # výplň pro neodehrané sety
+
+
+def _split_team(s):
+    return [p.strip() for p in str(s).split("+") if p.strip()]
+
+
+def decode_sets(sets_col: pd.Series):
+    """
+    Vektorově dekóduje celý sloupec 'sets' (jeden průchod, bez smyčky přes řádky).
+
+    Vrací (games, text):
+      games – np.int16 pole tvaru (počet řádků, MAX_SETS, 2), neodehrané sety = EMPTY;
+              řádky s nečitelným zápisem zůstanou celé EMPTY (do statistik nevstupují)
+      text  – Series s textem pro tabulky ('6:3, 4:6'), stejný výstup jako format_sets_display
+    """
+    n = len(sets_col)
+    games = np.full((n, MAX_SETS, 2), EMPTY, dtype=np.int16)
+    text = pd.Series([""] * n, index=sets_col.index, dtype=object)
+    if n == 0:
+        return games, text
+
+    s = sets_col.fillna("").astype(str).str.strip("'").str.strip()
+    s = s.reset_index(drop=True)
+    full_fmt = s.str.contains(":", regex=False).to_numpy()
+
+    # Rozbití na jednotlivé sety (jeden token = jeden set), pozice řádku zůstává v indexu
+    tok = s.str.replace(" ", ",", regex=False).str.split(",").explode().str.strip()
+    tok = tok[tok.notna() & (tok != "")]
+    if tok.empty:
+        return games, text
+
+    row = tok.index.to_numpy()
+    set_no = tok.groupby(level=0).cumcount().to_numpy()
+
+    # a) plný zápis '6:3'
+    has_colon = tok.str.contains(":", regex=False)
+    pair = tok.str.split(":", n=1, expand=True).reindex(columns=[0, 1])
+    ga_full = pd.to_numeric(pair[0], errors="coerce")
+    gb_full = pd.to_numeric(pair[1], errors="coerce")
+
+    # b) zkratka gemů poraženého ('3', '-4', '-0'), stejná pravidla jako format_sets_display
+    num = pd.to_numeric(tok, errors="coerce")
+    num = num.where(num == num.round())
+    neg = tok.str.startswith("-")
+    loser = num.abs()
+    loser = loser.where(~((loser >= 5) & (loser != 6)), 5)
+    win = pd.Series(np.where(num.abs() >= 5, 7, 6), index=tok.index).where(num.notna())
+    ga_short = win.where(~neg, loser)
+    gb_short = loser.where(~neg, win)
+
+    # obě strany jako float (NaN = nečitelné), aby where nic implicitně nepřetypovával
+    ga = ga_full.astype(float).where(has_colon, ga_short.astype(float))
+    gb = gb_full.astype(float).where(has_colon, gb_short.astype(float))
+
+    ok = (ga.notna() & gb.notna()).to_numpy()
+    clean = np.ones(n, dtype=bool)
+    clean[np.unique(row[~ok | (set_no >= MAX_SETS)])] = False
+
+    keep = clean[row] & (set_no < MAX_SETS)
+    games[row[keep], set_no[keep], 0] = ga.to_numpy()[keep].astype(np.int16)
+    games[row[keep], set_no[keep], 1] = gb.to_numpy()[keep].astype(np.int16)
+
+    # Text: nečitelný token se ukáže tak, jak je; plný zápis se nechává beze změny
+    cell = pd.Series(tok.to_numpy(), index=row, dtype=object)
+    cell[ok] = (ga[ok].astype(int).astype(str) + ":" + gb[ok].astype(int).astype(str)).to_numpy()
+    joined = cell.groupby(level=0).agg(", ".join)
+    out = np.full(n, "", dtype=object)
+    out[joined.index.to_numpy()] = joined.to_numpy()
+    out[full_fmt] = s.to_numpy()[full_fmt]
+    text[:] = out
+    return games, text
+
+
+def set_totals(games):
+    """Součty za zápas: gemy, sety a tiebreaky pro obě strany (vše vektorově přes osu setů)."""
+    ga = games[:, :, 0].astype(np.int32)
+    gb = games[:, :, 1].astype(np.int32)
+    played = ga >= 0
+    tiebreak = played & (((ga == 7) & (gb == 6)) | ((ga == 6) & (gb == 7)))
+    return {
+        "games_a": np.where(played, ga, 0).sum(axis=1),
+        "games_b": np.where(played, gb, 0).sum(axis=1),
+        "sets_a": (played & (ga > gb)).sum(axis=1),
+        "sets_b": (played & (gb > ga)).sum(axis=1),
+        "tb_a": (tiebreak & (ga > gb)).sum(axis=1),
+        "tb_b": (tiebreak & (gb > ga)).sum(axis=1),
+        "has_sets": played.any(axis=1),
+    }
+
+
+def player_game_stats(df: pd.DataFrame, games) -> pd.DataFrame:
+    """
+    Gemy, sety a tiebreaky po hráčích (všechny zápasy včetně přáteláků, které mají zapsané sety).
+    """
+    cols = ["Hráč", "Gemy +", "Gemy -", "Sety +", "Sety -", "Úspěšnost setů", "Tiebreaky"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    t = set_totals(games)
+    base = pd.DataFrame({
+        "type": df["type"].astype(str).str.strip().to_numpy(),
+        "team_a": df["team_a"].to_numpy(),
+        "team_b": df["team_b"].to_numpy(),
+        **{k: v for k, v in t.items()},
+    })
+    base = base[base["has_sets"] & base["type"].isin(["singles", "doubles", "friendly_singles", "friendly_doubles"])]
+    if base.empty:
+        return pd.DataFrame(columns=cols)
+
+    side_a = base.assign(player=base["team_a"].map(_split_team)).explode("player")
+    side_a = side_a.rename(columns={"games_a": "gw", "games_b": "gl", "sets_a": "sw", "sets_b": "sl", "tb_a": "tw", "tb_b": "tl"})
+    side_b = base.assign(player=base["team_b"].map(_split_team)).explode("player")
+    side_b = side_b.rename(columns={"games_b": "gw", "games_a": "gl", "sets_b": "sw", "sets_a": "sl", "tb_b": "tw", "tb_a": "tl"})
+
+    long = pd.concat([side_a, side_b], ignore_index=True).dropna(subset=["player"])
+    agg = long.groupby("player")[["gw", "gl", "sw", "sl", "tw", "tl"]].sum()
+
+    sets_total = agg["sw"] + agg["sl"]
+    pct = (agg["sw"] / sets_total.where(sets_total > 0) * 100).fillna(0.0)
+
+    out = pd.DataFrame({
+        "Hráč": agg.index,
+        "Gemy +": agg["gw"].to_numpy(),
+        "Gemy -": agg["gl"].to_numpy(),
+        "Sety +": agg["sw"].to_numpy(),
+        "Sety -": agg["sl"].to_numpy(),
+        "__pct": pct.to_numpy(),
+        "Úspěšnost setů": [f"{p:.1f} %".replace(".", ",") for p in pct],
+        "Tiebreaky": [f"{w}:{l}" for w, l in zip(agg["tw"], agg["tl"])],
+    })
+    out = out.sort_values(["__pct", "Sety +"], ascending=[False, False]).drop(columns=["__pct"])
+    return out.reset_index(drop=True)
+
+
+def mov_multipliers(games) -> np.ndarray:
+    """
+    Násobič podle rozdílu gemů (margin of victory), ln(|rozdíl| + 1).
+    Zápasy bez zapsaných setů mají násobič 1, takže se chovají jako klasické ELO.
+    """
+    t = set_totals(games)
+    diff = np.abs(t["games_a"] - t["games_b"]).astype(float)
+    mult = np.log1p(diff)
+    return np.where(t["has_sets"] & (diff > 0), mult, 1.0)
+
+
+def compute_mov_elo(df: pd.DataFrame, games, initial_ratings: dict) -> dict:
+    """
+    Varianta ELO, kde se změna násobí podle přesvědčivosti výhry.
+    Pořadí (kanonické, jak přijde log) i pravidla (adjust, přáteláky bez změny) jsou stejné jako u replay_elo,
+    základní změna je elo_engine.elo_deltas (stejné K a SCALE).
+    """
+    from elo_engine import elo_deltas  # elo_engine importuje decode_sets odsud
+
+    ratings = {p: float(v) for p, v in initial_ratings.items()}
+    mult = mov_multipliers(games).tolist()
+
+    types = df["type"].astype(str).str.strip().to_numpy()
+    team_a = df["team_a"].to_numpy()
+    team_b = df["team_b"].to_numpy()
+    winners = df["winner"].astype(str).str.strip().to_numpy()
+
+    for i in range(len(df)):
+        rtype = types[i]
+        if rtype == "adjust":
+            p = str(team_a[i]).strip()
+            delta = float(team_b[i])  # čistý log (elo_engine.validate_events)
+            ratings[p] = ratings.get(p, 1000.0) + delta
+            continue
+
+        if rtype not in ("singles", "doubles"):
+            continue
+
+        ta, tb = _split_team(team_a[i]), _split_team(team_b[i])
+        for p in ta + tb:
+            ratings.setdefault(p, 1000.0)
+        da, db = elo_deltas(ratings, rtype, ta, tb, winners[i])
+
+        # Korekce autokorelace (favorit vyhrávající vysoko nesmí ELO nafukovat)
+        ra = sum(ratings[p] for p in ta) / max(1, len(ta))
+        rb = sum(ratings[p] for p in tb) / max(1, len(tb))
+        elo_diff_winner = (ra - rb) if winners[i] == "A" else (rb - ra)
+        autocorr = 2.2 / (max(elo_diff_winner, 0.0) * 0.001 + 2.2)
+        factor = mult[i] * (autocorr if mult[i] != 1.0 else 1.0)
+
+        for p in ta: ratings[p] += da * factor
+        for p in tb: ratings[p] += db * factor
+
+    return ratings
@@ -0,0 +1,177 @@
+import time
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from elo_engine import SCALE
+
+# --- ROZLOSOVÁNÍ ČTYŘHER ---
+# Z přítomných hráčů sestaví kurty 2 na 2 s co nejvyrovnanějšími týmy: cena kurtu je odchylka
+# očekávaného výsledku (ELO, stejně jako elo_deltas) od 50 % plus penalizace za parťáky
+# a soupeře, se kterými hráč hrál nedávno (dlouhá tabulka form.player_matches).
+#
+# Symetrie se nepřehledávají: první volný hráč je vždy na dalším kurtu (pořadí kurtů nehraje
+# roli) a jeho tým je strana A, takže na kurt připadají jen 3 rozdělení. Prohledávání je
+# omezené: z každé úrovně se větví jen BEAM nejlevnějších kurtů, větve dražší než nejlepší
+# nalezený plán se zahodí a po TIME_BUDGET se vrátí nejlepší dosavadní plán. Nakonec se plán
+# dolaďuje výměnami hráčů mezi kurty.
+
+BEAM = 4
+TIME_BUDGET = 0.5           # s
+PARTNER_PENALTY = 0.04      # za každý nedávný společný zápas dvojice
+OPPONENT_PENALTY = 0.01     # za každý nedávný zápas proti sobě (na dvojici hráčů)
+REPEAT_WINDOW_DAYS = 60
+
+SPLITS = ((0, 1, 2, 3), (0, 2, 1, 3), (0, 3, 1, 2))  # (A1, A2, B1, B2) jako pozice ve čtveřici
+
+
+@dataclass
+class Court:
+    team_a: tuple
+    team_b: tuple
+    expected: float   # očekávaný výsledek týmu A (0–1)
+    cost: float
+
+
+@dataclass
+class Plan:
+    courts: list
+    sitting_out: list
+    cost: float
+
+
+def repeat_counts(player_matches: pd.DataFrame, players, today, days=REPEAT_WINDOW_DAYS):
+    """
+    Matice (parťáci, soupeři) nad `players`: kolikrát spolu dvojice hráčů hrála / proti sobě
+    ve čtyřhře za posledních `days` dní (z form.player_matches).
+    """
+    idx = {p: i for i, p in enumerate(players)}
+    n = len(players)
+    partners, opponents = np.zeros((n, n)), np.zeros((n, n))
+    since = pd.Timestamp(today) - pd.Timedelta(days=days)
+    d = player_matches[player_matches["type"].str.contains("doubles") & (player_matches["date"] >= since)]
+    d = d[d["player"].isin(idx) & d["partner"].isin(idx)]
+    if d.empty:
+        return partners, opponents
+
+    me, mate = d["player"].map(idx).to_numpy(), d["partner"].map(idx).to_numpy()
+    np.add.at(partners, (me, mate), 1)
+    opp = d["opponents"].str.split(" + ", n=1, expand=True, regex=False).reindex(columns=[0, 1])
+    for col in (0, 1):
+        o = opp[col].map(idx)
+        known = o.notna().to_numpy()
+        np.add.at(opponents, (me[known], o[known].to_numpy(dtype=int)), 1)
+    return partners, opponents
+
+
+class _Costs:
+    """Ceny kurtů nad indexy hráčů (vektorově pro mnoho čtveřic najednou)."""
+
+    def __init__(self, ratings, partners, opponents):
+        self.r = np.asarray(ratings, dtype=float)
+        self.pp = PARTNER_PENALTY * partners
+        self.op = OPPONENT_PENALTY * opponents
+
+    def splits(self, quads):
+        """quads (k, 4) -> (ceny (k, 3), očekávaný výsledek A (k, 3)) pro 3 rozdělení každé čtveřice."""
+        cost, exp = np.empty((len(quads), 3)), np.empty((len(quads), 3))
+        for s, (a1, a2, b1, b2) in enumerate(SPLITS):
+            A1, A2, B1, B2 = quads[:, a1], quads[:, a2], quads[:, b1], quads[:, b2]
+            ra, rb = (self.r[A1] + self.r[A2]) / 2, (self.r[B1] + self.r[B2]) / 2
+            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
+            op = self.op[A1, B1] + self.op[A1, B2] + self.op[A2, B1] + self.op[A2, B2]
+            cost[:, s] = np.abs(ea - 0.5) + self.pp[A1, A2] + self.pp[B1, B2] + op
+            exp[:, s] = ea
+        return cost, exp
+
+    def best(self, quads):
+        """Nejlepší rozdělení každé čtveřice: (cena, index rozdělení, očekávaný výsledek)."""
+        cost, exp = self.splits(quads)
+        s = cost.argmin(axis=1)
+        rows = np.arange(len(quads))
+        return cost[rows, s], s, exp[rows, s]
+
+
+def _search(costs, players, deadline):
+    """Omezené prohledávání do hloubky; vrací (cena, [(čtveřice, rozdělení)])."""
+    best = [np.inf, None]
+
+    def dfs(free, chosen, total):
+        if time.perf_counter() > deadline and best[1] is not None:
+            return
+        if not free:
+            if total < best[0]:
+                best[0], best[1] = total, list(chosen)
+            return
+        first, rest = free[0], free[1:]
+        trios = np.array(list(combinations(rest, 3)), dtype=int)
+        quads = np.column_stack([np.full(len(trios), first), trios])
+        cost, split, _ = costs.best(quads)
+        for k in np.argsort(cost, kind="stable")[:BEAM]:
+            if total + cost[k] >= best[0]:
+                break  # seřazené podle ceny, další jsou dražší
+            used = set(trios[k])
+            chosen.append((tuple(quads[k]), int(split[k])))
+            dfs([p for p in rest if p not in used], chosen, total + cost[k])
+            chosen.pop()
+
+    dfs(list(range(len(players))), [], 0.0)
+    return best[0], best[1]
+
+
+def _improve(costs, courts, deadline):
+    """Výměny hráčů mezi dvojicemi kurtů, dokud se celková cena zlepšuje (nebo dojde čas)."""
+    quads = [list(q) for q, _ in courts]
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i, j in combinations(range(len(quads)), 2):
+            a, b = quads[i], quads[j]
+            cand = [(x, y) for x in range(4) for y in range(4)]
+            qa = np.array([a[:x] + [b[y]] + a[x + 1:] for x, y in cand])
+            qb = np.array([b[:y] + [a[x]] + b[y + 1:] for x, y in cand])
+            now = costs.best(np.array([a, b]))[0].sum()
+            after = costs.best(qa)[0] + costs.best(qb)[0]
+            k = int(after.argmin())
+            if after[k] < now - 1e-12:
+                quads[i], quads[j] = qa[k].tolist(), qb[k].tolist()
+                improved = True
+    return [tuple(q) for q in quads]
+
+
+def plan_doubles(players, ratings, partners=None, opponents=None, sit_out=None, time_budget=TIME_BUDGET):
+    """
+    Rozlosuje hráče na kurty 2 na 2. `players` v pořadí příchodu: když nejde o násobek 4,
+    sedí posledních n % 4 (nebo `sit_out`). `ratings` hráč -> ELO (chybějící 1000),
+    `partners`/`opponents` matice nad `players` (repeat_counts), bez nich bez penalizace.
+    """
+    players = list(dict.fromkeys(players))
+    sit_out = [p for p in players if p in set(sit_out or [])]
+    keep = [i for i, p in enumerate(players) if p not in set(sit_out)]
+    extra = len(keep) % 4
+    if extra:
+        sit_out += [players[i] for i in keep[-extra:]]
+        keep = keep[:-extra]
+    playing = [players[i] for i in keep]
+    if not playing:
+        return Plan(courts=[], sitting_out=sit_out, cost=0.0)
+
+    n = len(players)
+    partners = np.zeros((n, n)) if partners is None else np.asarray(partners)
+    opponents = np.zeros((n, n)) if opponents is None else np.asarray(opponents)
+    ix = np.ix_(keep, keep)
+    costs = _Costs([ratings.get(p, 1000.0) for p in playing], partners[ix], opponents[ix])
+
+    deadline = time.perf_counter() + time_budget
+    _, chosen = _search(costs, playing, deadline)
+    quads = _improve(costs, chosen, deadline + time_budget / 2)
+
+    cost, split, exp = costs.best(np.array(quads))
+    courts = []
+    for q, s, c, e in zip(quads, split, cost, exp):
+        a1, a2, b1, b2 = (playing[q[k]] for k in SPLITS[s])
+        courts.append(Court(team_a=(a1, a2), team_b=(b1, b2), expected=float(e), cost=float(c)))
+    courts.sort(key=lambda c: -sum(ratings.get(p, 1000.0) for p in c.team_a + c.team_b))
+    return Plan(courts=courts, sitting_out=sit_out, cost=float(cost.sum()))
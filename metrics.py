@@ -0,0 +1,179 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- PROVOZNÍ METRIKY ---
+# Počítadla a histogramy pojmenovaných operací (stahování ze Sheets, přehrávání ELO,
+# zápisy, cache, doba běhu sekcí) v paměti procesu, ven ve formátu Prometheus:
+#   TENIS_METRICS_FILE=/var/lib/node_exporter/tenis.prom   soubor pro textfile collector
+#   TENIS_METRICS_PORT=9108                                  endpoint /metrics pro scrape
+# api.py má vlastní /metrics.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_FILE = os.environ.get("TENIS_METRICS_FILE")
+METRICS_PORT = int(os.environ.get("TENIS_METRICS_PORT") or 0)
+
+HELP = {
+    "tenis_sheets_requests_seconds": "Doba volání Google Sheets API podle operace.",
+    "tenis_sheets_fetches_total": "Počet stažení všech řádků sheetu.",
+    "tenis_sheets_rows_fetched_total": "Počet stažených řádků sheetu.",
+    "tenis_replay_seconds": "Doba zpracování logu (validace + ELO + historie) podle zdroje.",
+    "tenis_write_seconds": "Doba zápisu / mazání z aplikace podle operace.",
+    "tenis_cache_requests_total": "Volání cachovaných funkcí podle výsledku (hit/miss).",
+    "tenis_cache_clears_total": "Počet vymazání cache podle důvodu.",
+    "tenis_rerun_seconds": "Doba běhu skriptu podle sekce.",
+    "tenis_fragment_seconds": "Doba samostatného běhu fragmentu.",
+    "tenis_journal_synced_rows_total": "Řádky odeslané z lokálního deníku do sheetu.",
+    "tenis_api_requests_seconds": "Doba obsluhy požadavku API podle cesty.",
+    "tenis_bootstrap_seconds": "Doba výpočtu bootstrap intervalů ELO (všechny replikace).",
+    "tenis_bootstrap_errors_total": "Počet neúspěšných výpočtů bootstrap intervalů ELO.",
+}
+
+_lock = threading.Lock()
+_counters = {}     # (jméno, štítky) -> hodnota
+_histograms = {}   # (jméno, štítky) -> [počty v koších..., součet, počet]
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Přičte k počítadlu."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """Zapíše jednu dobu (v sekundách) do histogramu."""
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+        for i, b in enumerate(BUCKETS):
+            if seconds <= b:
+                h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+def value(name, **labels):
+    """Aktuální hodnota počítadla (0, když ještě nevzniklo)."""
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+@contextmanager
+def timer(name, **labels):
+    """with timer("tenis_write_seconds", op="save_match"): ... (změří i běh, který spadne)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0, **labels)
+
+
+_calls = threading.local()
+
+
+def cached(name, cache):
+    """
+    Jako dekorátor `cache` (st.cache_data / st.cache_resource), navíc počítá hity a missy:
+    miss = tělo funkce se opravdu spustilo. Zanořená cachovaná volání se počítají zvlášť.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            _calls.stack[-1] = True
+            return fn(*args, **kwargs)
+
+        wrapped = cache(body)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stack = _calls.__dict__.setdefault("stack", [])
+            stack.append(False)
+            try:
+                return wrapped(*args, **kwargs)
+            finally:
+                inc("tenis_cache_requests_total", fn=name, result="miss" if stack.pop() else "hit")
+
+        wrapper.clear = wrapped.clear
+        return wrapper
+    return deco
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    esc = (lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def render():
+    """Všechny metriky v textovém formátu Prometheus."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, list(v)) for k, v in _histograms.items())
+
+    out, typed = [], set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in HELP:
+                out.append(f"# HELP {name} {HELP[name]}")
+            out.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        header(name, "counter")
+        out.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), h in histograms:
+        header(name, "histogram")
+        for b, n in zip(BUCKETS, h):
+            out.append(f"{name}_bucket{_labels(labels, [('le', repr(b))])} {n}")
+        out.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {h[-1]}")
+        out.append(f"{name}_sum{_labels(labels)} {h[-2]:.6f}")
+        out.append(f"{name}_count{_labels(labels)} {h[-1]}")
+    return "\n".join(out) + "\n"
+
+
+def write_textfile(path=METRICS_FILE):
+    """Zapíše metriky pro textfile collector node exporteru (atomicky); bez cesty nic nedělá."""
+    if not path:
+        return
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render())
+        os.replace(tmp, path)
+    except OSError:
+        pass  # metriky nesmí shodit aplikaci
+
+
+def serve(port=METRICS_PORT, host="0.0.0.0"):
+    """Spustí /metrics na pozadí (vlákno); vrací server, bez portu None."""
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode("utf-8")
+            self.send_response(200 if self.path.rstrip("/") in ("", "/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
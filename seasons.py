@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from elo_engine import (
+    MATCH_TYPES, data_version, elo_meta, get_retired_players, new_elo_state, ranking_rows, replay_elo,
+)
+
+# --- SEZÓNY ---
+# Čistý log rozdělený podle data do sezón. Každá sezóna má vlastní ELO (navazuje na konec
+# předchozí, volitelně stažené k 1000), bilanci a aktivitu hráčů a žebříček – vše spočítané
+# jedním průchodem řádků sezóny. Uzavřená sezóna se při další verzi dat převezme beze změny,
+# pokud se její řádky nezměnily (otisk); přepočítává se jen aktuální sezóna, případně
+# sezóny po té, do které někdo dopsal nebo smazal zápas zpětně.
+
+SEASONS = []        # [(název, od, do)] s daty `date`; prázdné = kalendářní roky
+SOFT_RESET = 0.0    # o jaký podíl se ELO na přelomu sezóny stáhne k RESET_TO (0 = pokračuje, 1 = všichni od nuly)
+RESET_TO = 1000.0
+WL_SEASON_COLUMNS = ["games", "wins", "losses", "last_date"]
+
+
+@dataclass
+class Season:
+    """Spočítaná sezóna pro jednu verzi dat."""
+    name: str
+    start: date
+    end: date
+    fingerprint: str          # verze řádků sezóny (data_version přes jejich otisky)
+    closed: bool              # konec sezóny je před dneškem -> už se nemění
+    elo: dict                 # stav replay_elo na konci sezóny (u aktuální teď)
+    win_loss: pd.DataFrame    # hráč -> zápasy, výhry, prohry (i přáteláky), poslední zápas
+    retired: set              # ukončené kariéry ke konci sezóny
+    ranking: list             # ranking_rows ke konci sezóny (u aktuální k dnešku)
+
+    @property
+    def elo_meta(self):
+        return elo_meta(self.elo)
+
+
+def season_ranges(dates, today, seasons=None):
+    """[(název, od, do)]: zadané sezóny, jinak kalendářní roky od prvního zápasu do letoška."""
+    seasons = SEASONS if seasons is None else seasons
+    if seasons:
+        return sorted(seasons, key=lambda s: s[1])
+    years = [d.year for d in dates if d is not None] + [today.year]
+    return [(str(y), date(y, 1, 1), date(y, 12, 31)) for y in range(min(years), max(years) + 1)]
+
+
+def player_win_loss(log: pd.DataFrame) -> pd.DataFrame:
+    """Bilance a aktivita hráčů v zápasech logu (index = hráč, WL_SEASON_COLUMNS)."""
+    m = log[log["type"].isin(MATCH_TYPES)]
+    if m.empty:
+        return pd.DataFrame(columns=WL_SEASON_COLUMNS).rename_axis("player")
+    d = pd.to_datetime(m["date"], format="%d.%m.%Y", errors="coerce")
+    sides = [
+        pd.DataFrame({"player": m[team].str.split("+"), "won": m["winner"] == side, "date": d}).explode("player")
+        for team, side in (("team_a", "A"), ("team_b", "B"))
+    ]
+    df = pd.concat(sides, ignore_index=True)
+    out = df.groupby("player").agg(games=("won", "size"), wins=("won", "sum"), last_date=("date", "max"))
+    out["wins"] = out["wins"].astype(int)
+    out["losses"] = out["games"] - out["wins"]
+    out["last_date"] = out["last_date"].dt.date
+    return out[WL_SEASON_COLUMNS]
+
+
+def _start_state(prev):
+    """Stav replay_elo na začátku sezóny: ELO hráčů i dvojic po předchozí sezóně (se soft resetem), jinak od INITIAL_RATINGS."""
+    state = new_elo_state()
+    if prev is not None:
+        reset = lambda values: {k: RESET_TO + (r - RESET_TO) * (1.0 - SOFT_RESET) for k, r in values.items()}
+        ratings = reset(prev["ratings"])
+        state["ratings"], state["base"], state["pairs"] = ratings, dict(ratings), reset(prev["pairs"])
+    return state
+
+
+def _build_season(name, start, end, rows, upto, fingerprint, prev, today):
+    elo = replay_elo(rows, _start_state(prev))
+    retired = get_retired_players(upto)
+    closed = end < today
+    return Season(
+        name=name, start=start, end=end, fingerprint=fingerprint, closed=closed, elo=elo,
+        win_loss=player_win_loss(rows), retired=retired,
+        ranking=ranking_rows(elo_meta(elo), retired, end if closed else today),
+    )
+
+
+def update_seasons(prev, log: pd.DataFrame, hashes: np.ndarray, today, seasons=None):
+    """
+    Sezóny pro aktuální log (chronologicky). Z `prev` (výsledek minulého volání) se převezmou
+    uzavřené sezóny se stejným otiskem řádků; první změněná sezóna a všechny po ní se přepočítají
+    (navazující ELO), ostatní se nesahá. `hashes` = EngineState.hashes (otisky řádků sheetu).
+    """
+    dates = pd.to_datetime(log["date"], format="%d.%m.%Y", errors="coerce").dt.date
+    row_hashes = np.asarray(hashes)[log.index.to_numpy()]
+    frozen = {s.name: s for s in prev or [] if s.closed}
+
+    out, carry, dirty = [], None, False
+    for name, start, end in season_ranges(dates, today, seasons):
+        in_season = ((dates >= start) & (dates <= end)).to_numpy()
+        fingerprint = data_version(row_hashes[in_season])
+        old = frozen.get(name)
+        if not dirty and old is not None and (old.start, old.end, old.fingerprint) == (start, end, fingerprint):
+            out.append(old)
+        else:
+            dirty = True
+            out.append(_build_season(name, start, end, log[in_season], log[(dates <= end).to_numpy()],
+                                     fingerprint, carry, today))
+        carry = out[-1].elo
+    return out
+
+
+def current_season(seasons, today):
+    """Sezóna, do které patří dnešek (nebo poslední před ním); None bez sezón."""
+    past = [s for s in seasons if s.start <= today]
+    return past[-1] if past else None
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+
+import metrics
+import snapshot
+from elo_engine import COLUMNS, advance_state, values_to_frame
+
+# --- GOOGLE SHEETS ---
+# Přístup ke sheetu a synchronizace zpracovaného stavu, sdílené aplikací (tenis.py)
+# i samostatnými nástroji (api.py), aby obě strany počítaly ze stejného jádra.
+# gspread a google-auth se načítají až při otevření sheetu, takže start ze snapshotu
+# (nebo api/export s --no-sync) je nepotřebuje.
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/18By2jSoHEXI1WLCBYh8YXnMaCtfPNM1GsruV-pfdsXI/edit"
+KEYFILE = "teniselo-98a88e562ec1.json"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+def service_account_info():
+    """Přihlašovací údaje mimo Streamlit: proměnná GCP_SERVICE_ACCOUNT (JSON) nebo None (-> KEYFILE)."""
+    raw = os.environ.get("GCP_SERVICE_ACCOUNT")
+    if raw:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+    return None
+
+
+def open_worksheet(info=None):
+    """Autorizuje service account a vrátí první list spreadsheetu."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = None
+    if info:
+        try:
+            creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+        except Exception:
+            creds = None
+    if creds is None:
+        creds = Credentials.from_service_account_file(KEYFILE, scopes=SCOPES)
+    gc = gspread.authorize(creds)
+    sh = gc.open_by_url(SHEET_URL)
+    return sh.sheet1
+
+
+def get_remote_version(ws):
+    """Čas poslední změny spreadsheetu (jedno volání metadat místo stahování všech řádků)."""
+    try:
+        with metrics.timer("tenis_sheets_requests_seconds", op="metadata"):
+            return ws.spreadsheet.get_lastUpdateTime()
+    except Exception:
+        return None
+
+
+def _fetch_state(state, ws, remote_version):
+    with metrics.timer("tenis_sheets_requests_seconds", op="get_all_values"):
+        values = ws.get_all_values()
+    metrics.inc("tenis_sheets_fetches_total")
+    metrics.inc("tenis_sheets_rows_fetched_total", max(len(values) - 1, 0))
+    if not values:
+        ws.append_row(COLUMNS)
+    t0 = time.perf_counter()
+    state = advance_state(state, values_to_frame(values), remote_version)
+    metrics.observe("tenis_replay_seconds", time.perf_counter() - t0, source="sheets")
+    return state
+
+
+def sync_state(state, ws, snapshot_dir=None):
+    """
+    Posune zpracovaný stav na aktuální verzi sheetu. Když se verze shoduje, nic se nestahuje
+    ani nepřepočítává; jinak se stáhnou data a přehrají jen nové řádky (advance_state).
+
+    Se složkou snapshotu se to děje pod zámkem sdíleným mezi procesy: kdo zámek dostane
+    jako druhý, najde na disku verzi, kterou mezitím postavil první, a jen ji namapuje.
+    """
+    remote_version = get_remote_version(ws)
+    if state is not None and remote_version and state.remote_version == remote_version:
+        return state
+    if not snapshot_dir:
+        return _fetch_state(state, ws, remote_version)
+
+    with snapshot.lock(snapshot_dir):
+        shared = snapshot.load(snapshot_dir)
+        if shared is not None and remote_version and shared.remote_version == remote_version:
+            return shared
+
+        # Na disku může být novější základ, než drží tenhle proces
+        base = shared if shared is not None else state
+        state = _fetch_state(base, ws, remote_version)
+        try:
+            snapshot.save(state, snapshot_dir)
+        except OSError:
+            pass  # bez zapisovatelného disku to jen pojede bez snapshotu
+    return state
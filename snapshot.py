@@ -0,0 +1,247 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: bez zámku, každý proces si stav případně postaví sám
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from elo_engine import COLUMNS, REPORT_COLUMNS, WL_COLUMNS, WL_KINDS, EngineState
+from match_sets import MAX_SETS
+
+# --- SNAPSHOT NA DISKU ---
+# Zpracovaný log a odvozený stav (ELO, historie, sety) uložený jako Arrow IPC soubory.
+# Při startu procesu se soubory namapují do paměti (memory-map) a aplikace hned má
+# stav z minula: číselné sloupce (sety, hashe řádků) se čtou bez kopie přímo z mapy,
+# textové sloupce převede Arrow po celých sloupcích (to_pandas). Se sheetem se pak jen
+# porovná verze a případně dopočítají nové řádky.
+# Složku může sdílet víc procesů (repliky aplikace, API): novou verzi staví jen ten,
+# kdo drží zámek (lock), ostatní ji po uvolnění zámku jen namapují.
+
+SNAPSHOT_FORMAT = 6  # zvýšit při změně struktury souborů (starý snapshot se pak ignoruje)
+
+MANIFEST = "manifest.json"
+EVENTS = "events.arrow"
+LOG = "log.arrow"
+REPORT = "report.arrow"
+GAMES = "games.arrow"
+RATINGS = "ratings.arrow"
+HISTORY = "history.arrow"
+WIN_LOSS = "winloss.arrow"
+TRAJECTORY = "trajectory.arrow"
+PAIR_TRAJECTORY = "pairs.arrow"    # ELO dvojic = poslední bod trajektorie, zvlášť se neukládá
+LOCK = ".lock"
+
+
+@contextmanager
+def lock(path: str):
+    """Exkluzivní zámek složky snapshotu mezi procesy (flock); bez zapisovatelného disku jen projde."""
+    try:
+        os.makedirs(path, exist_ok=True)
+        f = open(os.path.join(path, LOCK), "a+")
+    except OSError:
+        yield
+        return
+    with f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_table(table: pa.Table, path: str, version: str):
+    table = table.replace_schema_metadata({"data_version": version})
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_table(path: str, version: str):
+    """Namapuje soubor do paměti; None když patří k jiné verzi dat."""
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    meta = table.schema.metadata or {}
+    if meta.get(b"data_version", b"").decode() != version:
+        return None
+    return table
+
+
+def _ratings_table(state: EngineState) -> pa.Table:
+    rows = {"player": [], "rating": [], "base": [], "last_date": [], "last_delta": [], "played": []}
+
+    def add(player, rating, base=None, last_date=None, last_delta=None, played=None):
+        rows["player"].append(player)
+        rows["rating"].append(float(rating))
+        rows["base"].append(None if base is None else float(base))
+        rows["last_date"].append(last_date)
+        rows["last_delta"].append(None if last_delta is None else float(last_delta))
+        rows["played"].append(played)
+
+    elo = state.elo
+    for p, r in elo["ratings"].items():
+        add(p, r, elo["base"].get(p), elo["last_date"].get(p), elo["last_delta"].get(p), elo["played_elo_match"].get(p))
+
+    return pa.table({
+        "player": pa.array(rows["player"], pa.string()),
+        "rating": pa.array(rows["rating"], pa.float64()),
+        "base": pa.array(rows["base"], pa.float64()),
+        "last_date": pa.array(rows["last_date"], pa.date32()),
+        "last_delta": pa.array(rows["last_delta"], pa.float64()),
+        "played": pa.array(rows["played"], pa.bool_()),
+    })
+
+
+def _win_loss_table(state: EngineState) -> pa.Table:
+    parts = [wl.reset_index().assign(kind=kind) for kind, wl in state.win_loss.items()]
+    df = pd.concat(parts, ignore_index=True)
+    return pa.table({
+        "kind": pa.array(df["kind"].tolist(), pa.string()),
+        "key": pa.array(df["key"].tolist(), pa.string()),
+        "p1": pa.array(df["p1"].tolist(), pa.string()),
+        "p2": pa.array(df["p2"].tolist(), pa.string()),
+        "wins": pa.array(df["wins"].to_numpy(dtype=np.int64), pa.int64()),
+        "losses": pa.array(df["losses"].to_numpy(dtype=np.int64), pa.int64()),
+    })
+
+
+def _trajectory_table(traj) -> pa.Table:
+    points = [pt for p in traj for pt in traj[p]]
+    return pa.table({
+        "player": pa.array([p for p in traj for _ in traj[p]], pa.string()),
+        "row": pa.array([i for i, _, _ in points], pa.int64()),
+        "delta": pa.array([d for _, d, _ in points], pa.float64()),
+        "rating": pa.array([r for _, _, r in points], pa.float64()),
+    })
+
+
+def _trajectory_dict(table: pa.Table) -> dict:
+    """Tabulka z _trajectory_table -> {hráč: [(řádek, změna, ELO), ...]}; body hráče jsou v souboru za sebou."""
+    players = table.column("player").to_numpy(zero_copy_only=False)
+    if not len(players):
+        return {}
+    rows, deltas, ratings = (table.column(c).to_numpy().tolist() for c in ("row", "delta", "rating"))
+    points = list(zip(rows, deltas, ratings))
+    starts = np.flatnonzero(np.r_[True, players[1:] != players[:-1]])
+    ends = np.r_[starts[1:], len(players)]
+    return {players[a]: points[a:b] for a, b in zip(starts.tolist(), ends.tolist())}
+
+
+def save(state: EngineState, path: str):
+    """Uloží stav do složky path (každý soubor atomicky, manifest až nakonec)."""
+    os.makedirs(path, exist_ok=True)
+    v = state.data_version
+
+    events = pa.table({
+        **{c: pa.array(state.events[c].astype(str).tolist(), pa.string()) for c in COLUMNS},
+        "__hash": pa.array(state.hashes, pa.uint64()),
+    })
+    _write_table(events, os.path.join(path, EVENTS), v)
+    log = pa.table({
+        **{c: pa.array(state.log[c].astype(str).tolist(), pa.string()) for c in COLUMNS},
+        "__row": pa.array(state.log.index.to_numpy(dtype=np.int64), pa.int64()),
+        "__sets_txt": pa.array(state.sets_txt.astype(str).tolist(), pa.string()),
+    })
+    _write_table(log, os.path.join(path, LOG), v)
+    report = pa.table({c: pa.array(state.report[c].tolist(), pa.int64() if c == "Řádek" else pa.string()) for c in REPORT_COLUMNS})
+    _write_table(report, os.path.join(path, REPORT), v)
+    _write_table(pa.table({"games": pa.array(np.ascontiguousarray(state.games).reshape(-1))}), os.path.join(path, GAMES), v)
+    _write_table(_ratings_table(state), os.path.join(path, RATINGS), v)
+    _write_table(pa.Table.from_pandas(state.history.astype({"row_idx": "int64"}), preserve_index=False), os.path.join(path, HISTORY), v)
+    _write_table(_win_loss_table(state), os.path.join(path, WIN_LOSS), v)
+    _write_table(_trajectory_table(state.elo["trajectory"]), os.path.join(path, TRAJECTORY), v)
+    _write_table(_trajectory_table(state.elo["pair_trajectory"]), os.path.join(path, PAIR_TRAJECTORY), v)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "data_version": v,
+        "remote_version": state.remote_version,
+        "n_rows": int(len(state.events)),
+        "tail_date": state.tail_date.isoformat(),
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+def manifest_mtime(path: str):
+    """Čas změny manifestu (save ho zapisuje jako poslední), None když snapshot chybí."""
+    try:
+        return os.stat(os.path.join(path, MANIFEST)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load(path: str):
+    """Načte snapshot ze složky path; None když chybí, je jiného formátu nebo nekonzistentní."""
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            return None
+        v = manifest["data_version"]
+
+        tables = {}
+        for name in (EVENTS, LOG, REPORT, GAMES, RATINGS, HISTORY, WIN_LOSS, TRAJECTORY, PAIR_TRAJECTORY):
+            t = _read_table(os.path.join(path, name), v)
+            if t is None:
+                return None
+            tables[name] = t
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None
+
+    ev = tables[EVENTS]
+    n = ev.num_rows
+    if n != manifest.get("n_rows"):
+        return None
+
+    # Řetězce převede Arrow po sloupcích (to_pandas), čísla se čtou přímo z namapovaného souboru
+    events = ev.select(COLUMNS).to_pandas()
+    hashes = ev.column("__hash").to_numpy()
+
+    lg = tables[LOG]
+    log_index = pd.Index(lg.column("__row").to_numpy())
+    log = lg.select(COLUMNS).to_pandas().set_axis(log_index)
+    sets_txt = lg.column("__sets_txt").to_pandas().set_axis(log_index).rename(None)
+    games = tables[GAMES].column("games").to_numpy().reshape(lg.num_rows, MAX_SETS, 2)  # bez kopie, rovnou z mapy
+
+    report = tables[REPORT].to_pandas()
+    report.index = report["Řádek"].to_numpy() - 2
+
+    rt = tables[RATINGS].to_pandas()
+    players = rt["player"]
+    elo = {"ratings": dict(zip(players, rt["rating"].tolist()))}
+    for col, key in (("base", "base"), ("last_date", "last_date"), ("last_delta", "last_delta"), ("played", "played_elo_match")):
+        known = rt[col].notna()
+        elo[key] = dict(zip(players[known], rt[col][known].tolist()))
+
+    for name, key in ((TRAJECTORY, "trajectory"), (PAIR_TRAJECTORY, "pair_trajectory")):
+        elo[key] = _trajectory_dict(tables[name])
+    elo["pairs"] = {k: points[-1][2] for k, points in elo["pair_trajectory"].items()}
+
+    # Arrow vrací chybějící hodnoty jako None, tabulky je ale dřív ukazovaly jako NaN
+    history = tables[HISTORY].to_pandas()
+    history = history.where(history.notna(), np.nan)
+
+    wl_all = tables[WIN_LOSS].to_pandas()
+    win_loss = {
+        kind: wl_all[wl_all["kind"] == kind].set_index("key")[WL_COLUMNS].rename_axis("key")
+        for kind in WL_KINDS
+    }
+
+    return EngineState(
+        events=events, hashes=hashes, log=log, report=report, games=games, sets_txt=sets_txt, elo=elo,
+        history=history, win_loss=win_loss, tail_date=date.fromisoformat(manifest["tail_date"]),
+        remote_version=manifest.get("remote_version"), data_version=v,
+    )
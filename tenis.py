@@ -1,202 +1,160 @@
+import time
+RUN_T0 = time.perf_counter()  # začátek běhu (včetně importů při prvním běhu procesu)
+
 import pandas as pd
 import os
-import math
-import gspread
+import copy
+import functools
+import threading
+import uuid
 import streamlit as st
 import streamlit_authenticator as stauth
 import base64
 import calendar
-import plotly.express as px
 import streamlit.components.v1 as components
-from google.oauth2.service_account import Credentials
-from datetime import datetime, timedelta
-
-# --- GLOBÁLNÍ POMOCNÉ FUNKCE (Musí být nahoře) ---
-def get_players(team_str):
-    """Rozdělí řetězec týmu (např. 'Tobi+Kuba') na seznam jmen."""
-    return [p.strip() for p in str(team_str).split("+") if p.strip()]
-
-def parse_ddmmyyyy(s: str):
-    """Bezpečně převede text na datum."""
-    s = str(s or "").strip()
-    try:
-        return datetime.strptime(s, "%d.%m.%Y").date()
-    except:
-        return None
-
-def format_sets_display(sets_raw):
-    """Převede starý formát s ohledem na to, kdo set vyhrál (podle znaménka mínus)."""
-    if not sets_raw: return ""
-    s = str(sets_raw).strip("'").strip()
-    if not s: return ""
-    
-    if ":" in s:
-        return s
-        
-    parts = [p.strip() for p in s.replace(" ", ",").split(",") if p.strip()]
-    formatted = []
-    
-    for p in parts:
-        if p == "-0":
-            formatted.append("0:6")
-            continue
-        if p == "0":
-            formatted.append("6:0")
-            continue
-            
-        try:
-            v = int(p)
-            n = abs(v)
-            
-            if n == 6:
-                if v > 0: formatted.append("7:6")
-                else: formatted.append("6:7")
-            elif n >= 5:
-                if v > 0: formatted.append("7:5")
-                else: formatted.append("5:7")
-            else:
-                if v > 0: formatted.append(f"6:{n}")
-                else: formatted.append(f"{n}:6")
-        except:
-            formatted.append(p)
-            
-    return ", ".join(formatted)
-
-def normalize_sets_input(user_input):
-    """Převede zápis '6:3, 4:6, 7:5' i zkratky '3, -4, 5' vždy na čistý DB formát ('3,-4,5')."""
-    if not user_input: return ""
-    
-    # Rozdělíme vstup podle čárky a zahodíme mezery pro snazší zpracování
-    parts = [p.strip() for p in user_input.replace(" ", "").split(",") if p.strip()]
-    
-    final_loser_games = []
-    for p in parts:
-        if ":" in p:
-            try:
-                a_str, b_str = p.split(":")
-                a = int(a_str)
-                b = int(b_str)
-                # Pokud vyhrál Tým A (např. 6:3), uložíme jen gemy poraženého, tedy '3'
-                if a > b:
-                    final_loser_games.append(str(b))
-                # Pokud vyhrál Tým B (např. 4:6), uložíme to jako mínus, tedy '-4'
-                elif a < b:
-                    if a == 0:
-                        final_loser_games.append("-0") # Speciální případ pro 0:6
-                    else:
-                        final_loser_games.append(str(-a))
-                else:
-                    final_loser_games.append(str(a))
-            except:
-                continue
-        else:
-            # Uživatel zadal rovnou zkrácený formát (např. 3 nebo -4)
-            try:
-                if p == "-0":
-                    final_loser_games.append("-0")
-                else:
-                    final_loser_games.append(str(int(p)))
-            except:
-                continue
-                
-    return ",".join(final_loser_games)
+from datetime import datetime
+from match_sets import player_game_stats, compute_mov_elo
+import snapshot
+import sheets
+import bulk_import
+import journal
+import leaderboard
+import metrics
+import seasons
+import form
+import matchmaking
+import confidence
+from elo_engine import (
+    INITIAL_RATINGS, COLUMNS, get_players, parse_ddmmyyyy, normalize_sets_input,
+    get_retired_players, REJECTED, preview_match, match_key,
+    compute_player_stats, singles_h2h_matches, pair_key,
+)
 
 # --- KONFIGURACE ---
 SHEET_NAME = "tennis_elo_template"
 WORKSHEET = "tennis_elo_template"
-KEYFILE = "teniselo-98a88e562ec1.json"
-K_SINGLES = 24
-K_DOUBLES = 36
-SCALE = 400
-
-INITIAL_RATINGS = {
-    "Tobi": 1200, "Kuba": 1100, "Jirka": 1040, 
-    "Kávič": 1040, "Ríša": 1030, "Novas": 1030
-}
+SNAPSHOT_DIR = os.environ.get("TENIS_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.realpath(__file__)), ".snapshot"))
 
-COLUMNS = ["date", "type", "team_a", "team_b", "winner", "score", "sets", "reason", "author"]
+def gcp_info():
+    try:
+        if "gcp_service_account" in st.secrets:
+            return st.secrets["gcp_service_account"].to_dict()
+    except Exception:
+        pass
+    return None
 
 @st.cache_resource
 def get_ws():
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds = None
+    return sheets.open_worksheet(gcp_info())
+
+@st.cache_resource
+def get_snapshot():
+    """Stav z disku načtený jednou za život procesu (memory-map), dál se jen posouvá."""
+    return {"state": snapshot.load(SNAPSHOT_DIR), "offline": None}
+
+@metrics.cached("journal_overlay", st.cache_resource(max_entries=2))
+def overlay_state(data_version, entry_ids, _state, _pending):
+    """
+    Stav + čekající zápisy z deníku (journal.overlay), jednou za verzi dat a sadu zápisů.
+    Zpětně datovaný zápis vynutí plný přepočet; bez cache by proběhl při každém load_state (TTL 10 s).
+    """
+    return journal.overlay(_state, _pending)
+
+@metrics.cached("load_state", st.cache_resource(ttl=10))
+def load_state():
+    """
+    Aktuální zpracovaný stav (data + ELO + historie), viz sheets.sync_state, včetně zápisů,
+    které ještě čekají v lokálním deníku. Když je sheet nedostupný, jede se ze snapshotu.
+    """
+    holder = get_snapshot()
     try:
-        if "gcp_service_account" in st.secrets:
-            creds = Credentials.from_service_account_info(
-                st.secrets["gcp_service_account"],
-                scopes=scopes
-            )
-    except Exception:
-        creds = None
-    if creds is None:
-        creds = Credentials.from_service_account_file(KEYFILE, scopes=scopes)
-    gc = gspread.authorize(creds)
-    sh = gc.open_by_url("https://docs.google.com/spreadsheets/d/18By2jSoHEXI1WLCBYh8YXnMaCtfPNM1GsruV-pfdsXI/edit")
-    return sh.sheet1
-    
-@st.cache_data(ttl=10)
-def load_data():
-    ws = get_ws()
-    values = ws.get_all_values()
+        holder["state"] = sheets.sync_state(holder["state"], get_ws(), SNAPSHOT_DIR)
+        holder["offline"] = None
+    except Exception as e:
+        if holder["state"] is None:
+            raise
+        holder["offline"] = str(e)
+    state, pending = holder["state"], journal.read(journal.JOURNAL_PATH)[0]
+    return overlay_state(state.data_version, tuple(e["id"] for e in pending), state, pending)
+
+@st.cache_resource
+def journal_worker():
+    """Vlákno, které na pozadí posílá zápisy z deníku do Google Sheets; set() ho vzbudí hned."""
+    wake = threading.Event()
+    info = gcp_info()
+
+    def loop():
+        ws = None
+        while True:
+            wake.wait(journal.SYNC_SECONDS)
+            wake.clear()
+            try:
+                if journal.status(journal.JOURNAL_PATH)["pending"]:
+                    ws = ws or sheets.open_worksheet(info)
+                    journal.sync(journal.JOURNAL_PATH, ws)
+            except Exception:
+                ws = None  # sheet nedostupný, zkusí se v dalším kole
+
+    threading.Thread(target=loop, name="journal-sync", daemon=True).start()
+    return wake
 
-    if not values:
-        ws.append_row(COLUMNS)
-        return pd.DataFrame(columns=COLUMNS)
+@st.cache_resource
+def metrics_server():
+    """Endpoint /metrics na TENIS_METRICS_PORT (jeden za proces); bez proměnné nic."""
+    return metrics.serve()
 
-    header = values[0]
-    rows = values[1:]
-    df = pd.DataFrame(rows, columns=header).fillna("")
+def clear_caches(reason):
+    """Po zápisu: přepočítat stav i odvozené výpočty."""
+    load_state.clear()
+    st.cache_data.clear() # Vymaže veškerou paměť aplikace (data i výpočty)
+    metrics.inc("tenis_cache_clears_total", reason=reason)
 
-    for c in COLUMNS:
-        if c not in df.columns:
-            df[c] = ""
-    return df[COLUMNS]
+def load_data():
+    return load_state().log
 
-def save_match(row):
-    ws = get_ws()
+@metrics.cached("compute_game_stats", st.cache_data(ttl=600))
+def compute_game_stats(df: pd.DataFrame, _games):
+    """Gemy/sety/tiebreaky po hráčích a ELO s ohledem na rozdíl gemů."""
+    return player_game_stats(df, _games), compute_mov_elo(df, _games, INITIAL_RATINGS)
 
+def save_match(row, submit_key=None):
     full = {c: "" for c in COLUMNS}
     full.update(row)
 
-    ws.append_row([full[c] for c in COLUMNS], value_input_option="USER_ENTERED")
+    # Zápis jde hned do lokálního deníku, do sheetu ho pošle journal_worker na pozadí.
+    # submit_key (klíč odeslání formuláře) zajistí, že dvojklik zápis nezdvojí.
+    with metrics.timer("tenis_write_seconds", op="save_match"):
+        sheet_state = get_snapshot()["state"]
+        journal.append(journal.JOURNAL_PATH, full, base_rows=len(sheet_state.events) if sheet_state is not None else 0,
+                       entry_id=submit_key)
+        journal_worker().set()
 
-    st.cache_data.clear() # Vymaže veškerou paměť aplikace (data i výpočty)
+    clear_caches("save_match")
+
+def save_matches(rows):
+    """Hromadný zápis (import CSV): po dávkách append_rows a jen jeden přepočet."""
+    with metrics.timer("tenis_write_seconds", op="save_matches"):
+        written = bulk_import.write_rows(get_ws(), rows)
+    clear_caches("import")
+    return written
 
 def delete_match_by_row(row_index):
     if row_index is None or str(row_index) == 'nan' or row_index == "":
         st.error("Chyba: Nepodařilo se identifikovat řádek v databázi.")
         return
+    sheet_state = get_snapshot()["state"]
+    if sheet_state is not None and int(float(row_index)) > len(sheet_state.events) + 1:
+        st.error("Tento zápis ještě čeká na odeslání do Google Sheets, smazat půjde až po synchronizaci.")
+        return
     try:
         ws = get_ws()
         idx = int(float(row_index)) 
-        ws.delete_rows(idx)
-        st.cache_data.clear()
+        with metrics.timer("tenis_write_seconds", op="delete_match_by_row"):
+            ws.delete_rows(idx)
+        clear_caches("delete")
     except Exception as e:
         st.error(f"Chyba při mazání v Google Sheets: {e}")
 
-def get_retired_players(df):
-    """Vrátí set hráčů, kteří mají ukončenou kariéru (poslední toggle podle data + pořadí v tabulce)."""
-    career_df = df[df["type"] == "career_toggle"].copy()
-    if career_df.empty:
-        return set()
-
-    # seřaď podle data (a když je stejné datum, nech rozhodnout pořadí řádku v sheetu)
-    def _dt(s):
-        try:
-            return datetime.strptime(str(s).strip(), "%d.%m.%Y")
-        except:
-            return datetime.min
-
-    career_df["__dt"] = career_df["date"].apply(_dt)
-    career_df["__row"] = career_df.index  # pojistka pro stabilní pořadí
-    career_df = career_df.sort_values(["__dt", "__row"], ascending=[True, True])
-
-    last_states = career_df.drop_duplicates(subset=["team_a"], keep="last")
-    return set(last_states[last_states["team_b"] == "retired"]["team_a"].astype(str).str.strip().unique())
-
 def toggle_career(player_name, retired_list):
     """Změní stav kariéry (active <-> retired) a uloží do DB."""
     new_status = "active" if player_name in retired_list else "retired"
@@ -209,325 +167,20 @@ def toggle_career(player_name, retired_list):
     })
     st.cache_data.clear()
 
-@st.cache_data(ttl=600)
 def compute_elo_with_meta():
-    ratings = INITIAL_RATINGS.copy()
-    df = load_data()
-
-    # startovní ELO pro výpočet total_delta
-    base = {p: float(v) for p, v in ratings.items()}
-
-    last_date = {}          # poslední zápas (singles/doubles/friendly)
-    total_delta = {}        # finální - start
-    last_delta = {}         # poslední změna (ranked/adjust; friendly=0)
-    played_elo_match = {}   # měl někdy ranked match (singles/doubles)
-
-    def parse_team(s: str):
-        return [x.strip() for x in str(s).split("+") if x.strip()]
-
-    def parse_date(s: str):
-        try:
-            return datetime.strptime(str(s).strip(), "%d.%m.%Y").date()
-        except:
-            return None
-
-    def ensure_player(p: str):
-        ratings.setdefault(p, 1000.0)
-        base.setdefault(p, 1000.0)
-        last_date.setdefault(p, None)
-        last_delta.setdefault(p, 0.0)
-        played_elo_match.setdefault(p, False)
-
-    for _, r in df.iterrows():
-        rtype = str(r.get("type", "")).strip()
-        d = parse_date(r.get("date", ""))
-
-        # --- adjust ---
-        if rtype == "adjust":
-            p = str(r.get("team_a", "")).strip()
-            try:
-                delta = float(r.get("team_b", 0))
-            except:
-                delta = 0.0
-
-            ensure_player(p)
-            ratings[p] += delta
-            last_delta[p] = delta
-            continue
-
-        # --- friendly ---
-        if rtype in ["friendly_singles", "friendly_doubles"]:
-            team_a = parse_team(r.get("team_a", ""))
-            team_b = parse_team(r.get("team_b", ""))
-
-            for p in team_a + team_b:
-                ensure_player(p)
-                last_delta[p] = 0.0
-                if d:
-                    last_date[p] = d
-            continue
-
-        # --- ranked matches ---
-        if rtype in ["singles", "doubles"]:
-            team_a = parse_team(r.get("team_a", ""))
-            team_b = parse_team(r.get("team_b", ""))
-            winner = str(r.get("winner", "")).strip()
-
-            for p in team_a + team_b:
-                ensure_player(p)
-
-            ra = sum(ratings[p] for p in team_a) / max(1, len(team_a))
-            rb = sum(ratings[p] for p in team_b) / max(1, len(team_b))
-            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
-            sa = 1.0 if winner == "A" else 0.0
-
-            k = K_SINGLES if rtype == "singles" else K_DOUBLES
-            delta = k * (sa - ea)
-
-            da = delta / max(1, len(team_a))
-            db = -delta / max(1, len(team_b))
-
-            for p in team_a:
-                ratings[p] += da
-                last_delta[p] = da
-                played_elo_match[p] = True
-                if d:
-                    last_date[p] = d
-
-            for p in team_b:
-                ratings[p] += db
-                last_delta[p] = db
-                played_elo_match[p] = True
-                if d:
-                    last_date[p] = d
-
-    # total delta = finální - start (base)
-    for p in ratings.keys():
-        ensure_player(p)
-        total_delta[p] = ratings[p] - base.get(p, 1000.0)
-
-    return ratings, last_date, total_delta, last_delta, played_elo_match
-
-def parse_ddmmyyyy(s: str):
-    s = str(s or "").strip()
-    try:
-        return datetime.strptime(s, "%d.%m.%Y").date()
-    except:
-        return None
-
-MATCH_TYPES = {"singles", "doubles", "friendly_singles", "friendly_doubles"}
-
+    return load_state().elo_meta
 
 def get_all_players():
     ratings, *_ = compute_elo_with_meta()
     return sorted(list(ratings.keys()))
 
-def build_player_history(df, target):
-    ratings = INITIAL_RATINGS.copy()
-    ratings.setdefault(target, 1000.0)
-    
-    hist = []
-    
-    for _, r in df.iterrows():
-        rtype = str(r.get("type", "")).strip()
-        rawd = str(r.get("date", "")).strip()
-        winner = str(r.get("winner", "")).strip()
-        score = str(r.get("score", "")).strip()
-        sets_raw = str(r.get("sets", "")).strip()
-        reason = str(r.get("reason", "")).strip()
-        author = str(r.get("author", "")).strip()
-        
-        # 1. Manuální úpravy
-        if rtype == "adjust":
-            p = str(r.get("team_a", "")).strip()
-            try:
-                delta = float(r.get("team_b", 0))
-            except:
-                continue
-            
-            ratings[p] = ratings.get(p, 1000.0) + delta
-            
-            if p == target:
-                is_add_player = reason.startswith("Přidání hráče")
-                if is_add_player:
-                    hist.append({
-                        "Datum": rawd, "Typ": "Přidání hráče", "Zápas": f"Nastaveno na {int(round(ratings[target]))}",
-                        "Výsledek": "", "Skóre": "", "Sety": "", "Rozdíl ELO": "", "ELO po": round(ratings[target], 2)
-                    })
-                else:
-                    hist.append({
-                        "Datum": rawd, "Typ": "Úprava ELO", "Zápas": f"Manuální úprava — {reason}".strip(' —'),
-                        "Výsledek": "", "Skóre": "", "Sety": "", "Rozdíl ELO": f"{'+' if delta >= 0 else ''}{int(delta)}", "ELO po": round(ratings[target], 2)
-                    })
-            continue
-            
-        # 2. Zápasy
-        if rtype in ["singles", "doubles", "friendly_singles", "friendly_doubles"]:
-            team_a = [p.strip() for p in str(r.get("team_a", "")).split("+") if p.strip()]
-            team_b = [p.strip() for p in str(r.get("team_b", "")).split("+") if p.strip()]
-            if not team_a or not team_b: continue
-            
-            for p in team_a + team_b:
-                ratings.setdefault(p, 1000.0)
-            
-            is_friendly = "friendly" in rtype
-            base_type = "Singles" if "singles" in rtype else "Doubles"
-            
-            ra = sum(ratings[p] for p in team_a) / len(team_a)
-            rb = sum(ratings[p] for p in team_b) / len(team_b)
-            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
-            sa = 1.0 if winner == "A" else 0.0
-            
-            k = 0 if is_friendly else (K_SINGLES if "singles" in rtype else K_DOUBLES)
-            delta_a = k * (sa - ea)
-            delta_b = -delta_a
-            
-            per_player_delta = {}
-            for p in team_a: per_player_delta[p] = delta_a / len(team_a)
-            for p in team_b: per_player_delta[p] = delta_b / len(team_b)
-                
-            for p, d in per_player_delta.items():
-                ratings[p] = ratings.get(p, 1000.0) + d
-                
-            if target in per_player_delta:
-                d_pl = per_player_delta[target]
-                res = "Výhra" if ((winner == "A" and target in team_a) or (winner == "B" and target in team_b)) else "Prohra"
-                match_txt = f"{' + '.join(team_a)} 🆚 {' + '.join(team_b)}"
-                
-                # Zde aplikujeme formátování na sety
-                pretty_sets = format_sets_display(sets_raw)
-                
-                hist.append({
-                    "Datum": rawd,
-                    "Typ": "Přátelák" if is_friendly else base_type,
-                    "Zápas": match_txt,
-                    "Výsledek": res,
-                    "Skóre": score,
-                    "Sety": pretty_sets,
-                    "Rozdíl ELO": "" if is_friendly else f"{'+' if round(d_pl) >= 0 else ''}{int(round(d_pl))}",
-                    "ELO po": round(ratings[target], 2)
-                })
-                
-    if not hist:
-        return pd.DataFrame(columns=["Datum", "Typ", "Zápas", "Výsledek", "Skóre", "Sety", "Rozdíl ELO", "ELO po"])
-        
-    return pd.DataFrame(hist).iloc[::-1]
-
-
-
-
-
-@st.cache_data(ttl=600)
-def build_full_history(df: pd.DataFrame) -> pd.DataFrame:
-    ratings = INITIAL_RATINGS.copy()
-    
-    # 1. Příprava dat a indexů řádků
-    tmp = df.copy()
-    tmp["sheet_row"] = tmp.index + 2 
-    
-    def parse_team(s: str):
-        return [x.strip() for x in str(s).split("+") if x.strip()]
-
-    def parse_date(s: str):
-        try:
-            return datetime.strptime(str(s).strip(), "%d.%m.%Y").date()
-        except:
-            return None
-
-    # Pomocná funkce definovaná přímo zde, aby ji build_full_history viděla
-    def ensure_player(p: str):
-        ratings.setdefault(p, 1000.0)
-
-    # Řazení
-    tmp["__dt"] = tmp["date"].apply(parse_date)
-    tmp = tmp.sort_values("__dt", ascending=True).drop(columns=["__dt"])
-
-    out = []
-
-    for _, r in tmp.iterrows():
-        rtype = str(r.get("type", "")).strip()
-        rawd = str(r.get("date", "")).strip()
-        winner = str(r.get("winner", "")).strip()
-        score = str(r.get("score", "")).strip()
-        reason = str(r.get("reason", "")).strip()
-        author = str(r.get("author", "")).strip()
-
-        # --- ADJUST ---
-        if rtype == "adjust":
-            p = str(r.get("team_a", "")).strip()
-            if not p: continue
-
-            try:
-                delta = float(r.get("team_b", 0))
-            except:
-                delta = 0.0
-
-            ensure_player(p)
-            ratings[p] = ratings.get(p, 1000.0) + delta
-
-            is_add_player = reason.startswith("Přidání hráče")
-            if is_add_player:
-                typ, zapas, duvod = "Přidání hráče", f"{p} — Nastaveno na {int(round(ratings[p]))}", reason
-            else:
-                typ, zapas, duvod = "Úprava ELO", f"{p} (Změna: {'+' if delta >= 0 else ''}{int(delta)})", reason
-
-            out.append({
-                "Datum": rawd, "Typ": typ, "Zápas": zapas, "Důvod": duvod,
-                "Výsledek": "", "Skóre": "", "Zapsal": author, "row_idx": r["sheet_row"]
-            })
-            continue
-
-        # --- MATCH ---
-        if rtype in ["singles", "doubles", "friendly_singles", "friendly_doubles"]:
-            team_a = parse_team(r.get("team_a", ""))
-            team_b = parse_team(r.get("team_b", ""))
-            if not team_a or not team_b: continue
-
-            for p in team_a + team_b: ensure_player(p)
-
-            is_friendly = "friendly" in rtype
-            typ = "Přátelák" if is_friendly else ("Singles" if "singles" in rtype else "Doubles")
-
-            ra = sum(ratings[p] for p in team_a) / max(1, len(team_a))
-            rb = sum(ratings[p] for p in team_b) / max(1, len(team_b))
-            ea = 1.0 / (1.0 + 10 ** ((rb - ra) / SCALE))
-            sa = 1.0 if winner == "A" else 0.0
-
-            k = 0 if is_friendly else (K_SINGLES if "singles" in rtype else K_DOUBLES)
-            delta = k * (sa - ea)
-            da, db = delta / max(1, len(team_a)), -delta / max(1, len(team_b))
-
-            for p in team_a: ratings[p] += da
-            for p in team_b: ratings[p] += db
-
-            vysledek = f"Vítěz: {' + '.join(team_a if winner == 'A' else team_b)}" if winner in ["A", "B"] else "Remíza"
-
-            out.append({
-                "Datum": rawd, "Typ": typ, "Zápas": f"{' + '.join(team_a)} 🆚 {' + '.join(team_b)}",
-                "Důvod": "", "Výsledek": vysledek, "Skóre": score, 
-                "Sety": format_sets_display(r.get("sets", "")),
-                "Zapsal": author,
-                "row_idx": r["sheet_row"]
-            })
-
-    if not out:
-        return pd.DataFrame(columns=["Datum", "Typ", "Zápas", "Důvod", "Výsledek", "Skóre", "Zapsal", "row_idx"])
-
-    return pd.DataFrame(out).iloc[::-1].reset_index(drop=True)
-
 def get_last_matches(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
-    def _dt(s):
-        try:
-            return datetime.strptime(str(s).strip(), "%d.%m.%Y")
-        except:
-            return datetime.min
-
-    m = df[df["type"].isin(["singles", "doubles", "friendly_singles", "friendly_doubles"])].copy()
+    """Posledních n zápasů čistého logu (log je v kanonickém pořadí, stačí vzít konec)."""
+    m = df[df["type"].isin(["singles", "doubles", "friendly_singles", "friendly_doubles"])]
     if m.empty:
         return pd.DataFrame(columns=["Datum", "Typ", "Zápas", "Vítěz", "Skóre"])
 
-    m["__dt"] = m["date"].apply(_dt)
-    m = m.sort_values("__dt", ascending=False).head(n)
+    m = m.iloc[::-1].head(n)
 
     def _pretty_type(t):
         if t == "singles": return "Singles"
@@ -556,109 +209,117 @@ def get_last_matches(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
 
     return out
 
-@st.cache_data(ttl=600)
+@metrics.cached("compute_player_stats", st.cache_data(ttl=600))
 def compute_player_stats_cached(df: pd.DataFrame, current_user: str):
     """
     Vrátí hotové tabulky + pomocné struktury pro Tab 'Statistika hráče'.
     """
-    def get_players(team_str):
-        return [p.strip() for p in str(team_str).split("+") if p.strip()]
-
-    MATCH_TYPES = {"singles", "doubles", "friendly_singles", "friendly_doubles"}
-
-    singles_opponents = {}
-    doubles_partners = {}
-    doubles_opponents = {}
-
-    for _, r in df.iterrows():
-        if r["type"] not in MATCH_TYPES:
-            continue
-
-        ta = get_players(r["team_a"])
-        tb = get_players(r["team_b"])
-        win = r["winner"]
-
-        if current_user not in ta and current_user not in tb:
-            continue
-
-        my_team = ta if current_user in ta else tb
-        opp_team = tb if current_user in ta else ta
-
-        is_win = (current_user in ta and win == "A") or (current_user in tb and win == "B")
-        is_loss = (current_user in ta and win == "B") or (current_user in tb and win == "A")
-
-        # Singles
-        if "singles" in r["type"] and len(my_team) == 1 and len(opp_team) == 1:
-            opp = opp_team[0]
-            if opp not in singles_opponents:
-                singles_opponents[opp] = {"w": 0, "l": 0}
-            if is_win:
-                singles_opponents[opp]["w"] += 1
-            elif is_loss:
-                singles_opponents[opp]["l"] += 1
-
-        # Doubles
-        if "doubles" in r["type"] and len(my_team) == 2 and len(opp_team) == 2:
-            partner = my_team[0] if my_team[1] == current_user else my_team[1]
-            if partner not in doubles_partners:
-                doubles_partners[partner] = {"w": 0, "l": 0}
-            if is_win:
-                doubles_partners[partner]["w"] += 1
-            elif is_loss:
-                doubles_partners[partner]["l"] += 1
-
-            opp_key = " + ".join(sorted(opp_team))
-            if opp_key not in doubles_opponents:
-                doubles_opponents[opp_key] = {"w": 0, "l": 0}
-            if is_win:
-                doubles_opponents[opp_key]["w"] += 1
-            elif is_loss:
-                doubles_opponents[opp_key]["l"] += 1
-
-    def build_stat_df(stat_dict, col_name, sort_by="games"):
-        rows = []
-        for k, v in stat_dict.items():
-            g = v["w"] + v["l"]
-            pct = (v["w"] / g * 100) if g > 0 else 0
-            rows.append({
-                col_name: k,
-                "Zápasů": g,
-                "Výhry": v["w"],
-                "Prohry": v["l"],
-                "__pct": pct,  # Skrytý sloupec pro matematické řazení
-                "Úspěšnost": f"{pct:.1f} %".replace('.', ',')
-            })
-            
-        if not rows:
-            return pd.DataFrame(columns=[col_name, "Zápasů", "Výhry", "Prohry", "Úspěšnost"])
-            
-        df = pd.DataFrame(rows)
-        
-        if sort_by == "pct":
-            # Dvouhra: Primárně % úspěšnosti, sekundárně počet zápasů
-            df = df.sort_values(["__pct", "Zápasů"], ascending=[False, False])
-        else:
-            # Čtyřhra: Primárně počet zápasů, sekundárně % úspěšnosti
-            df = df.sort_values(["Zápasů", "__pct"], ascending=[False, False])
-            
-        # Odstraníme skrytý sloupec před vykreslením
-        return df.drop(columns=["__pct"]).reset_index(drop=True)
-
-    # Tady je definované to nové řazení
-    df_singles = build_stat_df(singles_opponents, "Soupeř (Singles)", sort_by="pct")
-    df_d_partners = build_stat_df(doubles_partners, "Parťák (Doubles)", sort_by="games")
-    df_d_opponents = build_stat_df(doubles_opponents, "Soupeři (Doubles)", sort_by="games")
-
-    return (
-        df_singles,
-        df_d_partners,
-        df_d_opponents,
-        singles_opponents,
-        doubles_partners,
-        doubles_opponents
-    )
+    return compute_player_stats(df, current_user)
 
-import streamlit.components.v1 as components
+# --- SEZÓNY ---
+@st.cache_resource
+def season_store():
+    """Naposledy spočítané sezóny procesu; uzavřené se z nich převezmou bez přepočtu (seasons.update_seasons)."""
+    return {"seasons": None}
+
+@metrics.cached("seasons", st.cache_resource(max_entries=4))
+def get_seasons(data_version, today, _state):
+    store = season_store()
+    store["seasons"] = seasons.update_seasons(store["seasons"], _state.log, _state.hashes, today)
+    return store["seasons"]
+
+# --- FORMA A SÉRIE ---
+@metrics.cached("form", st.cache_resource(max_entries=2))
+def get_form(data_version, _state):
+    """Dlouhá tabulka (hráč, zápas) a forma hráčů (form.py) – jednou za verzi dat pro všechny session."""
+    pm = form.player_matches(_state.log, _state.elo["trajectory"])
+    return pm, form.form_summary(pm)
+
+# --- NEJISTOTA ELO (bootstrap na pozadí) ---
+CONFIDENCE_RETRY_SECONDS = 60  # po selhání výpočtu se stejná verze zkusí znovu nejdřív za tuto dobu
+
+@st.cache_resource
+def confidence_store():
+    """
+    Bootstrap intervaly pro poslední verzi dat (confidence.py); počítají se ve vlákně s poolem procesů.
+    Běží nejvýš jeden výpočet; verze, o které se mezitím požádá, přepíše čekající ("wanted"),
+    takže se přeskočí všechny kromě poslední (např. rychle po sobě zapsané zápasy v journalu).
+    Selhání se neukládá jako výsledek, ale zvlášť do "error" (klíč, text, čas), aby šlo výpočet zopakovat.
+    """
+    return {"key": None, "result": None, "error": None, "wanted": None, "running": False,
+            "lock": threading.Lock()}
+
+def get_confidence(state, rank_players):
+    """
+    Dvojice (intervaly, chyba) pro verzi dat stavu. Dokud se počítají, jsou intervaly None
+    (výpočet se tím spustí); chyba je text posledního selhání pro tuto verzi, jinak None.
+    Pořadí se počítá mezi `rank_players` – aktivními hráči žebříčku (leaderboard.ranked_players).
+    """
+    key = (state.data_version, tuple(rank_players))
+    store = confidence_store()
+    with store["lock"]:
+        if store["key"] == key:
+            return store["result"], None
+        error = store["error"][1] if store["error"] and store["error"][0] == key else None
+        if error and time.monotonic() - store["error"][2] < CONFIDENCE_RETRY_SECONDS:
+            return None, error
+        store["wanted"] = (key, state.log)
+        if store["running"]:
+            return None, error
+        store["running"] = True
+
+    def run():
+        while True:
+            with store["lock"]:
+                if store["wanted"] is None:
+                    store["running"] = False
+                    return
+                (key, log), store["wanted"] = store["wanted"], None
+            version, players = key
+            try:
+                with metrics.timer("tenis_bootstrap_seconds"):
+                    result = confidence.bootstrap(log, list(players), seed=int(version[:8], 16))
+            except Exception as e:  # např. BrokenProcessPool – nezapamatovat jako výsledek
+                metrics.inc("tenis_bootstrap_errors_total")
+                print(f"[bootstrap] výpočet intervalů selhal: {type(e).__name__}: {e}", flush=True)
+                with store["lock"]:
+                    store["error"] = (key, f"{type(e).__name__}: {e}", time.monotonic())
+                continue
+            with store["lock"]:
+                store["key"], store["result"], store["error"] = key, result, None
+    threading.Thread(target=run, name="bootstrap", daemon=True).start()
+    return None, error
+
+# --- ŽEBŘÍČKY (po stránkách) ---
+@metrics.cached("leaderboard_board", st.cache_resource(max_entries=12))
+def leaderboard_board(kind, data_version, today, _state):
+    """Seřazená tabulka žebříčku pro verzi dat (a den, kvůli aktivitě) – jednou pro všechny session."""
+    if kind.startswith("season:"):
+        season = {s.name: s for s in get_seasons(data_version, today, _state)}[kind.removeprefix("season:")]
+        return leaderboard.ranking_board(season.elo_meta, season.retired, min(season.end, today))
+    if kind == "ranking":
+        return leaderboard.ranking_board(_state.elo_meta, get_retired_players(_state.log), today,
+                                         form=get_form(data_version, _state)[1])
+    if kind == "singles":
+        return leaderboard.singles_board(_state.win_loss[kind], _state.elo["ratings"])
+    return leaderboard.doubles_board(_state.win_loss[kind], _state.elo["ratings"], _state.elo["pairs"])
+
+@metrics.cached("leaderboard_html", st.cache_data(max_entries=256))
+def leaderboard_html(kind, data_version, today, page, _board):
+    """HTML jedné stránky žebříčku (klíč = druh, verze dat, den, stránka)."""
+    return leaderboard.render_page(_board, page, leaderboard.PAGE_SIZE)
+
+def show_leaderboard(board, kind, data_version, today):
+    """Vykreslí žebříček; u víc hráčů, než se vejde na stránku, přidá výběr stránky."""
+    slot = st.empty()
+    n_pages = board.pages(leaderboard.PAGE_SIZE)
+    page = 0
+    if st.session_state.get(f"lb_page_{kind}", 1) > n_pages:
+        st.session_state[f"lb_page_{kind}"] = n_pages  # po změně dat může být stránek méně
+    if n_pages > 1:
+        page = st.number_input(f"Stránka (celkem {n_pages}, {len(board)} řádků)", min_value=1, max_value=n_pages,
+                               step=1, key=f"lb_page_{kind}") - 1
+    slot.markdown(leaderboard_html(kind, data_version, today, page, board), unsafe_allow_html=True)
 
 def render_player_calendar(match_details, year, month):
     # match_details je slovník {datetime.date: "popis zápasů"}
@@ -722,8 +383,36 @@ def render_player_calendar(match_details, year, month):
     return "".join(html)
 
 
+# --- MĚŘENÍ ODEZVY ---
+# TENIS_PROFILE=1 vypisuje do konzole dobu celého běhu skriptu a každého fragmentu,
+# takže jde porovnat odezvu interakcí před a po změně. Trvale se doby běhu (po sekcích)
+# a fragmentů sbírají do metrik (metrics.py, TENIS_METRICS_FILE / TENIS_METRICS_PORT).
+PROFILE = os.environ.get("TENIS_PROFILE") == "1"
+
+def log_time(name, t0):
+    if PROFILE:
+        print(f"[profil] {name}: {(time.perf_counter() - t0) * 1000:.1f} ms", flush=True)
+
+def profiled(name):
+    """Dekorátor pro fragmenty: změří i jejich samostatné přepočty."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                log_time(f"fragment {name}", t0)
+                metrics.observe("tenis_fragment_seconds", time.perf_counter() - t0, fragment=name)
+                metrics.write_textfile()
+        return wrapper
+    return deco
+
+
 # --- UI STREAMLIT ---
 st.set_page_config(page_title="Tennis ELO Žebříček", page_icon="🎾", layout="wide")
+log_time("start skriptu (importy)", RUN_T0)
+metrics_server()
 # --- NOVÝ OPRAVENÝ BLOK NADPISU ---
 def get_base64_image(image_filename):
     # Najde cestu ke složce, kde běží skript
@@ -735,18 +424,20 @@ def get_base64_image(image_filename):
             return base64.b64encode(img_file.read()).decode()
     return None
 
-# Pokus o načtení loga (správný název souboru)
-img_data = get_base64_image("logo_tenis.png")
-
-if img_data:
-    # Změněno na image/png
-    img_html = f'<img src="data:image/png;base64,{img_data}" style="height: 70px; margin-right: 20px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.5);">'
-else:
-    # Záloha pokud se obrázek nenajde
-    img_html = "🎾 "
+@st.cache_resource
+def header_html():
+    """Hlavička s logem sestavená jednou za život procesu (logo se nečte a nekóduje při každém běhu)."""
+    # Pokus o načtení loga (správný název souboru)
+    img_data = get_base64_image("logo_tenis.png")
+
+    if img_data:
+        # Změněno na image/png
+        img_html = f'<img src="data:image/png;base64,{img_data}" style="height: 70px; margin-right: 20px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.5);">'
+    else:
+        # Záloha pokud se obrázek nenajde
+        img_html = "🎾 "
 
-# Vykreslení nadpisu v moderním obdélníku
-st.markdown(f"""
+    return f"""
     <div style="
         background: linear-gradient(135deg, rgba(255, 255, 255, 0.08) 0%, rgba(255, 255, 255, 0.02) 100%);
         border: 1px solid rgba(255, 255, 255, 0.12);
@@ -773,18 +464,31 @@ st.markdown(f"""
             TENIS ELO — Zápisy a žebříčky
         </h1>
     </div>
-""", unsafe_allow_html=True)
+"""
 
-# --- PŘIHLAŠOVÁNÍ (Levý panel) ---
-credentials = st.secrets["credentials"].to_dict()
+# Vykreslení nadpisu v moderním obdélníku
+st.markdown(header_html(), unsafe_allow_html=True)
 
+# --- PŘIHLAŠOVÁNÍ (Levý panel) ---
+@st.cache_resource
+def auth_credentials():
+    """Přihlašovací údaje ze secrets s hesly převedenými na bcrypt hash (jednou za proces)."""
+    credentials = st.secrets["credentials"].to_dict()
+    for user in credentials.get("usernames", {}).values():
+        if "password" in user and not stauth.Hasher.is_hash(user["password"]):
+            user["password"] = stauth.Hasher.hash(user["password"])
+    return credentials
+
+t_auth = time.perf_counter()
 # Inicializace přihlášení s fixní hodnotou 30 dní
 # Tímto odpadají veškeré chyby s mizející cookie při stisku F5
+# (kopie: knihovna si do údajů zapisuje stav přihlášení konkrétní session)
 authenticator = stauth.Authenticate(
-    credentials,
+    copy.deepcopy(auth_credentials()),
     st.secrets["cookie"]["name"],
     st.secrets["cookie"]["key"],
-    30  # Natvrdo nastaveno 30 dní platnosti (přežije F5 i zavření prohlížeče)
+    30,  # Natvrdo nastaveno 30 dní platnosti (přežije F5 i zavření prohlížeče)
+    auto_hash=False,
 )
 
 # Vykreslení přihlašovacího formuláře (Jméno, Heslo, tlačítko Login)
@@ -798,184 +502,139 @@ elif st.session_state.get("authentication_status") is False:
     st.sidebar.error('Špatné uživatelské jméno nebo heslo')
 elif st.session_state.get("authentication_status") is None:
     st.sidebar.warning('Pro zápis výsledků se přihlas')
+log_time("přihlášení", t_auth)
 
 def bar(text: str):
     st.markdown(f'<div class="section-bar">{text}</div>', unsafe_allow_html=True)
 
-# Záložky pro přepínání obsahu
-# Zjištění jména pro dynamický název záložky
-if st.session_state.get("authentication_status"):
-    stat_tab_name = f"📊 Statistika hráče: {st.session_state.get('name')}"
-else:
-    stat_tab_name = "📊 Statistika hráče"
+# Styly sdílené všemi sekcemi (tabulky a nadpisy sekcí)
+st.markdown("""
+<style>
+.section-bar{
+  background: rgba(255,255,255,0.07);
+  border: 1px solid rgba(255,255,255,0.10);
+  padding: 10px 14px;
+  border-radius: 12px;
+  text-align: center;
+  font-weight: 800;
+  font-size: 22px;
+  margin: 8px 0 10px 0;
+}
+.hist-wrap {
+  width: 100%;
+  overflow-x: auto;
+  border: 1px solid rgba(255,255,255,0.08);
+  border-radius: 12px;
+  background: rgba(0,0,0,0.10);
+  margin-bottom: 20px;
+}
+.hist-wrap table {
+  border-collapse: collapse;
+  table-layout: auto;
+  width: max-content;
+  min-width: 100%;
+  color: rgba(255,255,255,0.90);
+  margin: 0;
+}
+.hist-wrap thead th {
+  position: sticky;
+  top: 0;
+  background: rgba(255,255,255,0.06) !important;
+  border-bottom: 1px solid rgba(255,255,255,0.10) !important;
+  font-weight: 800 !important;
+  text-align: center !important;
+}
+.hist-wrap th, .hist-wrap td {
+  padding: 10px 12px;
+  border-right: 1px solid rgba(255,255,255,0.06);
+  border-bottom: 1px solid rgba(255,255,255,0.06);
+  white-space: nowrap;
+  text-align: center !important;
+  font-size: 12.5px !important;
+}
+.hist-wrap th:last-child, .hist-wrap td:last-child { border-right: none; }
+.hist-wrap tr:last-child td { border-bottom: none; }
+.hist-wrap .blank { display: none; }
+.hist-wrap .row_heading { display: none; }
+</style>
+""", unsafe_allow_html=True)
 
-# Záložky pro přepínání obsahu
-tab1, tab_sd, tab_stats, tab2, tab3 = st.tabs(["🏆 Žebříček", "🎾 Singles & Doubles", stat_tab_name, "✍️ Zadat zápas nebo přidat hráče", "📜 Kompletní historie"])
+# Navigace mezi sekcemi: na rozdíl od st.tabs se počítá a vykresluje jen vybraná sekce
+SECTIONS = {
+    "ranking": "🏆 Žebříček",
+    "sd": "🎾 Singles & Doubles",
+    "stats": "📊 Statistika hráče",
+    "entry": "✍️ Zadat zápas nebo přidat hráče",
+    "history": "📜 Kompletní historie",
+}
+
+section = st.radio("Sekce", options=list(SECTIONS), format_func=SECTIONS.get, horizontal=True,
+                   key="section", label_visibility="collapsed")
 
 # načti sheet JEDNOU pro celý run
-DF_ALL = load_data()
+STATE = load_state()
+DF_ALL = STATE.log
+SETS_TXT = STATE.sets_txt
+
+# --- STAV SYNCHRONIZACE (lokální deník -> Google Sheets) ---
+sync_info = journal.status(journal.JOURNAL_PATH)
+if get_snapshot()["offline"]:
+    st.sidebar.warning("📴 Google Sheets teď nejsou dostupné. Zobrazují se uložená data, nové zápisy se odešlou později.")
+if sync_info["pending"]:
+    journal_worker()  # po restartu procesu rozjede odesílání i bez nového zápisu
+    lag_min = int((datetime.now() - sync_info["oldest"]).total_seconds() // 60)
+    st.sidebar.info(f"⏳ Čeká na odeslání: **{sync_info['pending']}** (nejstarší před {lag_min} min)")
+for c in sync_info["conflicts"]:
+    r = c["row"]
+    st.sidebar.error(f"⚠️ Neodesláno: {r['date']} {r['type']} {r['team_a']} – {r['team_b']} ({c['reason']}). Zadej znovu.")
+    if st.sidebar.button("Skrýt", key=f"dismiss_{c['id']}"):
+        journal.dismiss(journal.JOURNAL_PATH, c["id"])
+        st.rerun()
 # --- TAB 1: ŽEBŘÍČEK ---
-# --- TAB 1: ŽEBŘÍČEK ---
-with tab1:
-    st.markdown("""
-    <style>
-    .section-bar{
-      background: rgba(255,255,255,0.07);
-      border: 1px solid rgba(255,255,255,0.10);
-      padding: 10px 14px;
-      border-radius: 12px;
-      text-align: center;
-      font-weight: 800;
-      font-size: 22px;
-      margin: 8px 0 10px 0;
-    }
-    .hist-wrap {
-      width: 100%;
-      overflow-x: auto;
-      border: 1px solid rgba(255,255,255,0.08);
-      border-radius: 12px;
-      background: rgba(0,0,0,0.10);
-      margin-bottom: 20px;
-    }
-    .hist-wrap table {
-      border-collapse: collapse;
-      table-layout: auto;
-      width: max-content;
-      min-width: 100%;
-      color: rgba(255,255,255,0.90);
-      margin: 0;
-    }
-    .hist-wrap thead th {
-      position: sticky;
-      top: 0;
-      background: rgba(255,255,255,0.06) !important;
-      border-bottom: 1px solid rgba(255,255,255,0.10) !important;
-      font-weight: 800 !important;
-      text-align: center !important;
-    }
-    .hist-wrap th, .hist-wrap td {
-      padding: 10px 12px;
-      border-right: 1px solid rgba(255,255,255,0.06);
-      border-bottom: 1px solid rgba(255,255,255,0.06);
-      white-space: nowrap;
-      text-align: center !important;
-      font-size: 12.5px !important;
-    }
-    .hist-wrap th:last-child, .hist-wrap td:last-child { border-right: none; }
-    .hist-wrap tr:last-child td { border-bottom: none; }
-    .hist-wrap .blank { display: none; }
-    .hist-wrap .row_heading { display: none; }
-    </style>
-    """, unsafe_allow_html=True)
-
-    ratings, last_date, total_delta, last_delta, played_elo_match = compute_elo_with_meta()
+if section == "ranking":
+    ratings = STATE.elo["ratings"]
     retired_players = get_retired_players(DF_ALL)
-
-    rows = []
-    for p, elo in ratings.items():
-        ld = last_date.get(p)
-        ld_str = ld.strftime("%d.%m.%Y") if ld else "—"
-        td = total_delta.get(p, 0.0)
-        ldel = last_delta.get(p, 0.0)
-        is_retired = p in retired_players
-        is_ranked = bool(played_elo_match.get(p, False))
-
-        rows.append({
-            "Hráč": p,
-            "Kariéra": "🛑 Ukončeno" if is_retired else "Aktivní",
-            "__retired": is_retired,
-            "__ranked": is_ranked,
-            "__elo_num": int(round(float(elo))),
-            "__td_num": float(td),          # <- season total delta (číslo)
-            "__ldel_num": float(ldel),      # <- last delta (číslo)
-            "ELO": round(float(elo), 2),
-            "Poslední zápas": ld_str,
-            "Δ ELO (posl.)": f"{td:+.0f} ({ldel:+.0f})",
-        })
-
-    rank_df = pd.DataFrame(rows)
     today = datetime.now().date()
-    cutoff_date = today - timedelta(days=30)
-    
-    def _parse_date(s):
-        try: return datetime.strptime(str(s).strip(), "%d.%m.%Y").date()
-        except: return None
-    rank_df["__ld"] = rank_df["Poslední zápas"].apply(_parse_date)
-
-    # Aktivní v žebříčku: Ranked + Není retired + Zápas v posl. 30 dnech
-    active_ranked_df = rank_df[
-        (rank_df["__ranked"]) & 
-        (~rank_df["__retired"]) & 
-        (rank_df["__ld"].notna()) & 
-        (rank_df["__ld"] >= cutoff_date)
-    ].copy()
-
-    # Ostatní: Unranked, neaktivní nebo v důchodu
-    inactive_df = rank_df[~rank_df.index.isin(active_ranked_df.index)].copy()
-
-    # Horní Tabulka
-    active_ranked_df = active_ranked_df.sort_values("__elo_num", ascending=False).reset_index(drop=True)
-    active_ranked_df.insert(0, "#", range(1, len(active_ranked_df) + 1))
-    if not active_ranked_df.empty:
-        active_ranked_df.iloc[0, active_ranked_df.columns.get_loc("Hráč")] = f"👑 {active_ranked_df.iloc[0]['Hráč']}"
-    active_out = active_ranked_df.drop(columns=["__ranked", "__elo_num", "__ld", "__retired", "__td_num", "__ldel_num"])
-
-    # Spodní Tabulka (Retired úplně dolů)
-    inactive_df = inactive_df.sort_values(["__retired", "__elo_num"], ascending=[True, False]).reset_index(drop=True)
-    inactive_df.insert(0, "#", ["unranked"] * len(inactive_df))
-    inactive_df["ELO"] = "0"
-    inactive_df["Δ ELO (posl.)"] = "0 (0)"
-    inactive_out = inactive_df.drop(columns=["__ranked", "__elo_num", "__ld", "__retired", "__td_num", "__ldel_num"])
-
-    # Separátor
-    sep_txt = "Hráči neaktivní nebo s ukončenou kariérou"
-    sep = {c: " " for c in active_out.columns}
-    sep["Hráč"] = sep_txt
-    players_out = pd.concat([active_out, pd.DataFrame([sep]), inactive_out], ignore_index=True)
-
-    # HTML Vykreslení
-    cols = list(players_out.columns)
-    parts = ['<div class="hist-wrap"><table class="hist-table"><thead><tr>']
-    for c in cols: parts.append(f"<th>{c}</th>")
-    parts.append("</tr></thead><tbody>")
-
-    for _, row in players_out.iterrows():
-        if row["Hráč"] == sep_txt:
-            parts.append(f'<tr><td colspan="{len(cols)}" style="background:rgba(255,255,255,0.09); color:gray; font-weight:800; text-align:center;">{sep_txt}</td></tr>')
-            continue
-        is_retired = "🛑" in str(row["Kariéra"])
-        row_style = 'color:rgba(255,255,255,0.45); background:rgba(255,255,255,0.02);' if (is_retired or row["#"] == "unranked") else ""
-        parts.append("<tr>")
-        for c in cols:
-            v, c_style = row[c], row_style
-            # Barva kariéry: aktivní modře, ukončeno červeně
-            if c == "Kariéra" and row["#"] != "unranked":
-                if is_retired:
-                    c_style += "color:#e74c3c; font-weight:800;"
-                else:
-                    c_style += "color:#3498db; font-weight:800;"
-            if c == "Poslední zápas" and not (is_retired or row["#"] == "unranked"):
-                d_obj = _parse_date(str(v))
-                if d_obj:
-                    days = (today - d_obj).days
-                    if days <= 10: c_style += "color:#2ecc71; font-weight:700;"
-                    elif days <= 20: c_style += "color:#f1c40f; font-weight:700;"
-                    else: c_style += "color:#e74c3c; font-weight:700;"
-            if c == "Δ ELO (posl.)" and row["#"] != "unranked":
-                # sezónní delta bereme z rank_df (číslo), ne z textu
-                td_num = float(rank_df.loc[rank_df["Hráč"].str.replace("👑 ", "", regex=False) == str(row["Hráč"]).replace("👑 ", ""), "__td_num"].iloc[0]) if "rank_df" in locals() else 0.0
-                if td_num > 0:
-                    c_style += "color:#2ecc71; font-weight:800;"
-                elif td_num < 0:
-                    c_style += "color:#e74c3c; font-weight:800;"
-            parts.append(f'<td style="{c_style}">{v}</td>')
-        parts.append("</tr>")
-    parts.append("</tbody></table></div>")
+    season_list = get_seasons(STATE.data_version, today, STATE)
+    col_season, _ = st.columns([1, 4])
+    with col_season:
+        picked_season = st.selectbox("Sezóna:", options=["Celkově"] + [s.name for s in reversed(season_list)],
+                                     key="ranking_season")
+    season = next((s for s in season_list if s.name == picked_season), None)
+    kind = f"season:{season.name}" if season else "ranking"
+    board = leaderboard_board(kind, STATE.data_version, today, STATE)
 
     left, right = st.columns([3, 2], gap="large")
     with left:
-        st.markdown('<div class="section-bar">Aktuální žebříček ELO</div>', unsafe_allow_html=True)
-        st.markdown("".join(parts), unsafe_allow_html=True)
+        title = f"Žebříček ELO sezóny {season.name}" + ("" if season.closed else " (probíhá)") if season else "Aktuální žebříček ELO"
+        st.markdown(f'<div class="section-bar">{title}</div>', unsafe_allow_html=True)
+        show_leaderboard(board, kind, STATE.data_version, today)
+        if season is None:
+            with st.expander(f"📊 Nejistota ELO ({confidence.LEVEL:.0%} interval, bootstrap po dnech)"):
+                ci, ci_error = get_confidence(STATE, leaderboard.ranked_players(board))
+                if ci_error:
+                    st.warning(f"Intervaly se nepodařilo spočítat ({ci_error}), výpočet se zopakuje.")
+                elif ci is None:
+                    st.caption("Intervaly se počítají na pozadí, zobrazí se při dalším načtení.")
+                else:
+                    ci = ci[ci["matches"] > 0].sort_values(["rank", "elo"], ascending=[True, False], na_position="last")
+                    st.dataframe(pd.DataFrame({
+                        "Hráč": ci.index,
+                        "ELO": ci["elo"].round().astype(int).to_numpy(),
+                        "Interval ELO": [f"{lo:.0f} – {hi:.0f}" for lo, hi in zip(ci["lo"], ci["hi"])],
+                        "Pořadí": ["—" if pd.isna(r) else f"{r:.0f} ({lo:.0f}–{hi:.0f})"
+                                   for r, lo, hi in zip(ci["rank"], ci["rank_lo"], ci["rank_hi"])],
+                        "Zápasů": ci["matches"].to_numpy(),
+                    }), use_container_width=True, hide_index=True)
+        if season is not None and not season.win_loss.empty:
+            with st.expander(f"📅 Bilance sezóny {season.name} ({season.start:%d.%m.%Y} – {season.end:%d.%m.%Y})"):
+                wl = season.win_loss.sort_values(["games", "wins"], ascending=False)
+                st.dataframe(pd.DataFrame({
+                    "Hráč": wl.index, "Zápasy": wl["games"].to_numpy(), "Výhry": wl["wins"].to_numpy(),
+                    "Prohry": wl["losses"].to_numpy(),
+                    "Úspěšnost": [f"{w / g * 100:.1f} %".replace(".", ",") for w, g in zip(wl["wins"], wl["games"])],
+                    "Poslední zápas": [d.strftime("%d.%m.%Y") for d in wl["last_date"]],
+                }), use_container_width=True, hide_index=True)
         if st.session_state.get("authentication_status"):
             user_now = st.session_state.get("name")
             with st.expander("⚙️ Správa stavu tvé kariéry"):
@@ -986,239 +645,84 @@ with tab1:
                     st.rerun()
 
     with right:
-        n_right = len(players_out)  # stejné X jako počet řádků vlevo (bez headeru)
+        n_right = min(len(board), leaderboard.PAGE_SIZE) + 1  # stejné X jako počet řádků vlevo (bez headeru)
         st.markdown(f'<div class="section-bar">Posledních {n_right} zápasů</div>', unsafe_allow_html=True)
 
         lastN_df = get_last_matches(DF_ALL, n=n_right)
         st.markdown(f'<div class="hist-wrap">{lastN_df.to_html(index=False, border=0)}</div>', unsafe_allow_html=True)
 
     st.write("---")
-    all_players_list = sorted(list(ratings.keys()))
-    col_sel, _ = st.columns([3, 7])
-    with col_sel:
-        picked = st.selectbox("Vyber hráče pro zobrazení historie:", options=all_players_list, index=None, placeholder="— nevybráno —", key="history_player_sel")
-
-    if picked:
-        st.subheader(f"Historie hráče: {picked}")
-        hist_df = build_player_history(DF_ALL, picked)
-        if hist_df.empty: st.info("Bez zápasů.")
-        else:
-            def _res_color(v):
-                s = str(v).lower()
-                if "výhra" in s: return "color:#2ecc71; font-weight:800;"
-                if "prohra" in s: return "color:#e74c3c; font-weight:800;"
-                return ""
-            html_hist = hist_df.style.hide(axis="index").applymap(_res_color, subset=["Výsledek"]).to_html()
-            st.markdown(f'<div class="hist-wrap">{html_hist}</div>', unsafe_allow_html=True)
+    @st.fragment  # výběr hráče nepřepočítává žebříček
+    @profiled("historie hráče")
+    def player_history_panel(all_players_list):
+        col_sel, _ = st.columns([3, 7])
+        with col_sel:
+            picked = st.selectbox("Vyber hráče pro zobrazení historie:", options=all_players_list, index=None, placeholder="— nevybráno —", key="history_player_sel")
+
+        if picked:
+            st.subheader(f"Historie hráče: {picked}")
+            hist_df = STATE.player_history(picked)
+            if hist_df.empty: st.info("Bez zápasů.")
+            else:
+                def _res_color(v):
+                    s = str(v).lower()
+                    if "výhra" in s: return "color:#2ecc71; font-weight:800;"
+                    if "prohra" in s: return "color:#e74c3c; font-weight:800;"
+                    return ""
+                html_hist = hist_df.style.hide(axis="index").applymap(_res_color, subset=["Výsledek"]).to_html()
+                st.markdown(f'<div class="hist-wrap">{html_hist}</div>', unsafe_allow_html=True)
+
+    player_history_panel(sorted(list(ratings.keys())))
+
 # --- TAB 1.5: SINGLES A DOUBLES ---
-with tab_sd:
-    df_sd = DF_ALL
-    ratings_sd, *_ = compute_elo_with_meta()
-    
-    # Session state pro přepínání tlačítek
-    if "sd_view" not in st.session_state:
-        st.session_state["sd_view"] = "Singles"
-
-    # Stylovaná obdélníková tlačítka vedle sebe
-    col_btn1, col_btn2, _ = st.columns([1, 1, 4])
-    with col_btn1:
-        if st.button("🎾 Singles", use_container_width=True, type="primary" if st.session_state["sd_view"] == "Singles" else "secondary"):
+if section == "sd":
+    # Přepínač Singles/Doubles překreslí jen tenhle fragment, ne celou aplikaci
+    @st.fragment
+    @profiled("singles/doubles")
+    def sd_panel():
+        today = datetime.now().date()
+
+        # Session state pro přepínání tlačítek
+        if "sd_view" not in st.session_state:
             st.session_state["sd_view"] = "Singles"
-            st.rerun()
-    with col_btn2:
-        if st.button("👥 Doubles", use_container_width=True, type="primary" if st.session_state["sd_view"] == "Doubles" else "secondary"):
-            st.session_state["sd_view"] = "Doubles"
-            st.rerun()
-
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    # --- SINGLES ---
-    if st.session_state["sd_view"] == "Singles":
-        bar("Žebříček Singles")
-        s_matches = df_sd[df_sd["type"] == "singles"]
-        s_stats = {}
-        
-        for _, r in s_matches.iterrows():
-            p1, p2 = r["team_a"].strip(), r["team_b"].strip()
-            win = r["winner"].strip()
-            if p1 not in s_stats: s_stats[p1] = {"w": 0, "l": 0}
-            if p2 not in s_stats: s_stats[p2] = {"w": 0, "l": 0}
-            if win == "A":
-                s_stats[p1]["w"] += 1; s_stats[p2]["l"] += 1
-            elif win == "B":
-                s_stats[p2]["w"] += 1; s_stats[p1]["l"] += 1
-                
-        s_rows = []
-        max_s_games = max([st_s["w"] + st_s["l"] for st_s in s_stats.values()]) if s_stats else 0
-        s_threshold = max_s_games / 3.0
-        
-        for p, st_s in s_stats.items():
-            w, l = st_s["w"], st_s["l"]
-            g = w + l
-            pct = (w / g * 100) if g > 0 else 0
-            elo_val = ratings_sd.get(p, 1000)
-            s_rows.append({
-                "Hráč": p,
-                "__games": g,
-                "__pct": pct,
-                "__wins": w,
-                "ELO": int(round(elo_val)),
-                "Skóre": f"{w}:{l}",
-                "Úspěšnost": f"{pct:.1f}".replace('.', ',') + " %"
-            })
-            
-        s_df = pd.DataFrame(s_rows)
-        if not s_df.empty:
-            # Řazení: 1. úspěšnost, 2. počet výher
-            s_active = s_df[s_df["__games"] >= s_threshold].sort_values(["__pct", "__wins"], ascending=[False, False]).reset_index(drop=True)
-            s_active.insert(0, "#", range(1, len(s_active) + 1))
-            s_active = s_active.drop(columns=["__games", "__pct", "__wins"])
-            
-            s_inactive = s_df[s_df["__games"] < s_threshold].sort_values(["__pct", "__wins"], ascending=[False, False]).reset_index(drop=True)
-            s_inactive.insert(0, "#", range(1, len(s_inactive) + 1))
-            s_inactive = s_inactive.drop(columns=["__games", "__pct", "__wins"])
-            
-            sep_s = {c: " " for c in s_active.columns}
-            sep_s["#"] = " "
-            s_limit_text = f"Hráči s méně než {int(math.ceil(s_threshold))} zápasy"
-            sep_s["Hráč"] = s_limit_text
-            sep_s_row = pd.DataFrame([sep_s])
-            
-            if s_inactive.empty:
-                s_out = s_active
-            elif s_active.empty:
-                s_out = s_inactive
-            else:
-                s_out = pd.concat([s_active, sep_s_row, s_inactive], ignore_index=True)
-                
-            def _s_row_style(row):
-                if str(row.get("Hráč", "")).strip() == s_limit_text:
-                    return ["background-color: rgba(255,255,255,0.09); color: rgba(255,255,255,0.55); font-weight: 800;"] * len(row)
-                if str(row.get("#", "")).strip() != " " and str(row.get("Hráč", "")).strip() in s_inactive["Hráč"].values:
-                    return ["color: rgba(255,255,255,0.55); background-color: rgba(255,255,255,0.03);"] * len(row)
-                return [""] * len(row)
-                
-            def _s_hide_cells(row):
-                if str(row.get("Hráč", "")).strip() == s_limit_text:
-                    return ["text-align: center;" if c == "Hráč" else "color: rgba(255,255,255,0.0);" for c in s_out.columns]
-                return [""] * len(row)
-                
-            html_s = s_out.style.hide(axis="index").apply(_s_row_style, axis=1).apply(_s_hide_cells, axis=1).to_html()
-            st.markdown(f'<div class="hist-wrap">{html_s}</div>', unsafe_allow_html=True)
-        else:
-            st.info("Zatím žádné zápasy.")
-
-    # --- DOUBLES ---
-    if st.session_state["sd_view"] == "Doubles":
-        bar("Žebříček Doubles")
-        d_matches = df_sd[df_sd["type"] == "doubles"]
-        d_stats = {}
-
-        for _, r in d_matches.iterrows():
-            ta = [x.strip() for x in r["team_a"].split("+") if x.strip()]
-            tb = [x.strip() for x in r["team_b"].split("+") if x.strip()]
-            if len(ta) != 2 or len(tb) != 2:
-                continue
 
-            ta_key = " + ".join(sorted(ta))
-            tb_key = " + ".join(sorted(tb))
-            win = r["winner"].strip()
-
-            if ta_key not in d_stats:
-                d_stats[ta_key] = {"w": 0, "l": 0, "p1": ta[0], "p2": ta[1]}
-            if tb_key not in d_stats:
-                d_stats[tb_key] = {"w": 0, "l": 0, "p1": tb[0], "p2": tb[1]}
-
-            if win == "A":
-                d_stats[ta_key]["w"] += 1
-                d_stats[tb_key]["l"] += 1
-            elif win == "B":
-                d_stats[tb_key]["w"] += 1
-                d_stats[ta_key]["l"] += 1
-
-        d_rows = []
-        max_d_games = max([st_d["w"] + st_d["l"] for st_d in d_stats.values()]) if d_stats else 0
-        d_threshold = max_d_games / 3.0
-
-        for d_k, st_d in d_stats.items():
-            w, l = st_d["w"], st_d["l"]
-            g = w + l
-            pct = (w / g * 100) if g > 0 else 0
-            avg_elo = (ratings_sd.get(st_d["p1"], 1000) + ratings_sd.get(st_d["p2"], 1000)) / 2.0
-            d_rows.append({
-                "Dvojice": d_k,
-                "__games": g,
-                "__pct": pct,
-                "__wins": w,
-                "Průměrné ELO": int(round(avg_elo)),
-                "Skóre": f"{w}:{l}",
-                "Úspěšnost": f"{pct:.1f}".replace('.', ',') + " %"
-            })
-
-        d_df = pd.DataFrame(d_rows)
-
-        if d_df.empty:
-            st.info("Zatím žádné zápasy.")
-        else:
-            # Řazení: 1. úspěšnost, 2. počet výher
-            d_active = d_df[d_df["__games"] >= d_threshold].sort_values(["__pct", "__wins"], ascending=[False, False]).reset_index(drop=True)
-            d_active.insert(0, "#", range(1, len(d_active) + 1))
-            d_active = d_active.drop(columns=["__games", "__pct", "__wins"])
-
-            d_inactive = d_df[d_df["__games"] < d_threshold].sort_values(["__pct", "__wins"], ascending=[False, False]).reset_index(drop=True)
-            d_inactive.insert(0, "#", range(1, len(d_inactive) + 1))
-            d_inactive = d_inactive.drop(columns=["__games", "__pct", "__wins"])
-
-            d_limit_text = f"Dvojice s méně než {int(math.ceil(d_threshold))} zápasy"
-
-            # poskládej data tak, aby separator byl samostatný marker řádek
-            if d_inactive.empty:
-                d_out = d_active.copy()
-            elif d_active.empty:
-                d_out = d_inactive.copy()
+        # Stylovaná obdélníková tlačítka vedle sebe
+        col_btn1, col_btn2, _ = st.columns([1, 1, 4])
+        # Volba se uloží v callbacku ještě před překreslením fragmentu (bez st.rerun())
+        def set_sd_view(view):
+            st.session_state["sd_view"] = view
+
+        with col_btn1:
+            st.button("🎾 Singles", use_container_width=True, type="primary" if st.session_state["sd_view"] == "Singles" else "secondary",
+                      on_click=set_sd_view, args=("Singles",))
+        with col_btn2:
+            st.button("👥 Doubles", use_container_width=True, type="primary" if st.session_state["sd_view"] == "Doubles" else "secondary",
+                      on_click=set_sd_view, args=("Doubles",))
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # --- SINGLES ---
+        if st.session_state["sd_view"] == "Singles":
+            bar("Žebříček Singles")
+            board = leaderboard_board("singles", STATE.data_version, today, STATE)
+            if board is None:
+                st.info("Zatím žádné zápasy.")
             else:
-                sep_row = pd.DataFrame([{"#": "__SEP__", "Dvojice": d_limit_text, "Průměrné ELO": "", "Skóre": "", "Úspěšnost": ""}])
-                d_out = pd.concat([d_active, sep_row, d_inactive], ignore_index=True)
-
-            # vygeneruj HTML tabulku a separatoru nastav colspan přes všechny sloupce
-            cols = list(d_out.columns)
-            ncols = len(cols)
-
-            parts = []
-            parts.append('<div class="hist-wrap"><table class="hist-table">')
-
-            # header
-            parts.append("<thead><tr>")
-            for c in cols:
-                parts.append(f"<th>{str(c)}</th>")
-            parts.append("</tr></thead>")
-
-            # body
-            parts.append("<tbody>")
-            for _, row in d_out.iterrows():
-                is_sep = str(row.get("#", "")).strip() == "__SEP__"
-                if is_sep:
-                    parts.append(
-                        f'<tr>'
-                        f'<td colspan="{ncols}" style="background-color: rgba(255,255,255,0.09); color: rgba(255,255,255,0.55); font-weight: 800; text-align: center;">'
-                        f'{d_limit_text}'
-                        f'</td>'
-                        f'</tr>'
-                    )
-                    continue
-
-                # běžné řádky
-                parts.append("<tr>")
-                for c in cols:
-                    v = row.get(c, "")
-                    parts.append(f"<td>{str(v)}</td>")
-                parts.append("</tr>")
-            parts.append("</tbody></table></div>")
+                show_leaderboard(board, "singles", STATE.data_version, today)
+
+        # --- DOUBLES ---
+        if st.session_state["sd_view"] == "Doubles":
+            bar("Žebříček Doubles")
+            board = leaderboard_board("doubles", STATE.data_version, today, STATE)
+            if board is None:
+                st.info("Zatím žádné zápasy.")
+            else:
+                show_leaderboard(board, "doubles", STATE.data_version, today)
 
-            st.markdown("".join(parts), unsafe_allow_html=True)
+    sd_panel()
 
 # --- TAB STATISTIKY PŘIHLÁŠENÉHO HRÁČE ---
-with tab_stats:
+if section == "stats":
     if not st.session_state.get("authentication_status"):
         st.warning("⚠️ Pro zobrazení osobních statistik se musíš přihlásit v levém panelu.")
     else:
@@ -1229,18 +733,13 @@ with tab_stats:
         def get_players(team_str):
             return [p.strip() for p in str(team_str).split("+") if p.strip()]
 
-        def get_player_season_stats(player_name, data):
-            w, l = 0, 0
-            for _, r in data.iterrows():
-                if r["type"] not in ["singles", "doubles", "friendly_singles", "friendly_doubles"]: continue
-                ta, tb = get_players(r["team_a"]), get_players(r["team_b"])
-                if player_name in ta:
-                    if r["winner"] == "A": w += 1
-                    elif r["winner"] == "B": l += 1
-                elif player_name in tb:
-                    if r["winner"] == "B": w += 1
-                    elif r["winner"] == "A": l += 1
-            return w, l
+        def get_player_season_stats(player_name):
+            """Výhry a prohry hráče v aktuální sezóně (předpočítané v seasons)."""
+            today = datetime.now().date()
+            season = seasons.current_season(get_seasons(STATE.data_version, today, STATE), today)
+            if season is None or player_name not in season.win_loss.index:
+                return 0, 0
+            return int(season.win_loss.at[player_name, "wins"]), int(season.win_loss.at[player_name, "losses"])
 
         # --- 2. INICIALIZACE A NAVIGACE KALENDÁŘE ---
         if "cal_month" not in st.session_state:
@@ -1265,72 +764,99 @@ with tab_stats:
                         match_details[d_obj] = txt
 
         # --- 4. VYKRESLENÍ KALENDÁŘE A ELO GRAFU ---
-        col_cal, col_info = st.columns([1.2, 2])
+        # Graf se připraví mimo fragment, šipky ‹/› pak překreslí jen kalendář a graf
+        hist_df_graph = STATE.player_history(current_user)
+
+        @st.fragment
+        @profiled("kalendář")
+        def calendar_panel(match_details, all_match_dates, hist_df_graph):
+            col_cal, col_info = st.columns([1.2, 2])
         
-        with col_cal:
-            # Tlačítka pro změnu měsíce (elegantnější)
-            st.markdown("""
-                <style>
-                /* zúží a zjemní jen tyhle dvě šipky (nejde 100% cílit jen klíčem, tak to držíme lokálně velikostí) */
-                .cal-nav-wrap { display:flex; justify-content:space-between; align-items:center; margin: 2px 0 10px 0; }
-                </style>
-            """, unsafe_allow_html=True)
-
-            c_nav1, c_nav2, c_nav3 = st.columns([0.9, 4.2, 0.9], vertical_alignment="center")
-
-            with c_nav1:
-                if st.button("‹", key="btn_prev_m", use_container_width=True, type="secondary"):
-                    st.session_state.cal_month -= 1
-                    if st.session_state.cal_month < 1:
-                        st.session_state.cal_month = 12
-                        st.session_state.cal_year -= 1
-                    st.rerun()
+            with col_cal:
+                # Tlačítka pro změnu měsíce (elegantnější)
+                st.markdown("""
+                    <style>
+                    /* zúží a zjemní jen tyhle dvě šipky (nejde 100% cílit jen klíčem, tak to držíme lokálně velikostí) */
+                    .cal-nav-wrap { display:flex; justify-content:space-between; align-items:center; margin: 2px 0 10px 0; }
+                    </style>
+                """, unsafe_allow_html=True)
 
-            with c_nav2:
-                # jen vycentrovaná mezera (nadpis měsíce je přímo v kalendáři)
-                st.write("")
+                c_nav1, c_nav2, c_nav3 = st.columns([0.9, 4.2, 0.9], vertical_alignment="center")
 
-            with c_nav3:
-                if st.button("›", key="btn_next_m", use_container_width=True, type="secondary"):
-                    st.session_state.cal_month += 1
-                    if st.session_state.cal_month > 12:
-                        st.session_state.cal_month = 1
-                        st.session_state.cal_year += 1
-                    st.rerun()
+                # Posun měsíce v callbacku: proběhne před překreslením fragmentu, bez st.rerun()
+                def shift_month(step):
+                    m = st.session_state.cal_month + step
+                    st.session_state.cal_year += (m - 1) // 12
+                    st.session_state.cal_month = (m - 1) % 12 + 1
 
-            cal_html = render_player_calendar(match_details, st.session_state.cal_year, st.session_state.cal_month)
-            components.html(cal_html, height=320)
+                with c_nav1:
+                    st.button("‹", key="btn_prev_m", use_container_width=True, type="secondary", on_click=shift_month, args=(-1,))
+
+                with c_nav2:
+                    # jen vycentrovaná mezera (nadpis měsíce je přímo v kalendáři)
+                    st.write("")
+
+                with c_nav3:
+                    st.button("›", key="btn_next_m", use_container_width=True, type="secondary", on_click=shift_month, args=(1,))
+
+                cal_html = render_player_calendar(match_details, st.session_state.cal_year, st.session_state.cal_month)
+                components.html(cal_html, height=320)
             
-        with col_info:
-            count = len([d for d in all_match_dates if d.month == st.session_state.cal_month and d.year == st.session_state.cal_year])
+            with col_info:
+                count = len([d for d in all_match_dates if d.month == st.session_state.cal_month and d.year == st.session_state.cal_year])
 
-            # názvy měsíců ve tvaru "v měsíci <...>"
-            month_loc_cz = ["lednu","únoru","březnu","dubnu","květnu","červnu","červenci","srpnu","září","říjnu","listopadu","prosinci"]
-            month_loc = month_loc_cz[st.session_state.cal_month - 1]
+                # názvy měsíců ve tvaru "v měsíci <...>"
+                month_loc_cz = ["lednu","únoru","březnu","dubnu","květnu","červnu","červenci","srpnu","září","říjnu","listopadu","prosinci"]
+                month_loc = month_loc_cz[st.session_state.cal_month - 1]
 
-            # Česká gramatika
-            word = "zápas" if count == 1 else ("zápasy" if 1 < count < 5 else "zápasů")
+                # Česká gramatika
+                word = "zápas" if count == 1 else ("zápasy" if 1 < count < 5 else "zápasů")
             
-            st.markdown(f"""
-                <div style="padding: 15px; color: rgba(255,255,255,0.8); font-size: 14px; background: rgba(255,255,255,0.03); border-radius: 12px; border-left: 4px solid #2ecc71;">
-                    V měsíci {month_loc} {st.session_state.cal_year} jsi odehrál <b>{count}</b> {word}.<br>
-                    <span style="font-size: 12px; opacity: 0.7;">Najeď myší na zelený den pro detail zápasu.</span>
-                </div>
-                <div style="height: 30px;"></div>
-            """, unsafe_allow_html=True)
+                st.markdown(f"""
+                    <div style="padding: 15px; color: rgba(255,255,255,0.8); font-size: 14px; background: rgba(255,255,255,0.03); border-radius: 12px; border-left: 4px solid #2ecc71;">
+                        V měsíci {month_loc} {st.session_state.cal_year} jsi odehrál <b>{count}</b> {word}.<br>
+                        <span style="font-size: 12px; opacity: 0.7;">Najeď myší na zelený den pro detail zápasu.</span>
+                    </div>
+                    <div style="height: 30px;"></div>
+                """, unsafe_allow_html=True)
             
-            # Interaktivní ELO Graf (Plotly) s fixní osou
-            hist_df_graph = build_player_history(DF_ALL, current_user)
-            if not hist_df_graph.empty:
-                graph_data = hist_df_graph.iloc[::-1].copy()
-                min_elo, max_elo = graph_data["ELO po"].min(), graph_data["ELO po"].max()
+                # Interaktivní ELO Graf (Plotly) s fixní osou
+                if not hist_df_graph.empty:
+                    graph_data = hist_df_graph.iloc[::-1].copy()
+                    min_elo, max_elo = graph_data["ELO po"].min(), graph_data["ELO po"].max()
                 
-                fig = px.line(graph_data, x="Datum", y="ELO po", markers=True, color_discrete_sequence=["#2ecc71"])
+                    import plotly.express as px  # plotly se načte až u prvního grafu
+                    fig = px.line(graph_data, x="Datum", y="ELO po", markers=True, color_discrete_sequence=["#2ecc71"])
+                    fig.update_layout(
+                        height=230, margin=dict(l=0, r=0, t=10, b=0),
+                        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                        yaxis_title=None, xaxis_title=None,
+                        yaxis_range=[min_elo - 10, max_elo + 10]
+                    )
+                    fig.update_xaxes(showgrid=False, color="gray", tickfont=dict(size=10))
+                    fig.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)", color="gray", tickfont=dict(size=10))
+                    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
+        calendar_panel(match_details, all_match_dates, hist_df_graph)
+
+        # Série a forma (předpočítané pro verzi dat, form.py)
+        player_matches_df, form_df = get_form(STATE.data_version, STATE)
+        if current_user in form_df.index:
+            f = form_df.loc[current_user]
+            f1, f2, f3, f4 = st.columns(4)
+            f1.metric("Aktuální série", form.streak_text(f["streak"]))
+            f2.metric("Nejdelší série výher", int(f["best_streak"]))
+            f3.metric(f"Forma (posl. {len(f['form'])})", f["form"], f"{f['form_wins']} výher", delta_color="off")
+            f4.metric(f"ELO za posl. {len(f['form'])} zápasů", f"{f['momentum']:+.0f}")
+
+            mine = player_matches_df[(player_matches_df["player"] == current_user) & player_matches_df["ranked"]]
+            if len(mine) > 1:
+                import plotly.express as px
+                fig = px.line(x=mine["date"], y=mine["win_rate"] * 100, color_discrete_sequence=["#3498db"])
                 fig.update_layout(
-                    height=230, margin=dict(l=0, r=0, t=10, b=0),
+                    height=200, margin=dict(l=0, r=0, t=10, b=0),
                     paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-                    yaxis_title=None, xaxis_title=None,
-                    yaxis_range=[min_elo - 10, max_elo + 10]
+                    yaxis_title=f"Úspěšnost posl. {form.ROLLING_WINDOW} (%)", xaxis_title=None, yaxis_range=[0, 100]
                 )
                 fig.update_xaxes(showgrid=False, color="gray", tickfont=dict(size=10))
                 fig.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)", color="gray", tickfont=dict(size=10))
@@ -1353,220 +879,192 @@ with tab_stats:
             st.markdown("**⚔️ Čtyřhra (Proti)**")
             st.dataframe(df_d_opponents, use_container_width=True, hide_index=True)
 
+        # Gemy, sety a tiebreaky (z předem dekódovaných setů, bez dalšího parsování)
+        game_stats_df, mov_ratings = compute_game_stats(DF_ALL, STATE.games)
+        my_games = game_stats_df[game_stats_df["Hráč"] == current_user]
+        if not my_games.empty:
+            g = my_games.iloc[0]
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Gemy (vyhrané : prohrané)", f"{g['Gemy +']} : {g['Gemy -']}")
+            m2.metric("Úspěšnost setů", g["Úspěšnost setů"], f"{g['Sety +']} : {g['Sety -']}", delta_color="off")
+            m3.metric("Tiebreaky", g["Tiebreaky"])
+            m4.metric("ELO podle gemů", int(round(mov_ratings.get(current_user, 1000))))
+
+        with st.expander("🎾 Gemy a sety všech hráčů"):
+            gs_all = game_stats_df.copy()
+            gs_all.insert(1, "ELO podle gemů", [int(round(mov_ratings.get(p, 1000))) for p in gs_all["Hráč"]])
+            st.dataframe(gs_all, use_container_width=True, hide_index=True)
+
         st.divider()
         st.subheader("🔍 Detailní rozbory (H2H)")
         
-        if "sel_opp" not in st.session_state: st.session_state.sel_opp = None
-        if "sel_partner" not in st.session_state: st.session_state.sel_partner = None
-        def reset_partner():
-            st.session_state.sel_partner = None
-
-        def reset_opp():
-            st.session_state.sel_opp = None
-        col_sel_s, col_sel_d = st.columns(2)
-        with col_sel_s:
-            st.selectbox(
-                "🎯 Detail soupeře (Dvouhra):",
-                options=sorted(list(singles_opponents.keys())),
-                index=None,
-                placeholder="— vyber soupeře —",
-                key="sel_opp",
-                on_change=reset_partner
-            )
+        @st.fragment  # výběr soupeře/parťáka přepočítá jen tuhle část
+        @profiled("H2H")
+        def h2h_panel(current_user, singles_opponents, doubles_partners):
+            if "sel_opp" not in st.session_state: st.session_state.sel_opp = None
+            if "sel_partner" not in st.session_state: st.session_state.sel_partner = None
+            def reset_partner():
+                st.session_state.sel_partner = None
+
+            def reset_opp():
+                st.session_state.sel_opp = None
+            col_sel_s, col_sel_d = st.columns(2)
+            with col_sel_s:
+                st.selectbox(
+                    "🎯 Detail soupeře (Dvouhra):",
+                    options=sorted(list(singles_opponents.keys())),
+                    index=None,
+                    placeholder="— vyber soupeře —",
+                    key="sel_opp",
+                    on_change=reset_partner
+                )
 
-        with col_sel_d:
-            st.selectbox(
-                "🤝 Detail parťáka (Čtyřhra):",
-                options=sorted(list(doubles_partners.keys())),
-                index=None,
-                placeholder="— vyber parťáka —",
-                key="sel_partner",
-                on_change=reset_opp
-    )
-        #
-        # --- LOGIKA VZÁJEMNÝCH ZÁPASŮ (DVOUHRA) ---
-        if st.session_state.sel_opp:
-            selected_opp = st.session_state.sel_opp
-            p1_w, p1_l = get_player_season_stats(current_user, DF_ALL)
-            p2_w, p2_l = get_player_season_stats(selected_opp, DF_ALL)
-            h2h_w = singles_opponents[selected_opp]["w"]
-            h2h_l = singles_opponents[selected_opp]["l"]
-            h2h_g = h2h_w + h2h_l
-            
-            st.markdown(f"""
-            <div style="background: rgba(255,255,255,0.05); padding: 20px; border-radius: 12px; border: 1px solid rgba(255,255,255,0.1); margin-top: 10px;">
-                <h3 style="text-align: center; margin-top: 0;">Vzájemné zápasy: {current_user} vs {selected_opp}</h3>
-                <div style="display: flex; justify-content: space-between; text-align: center; margin-top: 20px;">
-                    <div style="width: 30%;"><p><b>{h2h_g}</b></p><p style="color: #2ecc71;">{h2h_w}</p><p style="color: #e74c3c;">{h2h_l}</p></div>
-                    <div style="width: 30%; color: gray;"><p>Zápasů</p><p>Výhry</p><p>Prohry</p></div>
-                    <div style="width: 30%;"><p><b>{h2h_g}</b></p><p style="color: #2ecc71;">{h2h_l}</p><p style="color: #e74c3c;">{h2h_w}</p></div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.markdown("<div style='height:30px'></div>", unsafe_allow_html=True)
-            h2h_matches = []
-            for _, r in DF_ALL.iterrows():
-                if "singles" not in r["type"]: continue
-                ta, tb = get_players(r["team_a"]), get_players(r["team_b"])
-                if (current_user in ta and selected_opp in tb) or (current_user in tb and selected_opp in ta):
-                    winner_name = ta[0] if r["winner"] == "A" else tb[0]
-                    h2h_matches.append({
-                        "Datum": r["date"], 
-                        "Zápas": f"{ta[0]} vs {tb[0]}",
-                        "Vítěz": winner_name, 
-                        "Skóre": r["score"], 
-                        "Sety": format_sets_display(r.get("sets", ""))
-                    })
-            if h2h_matches:
-                df_h2h = pd.DataFrame(h2h_matches).iloc[::-1]
-                st.dataframe(df_h2h.style.map(lambda x: 'color: #2ecc71; font-weight: bold;' if x == current_user else ('color: #e74c3c; font-weight: bold;' if x == selected_opp else ''), subset=['Vítěz']), use_container_width=True, hide_index=True)
-
-        # --- LOGIKA VZÁJEMNÝCH ZÁPASŮ (ČTYŘHRA) ---
-        if st.session_state.sel_partner:
-            selected_partner = st.session_state.sel_partner
-            pw, pl = doubles_partners[selected_partner]["w"], doubles_partners[selected_partner]["l"]
+            with col_sel_d:
+                st.selectbox(
+                    "🤝 Detail parťáka (Čtyřhra):",
+                    options=sorted(list(doubles_partners.keys())),
+                    index=None,
+                    placeholder="— vyber parťáka —",
+                    key="sel_partner",
+                    on_change=reset_opp
+        )
+            #
+            # --- LOGIKA VZÁJEMNÝCH ZÁPASŮ (DVOUHRA) ---
+            if st.session_state.sel_opp:
+                selected_opp = st.session_state.sel_opp
+                p1_w, p1_l = get_player_season_stats(current_user)
+                p2_w, p2_l = get_player_season_stats(selected_opp)
+                h2h_w = singles_opponents[selected_opp]["w"]
+                h2h_l = singles_opponents[selected_opp]["l"]
+                h2h_g = h2h_w + h2h_l
             
-            st.markdown(f"""
-            <div style="background: rgba(255,255,255,0.05); padding: 20px; border-radius: 12px; border: 1px solid rgba(255,255,255,0.1); margin-top: 10px;">
-                <h3 style="text-align: center; margin-top: 0; color: #f1c40f;">Společná bilance: {current_user} & {selected_partner}</h3>
-                <div style="display: flex; justify-content: space-around; text-align: center; margin-top: 20px;">
-                    <div><p style="margin:5px 0; color: gray;">Zápasů</p><p style="margin:5px 0; font-size: 20px;"><b>{pw+pl}</b></p></div>
-                    <div><p style="margin:5px 0; color: gray;">Výhry</p><p style="margin:5px 0; color: #2ecc71; font-size: 20px;"><b>{pw}</b></p></div>
-                    <div><p style="margin:5px 0; color: gray;">Prohry</p><p style="margin:5px 0; color: #e74c3c; font-size: 20px;"><b>{pl}</b></p></div>
+                st.markdown(f"""
+                <div style="background: rgba(255,255,255,0.05); padding: 20px; border-radius: 12px; border: 1px solid rgba(255,255,255,0.1); margin-top: 10px;">
+                    <h3 style="text-align: center; margin-top: 0;">Vzájemné zápasy: {current_user} vs {selected_opp}</h3>
+                    <div style="display: flex; justify-content: space-between; text-align: center; margin-top: 20px;">
+                        <div style="width: 30%;"><p><b>{h2h_g}</b></p><p style="color: #2ecc71;">{h2h_w}</p><p style="color: #e74c3c;">{h2h_l}</p></div>
+                        <div style="width: 30%; color: gray;"><p>Zápasů</p><p>Výhry</p><p>Prohry</p></div>
+                        <div style="width: 30%;"><p><b>{h2h_g}</b></p><p style="color: #2ecc71;">{h2h_l}</p><p style="color: #e74c3c;">{h2h_w}</p></div>
+                    </div>
                 </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            partner_matches = []
-            opponents_set = set()
-            for _, r in DF_ALL.iterrows():
-                if "doubles" not in r["type"]: continue
-                ta, tb = get_players(r["team_a"]), get_players(r["team_b"])
-                we_ta, we_tb = (current_user in ta and selected_partner in ta), (current_user in tb and selected_partner in tb)
-                if we_ta or we_tb:
-                    opps_str = " + ".join(sorted(tb if we_ta else ta))
-                    opponents_set.add(opps_str)
-                    is_win = (we_ta and r["winner"] == "A") or (we_tb and r["winner"] == "B")
-                    partner_matches.append({
-                        "Datum": r["date"], "Soupeři": opps_str, "Výsledek": "Výhra" if is_win else "Prohra", 
-                        "Skóre": r["score"], "Sety": format_sets_display(r.get("sets", ""))
-                    })
+                """, unsafe_allow_html=True)
+                st.markdown("<div style='height:30px'></div>", unsafe_allow_html=True)
+                h2h_matches = singles_h2h_matches(DF_ALL, current_user, selected_opp, SETS_TXT)
+                if h2h_matches:
+                    df_h2h = pd.DataFrame(h2h_matches).iloc[::-1]
+                    st.dataframe(df_h2h.style.map(lambda x: 'color: #2ecc71; font-weight: bold;' if x == current_user else ('color: #e74c3c; font-weight: bold;' if x == selected_opp else ''), subset=['Vítěz']), use_container_width=True, hide_index=True)
+
+            # --- LOGIKA VZÁJEMNÝCH ZÁPASŮ (ČTYŘHRA) ---
+            if st.session_state.sel_partner:
+                selected_partner = st.session_state.sel_partner
+                pw, pl = doubles_partners[selected_partner]["w"], doubles_partners[selected_partner]["l"]
+                pair_elo = STATE.elo["pairs"].get(pair_key(current_user, selected_partner), 1000.0)
             
-            partner_matches = []
-            opponents_set = set()
-
-            for _, r in DF_ALL.iterrows():
-                if "doubles" not in r["type"]:
-                    continue
-
-                ta = get_players(r["team_a"])
-                tb = get_players(r["team_b"])
-
-                we_ta = current_user in ta and selected_partner in ta
-                we_tb = current_user in tb and selected_partner in tb
-
-                if we_ta or we_tb:
-                    opps_str = " + ".join(sorted(tb if we_ta else ta))
-                    opponents_set.add(opps_str)
-
-                    is_win = (we_ta and r["winner"] == "A") or (we_tb and r["winner"] == "B")
-
-                    partner_matches.append({
-                        "Datum": r["date"],
-                        "Soupeři": opps_str,
-                        "Výsledek": "Výhra" if is_win else "Prohra",
-                        "Skóre": r["score"],
-                        "Sety": format_sets_display(r.get("sets", ""))
-                    })
-
-            st.markdown("---")
-
-            selected_d_opp = st.selectbox(
-                "⚔️ Head-to-Head proti dvojici:",
-                options=sorted(list(opponents_set)),
-                index=None,
-                placeholder="— vyber dvojici —",
-                key="h2h_d_opp"
-            )
-
-            # --- H2H BOX ---
-            if selected_d_opp:
-
-                h2h_w = 0
-                h2h_l = 0
-
-                for m in partner_matches:
-                    if m["Soupeři"] != selected_d_opp:
-                        continue
-
-                    if m["Výsledek"] == "Výhra":
-                        h2h_w += 1
-                    else:
-                        h2h_l += 1
-
-                h2h_g = h2h_w + h2h_l
-
                 st.markdown(f"""
-                <div style="
-                background: rgba(255,255,255,0.05);
-                padding: 22px;
-                border-radius: 14px;
-                border: 1px solid rgba(255,255,255,0.10);
-                margin-top: 10px;
-                text-align:center;
-                ">
-
-                <h3 style="margin-top:0;">
-                Vzájemné zápasy: {current_user} + {selected_partner} vs {selected_d_opp}
-                </h3>
-
-                <div style="
-                display:flex;
-                justify-content:center;
-                gap:60px;
-                margin-top:20px;
-                font-size:18px;
-                ">
-
-                <div>
-                <div style="color:gray;font-size:13px;">Zápasů</div>
-                <div style="font-size:28px;"><b>{h2h_g}</b></div>
+                <div style="background: rgba(255,255,255,0.05); padding: 20px; border-radius: 12px; border: 1px solid rgba(255,255,255,0.1); margin-top: 10px;">
+                    <h3 style="text-align: center; margin-top: 0; color: #f1c40f;">Společná bilance: {current_user} & {selected_partner}</h3>
+                    <div style="display: flex; justify-content: space-around; text-align: center; margin-top: 20px;">
+                        <div><p style="margin:5px 0; color: gray;">Zápasů</p><p style="margin:5px 0; font-size: 20px;"><b>{pw+pl}</b></p></div>
+                        <div><p style="margin:5px 0; color: gray;">Výhry</p><p style="margin:5px 0; color: #2ecc71; font-size: 20px;"><b>{pw}</b></p></div>
+                        <div><p style="margin:5px 0; color: gray;">Prohry</p><p style="margin:5px 0; color: #e74c3c; font-size: 20px;"><b>{pl}</b></p></div>
+                        <div><p style="margin:5px 0; color: gray;">ELO dvojice</p><p style="margin:5px 0; color: #3498db; font-size: 20px;"><b>{pair_elo:.0f}</b></p></div>
+                    </div>
                 </div>
+                """, unsafe_allow_html=True)
+            
+                partner_matches = STATE.partner_matches(current_user, selected_partner)
+                opponents_set = {m["Soupeři"] for m in partner_matches}
 
-                <div>
-                <div style="color:gray;font-size:13px;">Výhry</div>
-                <div style="font-size:28px;color:#2ecc71;"><b>{h2h_w}</b></div>
-                </div>
+                st.markdown("---")
 
-                <div>
-                <div style="color:gray;font-size:13px;">Prohry</div>
-                <div style="font-size:28px;color:#e74c3c;"><b>{h2h_l}</b></div>
-                </div>
+                selected_d_opp = st.selectbox(
+                    "⚔️ Head-to-Head proti dvojici:",
+                    options=sorted(list(opponents_set)),
+                    index=None,
+                    placeholder="— vyber dvojici —",
+                    key="h2h_d_opp"
+                )
 
-                </div>
-                </div>
-                """, unsafe_allow_html=True)
+                # --- H2H BOX ---
+                if selected_d_opp:
+
+                    h2h_w = 0
+                    h2h_l = 0
+
+                    for m in partner_matches:
+                        if m["Soupeři"] != selected_d_opp:
+                            continue
+
+                        if m["Výsledek"] == "Výhra":
+                            h2h_w += 1
+                        else:
+                            h2h_l += 1
+
+                    h2h_g = h2h_w + h2h_l
+
+                    st.markdown(f"""
+                    <div style="
+                    background: rgba(255,255,255,0.05);
+                    padding: 22px;
+                    border-radius: 14px;
+                    border: 1px solid rgba(255,255,255,0.10);
+                    margin-top: 10px;
+                    text-align:center;
+                    ">
+
+                    <h3 style="margin-top:0;">
+                    Vzájemné zápasy: {current_user} + {selected_partner} vs {selected_d_opp}
+                    </h3>
+
+                    <div style="
+                    display:flex;
+                    justify-content:center;
+                    gap:60px;
+                    margin-top:20px;
+                    font-size:18px;
+                    ">
+
+                    <div>
+                    <div style="color:gray;font-size:13px;">Zápasů</div>
+                    <div style="font-size:28px;"><b>{h2h_g}</b></div>
+                    </div>
+
+                    <div>
+                    <div style="color:gray;font-size:13px;">Výhry</div>
+                    <div style="font-size:28px;color:#2ecc71;"><b>{h2h_w}</b></div>
+                    </div>
+
+                    <div>
+                    <div style="color:gray;font-size:13px;">Prohry</div>
+                    <div style="font-size:28px;color:#e74c3c;"><b>{h2h_l}</b></div>
+                    </div>
+
+                    </div>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                st.markdown("<div style='height:30px'></div>", unsafe_allow_html=True)     
+                display_m = [
+                    m for m in partner_matches
+                    if m["Soupeři"] == selected_d_opp
+                ] if selected_d_opp else partner_matches
+
+
+                if display_m:
+                    st.dataframe(
+                        pd.DataFrame(display_m).iloc[::-1].style.map(
+                            lambda x:
+                            'color: #2ecc71; font-weight: bold;' if x == 'Výhra'
+                            else ('color: #e74c3c; font-weight: bold;' if x == 'Prohra' else ''),
+                            subset=['Výsledek']
+                        ),
+                        use_container_width=True,
+                        hide_index=True
+                    )
 
-            st.markdown("<div style='height:30px'></div>", unsafe_allow_html=True)     
-            display_m = [
-                m for m in partner_matches
-                if m["Soupeři"] == selected_d_opp
-            ] if selected_d_opp else partner_matches
-
-
-            if display_m:
-                st.dataframe(
-                    pd.DataFrame(display_m).iloc[::-1].style.map(
-                        lambda x:
-                        'color: #2ecc71; font-weight: bold;' if x == 'Výhra'
-                        else ('color: #e74c3c; font-weight: bold;' if x == 'Prohra' else ''),
-                        subset=['Výsledek']
-                    ),
-                    use_container_width=True,
-                    hide_index=True
-                )
+        h2h_panel(current_user, singles_opponents, doubles_partners)
 # --- TAB 2: ZADÁNÍ ZÁPASU ---
-with tab2:
+if section == "entry":
     if st.session_state.get("authentication_status"):
         # VŠECHNO pod tímto řádkem je nyní odsazené, takže se zobrazí jen přihlášeným
         
@@ -1597,8 +1095,14 @@ with tab2:
             st.session_state["winner_sel"] = "A"
             st.session_state["score_in"] = ""
             st.session_state["sets_in"] = ""
+            st.session_state["dup_ok"] = False
+            st.session_state.pop("_submit_key", None)  # další odeslání = nový zápis
             st.session_state["_clear_form"] = False
 
+        # Klíč idempotence: stejné odeslání formuláře (dvojklik) se zapíše jen jednou
+        if "_submit_key" not in st.session_state:
+            st.session_state["_submit_key"] = uuid.uuid4().hex
+
         if st.session_state.get("_clear_adj"):
             st.session_state["adj_p"] = None
             st.session_state["adj_delta"] = 0
@@ -1648,6 +1152,36 @@ with tab2:
             winner = st.selectbox("Vítěz", ["A", "B"], format_func=lambda x: team_a if x == "A" else team_b, key="winner_sel")
             score = st.text_input("Skóre (např. 2:1)", key="score_in")
             sets = st.text_input("Gemy setů (např. 6,4,6)", key="sets_in")
+
+            db_type = "friendly_singles" if is_friendly and m_type == "Singles" else \
+                      "friendly_doubles" if is_friendly and m_type == "Doubles" else \
+                      "singles" if m_type == "Singles" else "doubles"
+
+            # Stejný zápas (datum, typ, hráči, vítěz, skóre) už v datech je? Otisk v indexu = O(1)
+            dup_row = None
+            if team_a and team_b:
+                dup_row = STATE.match_index.get(match_key(db_type, date.strftime("%d.%m.%Y"), team_a, team_b, winner, score))
+            if dup_row is not None:
+                st.warning(f"Stejný zápas už je zapsaný (řádek {dup_row + 2}). Nezadal ho už někdo jiný?")
+                st.checkbox("Je to jiný zápas, uložit i tak", key="dup_ok")
+
+            # Náhled změny ELO pro oba výsledky: jen z aktuálního ELO, nic se nepřehrává
+            preview_players = get_players(team_a) + get_players(team_b)
+            if team_a and team_b and len(set(preview_players)) == len(preview_players):
+                if is_friendly:
+                    st.caption("Přátelák ELO nemění.")
+                else:
+                    preview = preview_match(STATE.elo["ratings"], m_type.lower(), get_players(team_a), get_players(team_b))
+                    def _fmt(d, new):
+                        return f"{d:+.0f} → {new:.0f}"
+                    prev_df = pd.DataFrame({
+                        "Hráč": preview_players,
+                        "ELO": [f"{STATE.elo['ratings'].get(p, 1000.0):.0f}" for p in preview_players],
+                        f"Vyhraje {team_a}": [_fmt(*preview["A"][p]) for p in preview_players],
+                        f"Vyhraje {team_b}": [_fmt(*preview["B"][p]) for p in preview_players],
+                    })
+                    st.caption("Náhled změny ELO")
+                    st.markdown(f'<div class="hist-wrap">{prev_df.to_html(index=False, border=0)}</div>', unsafe_allow_html=True)
             
             if st.button("💾 Uložit zápas", use_container_width=True):
                     # pojistka: retired hráče nepustit
@@ -1669,9 +1203,9 @@ with tab2:
                         st.error("Hráči se nesmí opakovat!")
                         st.stop()
 
-                db_type = "friendly_singles" if is_friendly and m_type == "Singles" else \
-                          "friendly_doubles" if is_friendly and m_type == "Doubles" else \
-                          "singles" if m_type == "Singles" else "doubles"
+                if dup_row is not None and not st.session_state.get("dup_ok"):
+                    st.error("Zápas vypadá jako duplicita, potvrď, že jde o jiný zápas.")
+                    st.stop()
 
                 save_match({
                     "date": date.strftime("%d.%m.%Y"),
@@ -1683,7 +1217,7 @@ with tab2:
                     "sets": f"'{normalize_sets_input(sets)}" if sets else "",
                     "reason": "",
                     "author": st.session_state.get("name", "Neznámý")
-                })
+                }, submit_key=st.session_state["_submit_key"])
 
                 st.session_state["_match_saved"] = True
                 st.session_state["_clear_form"] = True
@@ -1736,7 +1270,52 @@ with tab2:
                     st.rerun()
                 elif new_name in all_players:
                     st.error("Tento hráč už existuje.")
-                    
+
+        # --- ROZLOSOVÁNÍ ČTYŘHER (klubový večer) ---
+        @st.fragment  # výběr hráčů přepočítá jen tuhle část
+        @profiled("rozlosování")
+        def matchmaking_panel(active_players):
+            with st.expander("🎲 Rozlosování čtyřher", expanded=False):
+                st.caption("Vyber přítomné hráče v pořadí příchodu; když jich není násobek 4, sedí poslední.")
+                present = st.multiselect("Přítomní hráči", active_players, key="mm_players")
+                if len(present) < 4:
+                    return
+                player_matches_df, _ = get_form(STATE.data_version, STATE)
+                partners, opponents = matchmaking.repeat_counts(player_matches_df, present, datetime.now().date())
+                plan = matchmaking.plan_doubles(present, STATE.elo["ratings"], partners, opponents)
+                st.dataframe(pd.DataFrame({
+                    "Kurt": range(1, len(plan.courts) + 1),
+                    "Tým A": [" + ".join(c.team_a) for c in plan.courts],
+                    "Tým B": [" + ".join(c.team_b) for c in plan.courts],
+                    "Šance A": [f"{c.expected * 100:.0f} %" for c in plan.courts],
+                }), use_container_width=True, hide_index=True)
+                if plan.sitting_out:
+                    st.info("Sedí: " + ", ".join(plan.sitting_out))
+
+        matchmaking_panel(active_players)
+
+        # --- HROMADNÝ IMPORT Z CSV (jen admin) ---
+        if st.session_state.get("name") == "Tobi":
+            if st.session_state.get("_imported"):
+                st.toast(f"Importováno řádků: {st.session_state['_imported']}", icon="✅")
+                st.session_state["_imported"] = 0
+
+            with st.expander("📥 Hromadný import zápasů z CSV", expanded=False):
+                st.caption("Sloupce jako v tennis_elo_template.csv: date,type,team_a,team_b,winner,score,sets,reason (volitelně author).")
+                up = st.file_uploader("CSV soubor", type=["csv"], key="import_csv")
+                if up is not None:
+                    valid_rows, import_errors = bulk_import.validate_csv(
+                        bulk_import.open_text(up.getvalue()), all_players, st.session_state.get("name", "Neznámý"),
+                        STATE.match_index,
+                    )
+                    st.write(f"Platných řádků: **{len(valid_rows)}**, chyb: **{len(import_errors)}**")
+                    if import_errors:
+                        st.dataframe(pd.DataFrame(import_errors, columns=["Řádek", "Chyba"]), hide_index=True, use_container_width=True)
+                        st.error("Oprav chyby v souboru a nahraj ho znovu.")
+                    elif valid_rows and st.button(f"Importovat {len(valid_rows)} řádků", type="primary"):
+                        st.session_state["_imported"] = save_matches(valid_rows)
+                        st.rerun()
+
     else:
         # TOTO se zobrazí, pokud uživatel není přihlášen
         st.warning("⚠️ Pro zadávání nových zápasů, přidávání hráčů a úpravu ELO se musíš přihlásit v levém panelu.")
@@ -1744,11 +1323,11 @@ with tab2:
 
 
 # --- TAB 3: HISTORIE ---
-with tab3:
+if section == "history":
     bar("Kompletní historie zápasů")
 
-    # Tady se načtou data (pokud máš u build_full_history @st.cache_data, bude to hned)
-    df_hist = build_full_history(DF_ALL)
+    # Historie je součástí zpracovaného stavu (snapshot / dopočet nových řádků)
+    df_hist = STATE.history
 
     # --- 1. ADMIN SEKCE (FRAGMENT PRO RYCHLOST) ---
     if st.session_state.get("authentication_status") and st.session_state.get("name") == "Tobi":
@@ -1782,7 +1361,15 @@ with tab3:
                     st.info("Historie je prázdná.")
         
         admin_panel(df_hist)
-        st.write("---") 
+
+        # Report z validace logu (elo_engine.validate_events)
+        report = STATE.report
+        if not report.empty:
+            n_rej = int((report["Stav"] == REJECTED).sum())
+            with st.expander(f"⚠️ Kontrola dat: {n_rej} vyřazených a {len(report) - n_rej} opravených řádků", expanded=False):
+                st.caption("Vyřazené řádky se do ELO, historie ani statistik nepočítají, opravené se počítají s opravenou hodnotou. Trvale je oprav přímo v Google Sheets.")
+                st.dataframe(report, hide_index=True, use_container_width=True)
+        st.write("---")
 
     # --- 2. VYKRESLENÍ TABULKY HISTORIE ---
     display_df = df_hist.drop(columns=["row_idx"]) if "row_idx" in df_hist.columns else df_hist
@@ -1831,4 +1418,8 @@ with tab3:
         html_table = display_df.to_html(index=False, classes="hist-table", border=0, escape=False) # escape=False aby fungovaly tooltipy/formát
         st.markdown(f'<div class="hist-wrap">{html_table}</div>', unsafe_allow_html=True)
     else:
-        st.info("Zatím nejsou k dispozici žádné záznamy.")
\ No newline at end of file
+        st.info("Zatím nejsou k dispozici žádné záznamy.")
+
+log_time(f"celý běh ({section})", RUN_T0)
+metrics.observe("tenis_rerun_seconds", time.perf_counter() - RUN_T0, section=section)
+metrics.write_textfile()